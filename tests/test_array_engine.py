@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from traffic_sim.control.fixed_cycle import FixedCyclePolicy
+from traffic_sim.models.grid_world import build_world_from_grid
+from traffic_sim.models.vehicle import Vehicle
+
+GRID = [list(row) for row in [
+    "  |    |  ",
+    "--+----+--",
+    "  |    |  ",
+    "  |    |  ",
+    "--+----+--",
+    "  |    |  ",
+]]
+
+
+def run(array_engine: bool, steps: int = 400, dt: float = 0.25):
+    random.seed(7)
+    world = build_world_from_grid(GRID, array_engine=array_engine)
+    policy = FixedCyclePolicy(green_ns=7, yellow_ns=2, green_ew=7, yellow_ew=2)
+    H, W = world._grid_size
+    entries = [r for r in world.roads
+               if r.from_tile[0] in (0, H - 1) or r.from_tile[1] in (0, W - 1)]
+    history = []
+    for step in range(steps):
+        now = step * dt
+        for inter in world.intersections:
+            inter.apply_policy(policy, now)
+        for _ in range(2):
+            if random.random() < 0.5:
+                car = Vehicle(id=len(world.vehicles) + 1, road=random.choice(entries), enter_time_s=now)
+                car.target_speed *= random.uniform(0.9, 1.1)
+                world.vehicles.append(car)
+        world.tick(dt)
+        world.sync()
+        index = {rd: i for i, rd in enumerate(world.roads)}
+        history.append([(v.pos_m, index[v.road], v.finished) for v in world.vehicles])
+    return history
+
+
+def test_array_engine_matches_object_loop():
+    expected = run(array_engine=False)
+    actual = run(array_engine=True)
+    assert len(expected[-1]) > 100
+    assert any(f for *_, f in expected[-1])
+    assert actual == expected
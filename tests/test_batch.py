@@ -0,0 +1,46 @@
+import pytest
+
+from traffic_sim.batch import Scenario, _t_critical, aggregate, run_replication, run_replications, scenario_from_dict
+
+
+def test_replications_are_reproducible_and_aggregated():
+    scenario = Scenario(horizon_s=120.0)
+    serial = run_replications(scenario, seeds=range(4), workers=1)
+    parallel = run_replications(scenario, seeds=range(4), workers=2)
+
+    assert [r["summary"] for r in serial["replications"]] == [r["summary"] for r in parallel["replications"]]
+    mean = serial["mean"]["entered"]
+    assert serial["ci_low"]["entered"] <= mean <= serial["ci_high"]["entered"]
+
+
+def test_aggregate_single_value_has_zero_width():
+    out = aggregate([{"exited": 3}])
+    assert out["mean"]["exited"] == out["ci_low"]["exited"] == out["ci_high"]["exited"] == 3.0
+
+
+@pytest.mark.parametrize("df, confidence, expected", [
+    (1, 0.95, 12.7062), (2, 0.95, 4.3027), (3, 0.99, 5.8409), (4, 0.90, 2.1318),
+    (5, 0.95, 2.5706), (10, 0.95, 2.2281), (30, 0.95, 2.0423), (5000, 0.95, 1.9604),
+])
+def test_t_critical_matches_tables(df, confidence, expected):
+    assert _t_critical(df, confidence) == pytest.approx(expected, abs=1e-4)
+
+
+def test_two_replications_get_the_wide_t_interval():
+    out = aggregate([{"exited": 1}, {"exited": 3}])
+    # mean 2, stdev sqrt(2), half-width t(1) * sqrt(2) / sqrt(2)
+    assert out["ci_high"]["exited"] - 2.0 == pytest.approx(12.7062, abs=1e-4)
+
+
+def test_scenario_from_dict_builds_policy_and_reseeded_demand():
+    scenario = scenario_from_dict({
+        "policy": {"type": "fixed", "green_ns": 5},
+        "demand": {"type": "poisson", "rate_per_s": 0.2},
+        "horizon_s": 60.0,
+        "mode": "hybrid",
+    })
+    assert scenario.policy.green_ns == 5 and scenario.mode == "hybrid"
+    assert run_replication(scenario, 1) == run_replication(scenario, 1)
+    assert run_replication(scenario, 1) != run_replication(scenario, 2)
+    with pytest.raises(ValueError):
+        scenario_from_dict({"policy": {"type": "nope"}})
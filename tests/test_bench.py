@@ -0,0 +1,30 @@
+from traffic_sim.bench import _tick_memory, compare, iter_cases, run_suite
+
+
+def test_suite_reports_rates_and_memory_for_every_case():
+    cases = list(iter_cases(["tick", "run", "policy", "routing"], [8], [0.5]))
+    results = run_suite(cases, ticks=3, repeats=1, isolate=False)
+    assert set(results) == {"tick/8/0.5/object", "tick/8/0.5/array", "run/8/0.5/object",
+                            "run/8/0.5/array", "policy/8/0.5/batch", "policy/8/0.5/loop",
+                            "routing/8/0.5/object"}
+    for metrics in results.values():
+        assert metrics["steps_per_s" if "steps_per_s" in metrics else "routes_per_s"] > 0
+        assert metrics["peak_rss_mb"] > 0 and metrics["peak_traced_kb_per_tick"] >= 0
+        assert metrics["allocs_per_tick"] >= 0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"tick/8/1/object": {"steps_per_s": 100.0, "peak_rss_mb": 50.0, "vehicles": 10}}
+    assert compare({"tick/8/1/object": {"steps_per_s": 80.0, "peak_rss_mb": 55.0, "vehicles": 99}},
+                   baseline, tolerance=0.25) == []
+    problems = compare({"tick/8/1/object": {"steps_per_s": 50.0, "peak_rss_mb": 80.0}}, baseline, 0.25)
+    assert len(problems) == 2 and all(p.startswith("tick/8/1/object") for p in problems)
+    assert compare({"new/case": {"steps_per_s": 1.0}}, baseline) == []
+
+
+def test_tick_memory_counts_blocks_left_allocated():
+    kept = []
+    grows = _tick_memory(lambda: kept.extend(object() for _ in range(100)))
+    assert 100 <= grows["allocs_per_tick"] < 110
+    churns = _tick_memory(lambda: [object() for _ in range(1000)])
+    assert churns["allocs_per_tick"] < 5 and churns["peak_traced_kb_per_tick"] > 1
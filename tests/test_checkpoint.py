@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from traffic_sim.batch import Scenario, build_simulation
+from traffic_sim.bench import synthetic_grid
+from traffic_sim.control.actuated import ActuatedPolicy
+from traffic_sim.control.fixed_cycle import FixedCyclePolicy
+from traffic_sim.core.checkpoint import Checkpoint, pack_rng_state, unpack_rng_state
+from traffic_sim.models.intersection import Intersection
+from traffic_sim.scenarios import PoissonSpawner
+
+
+@pytest.mark.parametrize("array_engine", [False, True])
+def test_restored_simulation_continues_identically(tmp_path, array_engine):
+    scenario = Scenario(grid=synthetic_grid(12), spawn_fn=PoissonSpawner(rate_per_s=2.0),
+                        horizon_s=40.0, array_engine=array_engine)
+    sim = build_simulation(scenario, 4)
+    sim.run()
+    Checkpoint.capture(sim).save(tmp_path / "warm.npz")
+    sim.max_time = 90.0
+    expected = sim.run()
+
+    restored = Checkpoint.load(tmp_path / "warm.npz").restore(
+        FixedCyclePolicy(), PoissonSpawner(rate_per_s=2.0), max_time=90.0)
+    assert restored.world.active_count() > 0 and restored.clock.now() > 40.0
+    assert restored.run() == expected
+    assert restored.steps == sim.steps
+
+
+def test_fork_branches_policy_variants_from_one_state():
+    sim = build_simulation(Scenario(horizon_s=60.0), 2)
+    sim.run()
+    ckpt = Checkpoint.capture(sim)
+    variants = [FixedCyclePolicy(), FixedCyclePolicy(green_ns=20.0), FixedCyclePolicy()]
+    results = [branch.run() for branch in ckpt.fork(variants, spawn_fn=sim.spawn_fn, max_time=180.0)]
+    assert results[0] == results[2] != results[1]
+    assert all(r["entered"] >= sim.metrics.entered for r in results)
+
+
+def test_fork_with_the_warmed_spawner():
+    scenario = Scenario(grid=synthetic_grid(12), spawn_fn=PoissonSpawner(rate_per_s=2.0), horizon_s=30.0)
+    sim = build_simulation(scenario, 6)
+    sim.run()
+    ckpt = Checkpoint.capture(sim)
+    sim.max_time = 60.0
+    expected = sim.run()
+    branches = ckpt.fork([FixedCyclePolicy(), FixedCyclePolicy()], spawn_fn=sim.spawn_fn, max_time=60.0)
+    assert [branch.run() for branch in branches] == [expected, expected]
+
+
+def test_policy_and_rng_state_round_trip():
+    nodes = [Intersection(name=f"I{k}") for k in range(3)]
+    policy = ActuatedPolicy()
+    for k in range(3):
+        policy._slot(nodes[2 - k])
+    policy.color[policy._slot(nodes[1])] = 1
+    policy.phase_start[policy._slot(nodes[1])] = 12.5
+    clone = ActuatedPolicy()
+    clone.restore_state(nodes, policy.checkpoint_state(nodes))
+    assert clone.color[clone._slot(nodes[1])] == 1 and clone.phase_start[clone._slot(nodes[1])] == 12.5
+
+    random.gauss(0, 1)  # leaves a cached gauss value in the state
+    state = random.getstate()
+    assert unpack_rng_state(pack_rng_state(state)) == state
+
+
+def test_compressed_network_round_trips(tmp_path):
+    scenario = Scenario(grid=synthetic_grid(12), spawn_fn=PoissonSpawner(rate_per_s=2.0),
+                        horizon_s=30.0, compress=True)
+    sim = build_simulation(scenario, 3)
+    sim.run()
+    assert len(sim.world.roads) < len(build_simulation(Scenario(grid=synthetic_grid(12)), 3).world.roads)
+    Checkpoint.capture(sim).save(tmp_path / "c.npz")
+    sim.max_time = 60.0
+    expected = sim.run()
+    restored = Checkpoint.load(tmp_path / "c.npz").restore(
+        FixedCyclePolicy(), PoissonSpawner(rate_per_s=2.0), max_time=60.0)
+    assert [rd.screen_points for rd in restored.world.roads] == [rd.screen_points for rd in sim.world.roads]
+    assert restored.run() == expected
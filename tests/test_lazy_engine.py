@@ -0,0 +1,75 @@
+import pytest
+
+from traffic_sim.batch import Scenario, build_simulation
+from traffic_sim.bench import synthetic_grid
+from traffic_sim.control.actuated import ActuatedPolicy
+from traffic_sim.control.fixed_cycle import FixedCyclePolicy
+from traffic_sim.core.checkpoint import Checkpoint
+from traffic_sim.demand import BatchDemand
+from traffic_sim.models.grid_world import build_world_from_grid
+from traffic_sim.scenarios import GRID
+
+
+def lockstep(grid, spawn, policy=FixedCyclePolicy, ticks=800, compress=True):
+    """Run the object loop and the lazy engine side by side, comparing every tick.
+
+    ``spawn`` must keep its own generator so the two runs can interleave.
+    """
+    sims = [build_simulation(Scenario(grid=grid, spawn_fn=spawn, policy=policy(), compress=compress,
+                                      lazy=lazy), 5) for lazy in (False, True)]
+    worst = 0.0
+    for _ in range(ticks):
+        for sim in sims:
+            sim.step()
+        loop, lazy = sims[0].world, sims[1].world
+        lazy.sync()
+        assert [v.id for v in loop.vehicles] == [v.id for v in lazy.vehicles]
+        for a, b in zip(loop.vehicles, lazy.vehicles):
+            assert a.road.name == b.road.name
+            worst = max(worst, abs(a.pos_m - b.pos_m))
+        assert [i.occupancy for i in loop.intersections] == [i.occupancy for i in lazy.intersections]
+    assert worst < 1e-9
+    return sims
+
+
+@pytest.mark.parametrize("policy", [FixedCyclePolicy, ActuatedPolicy])
+def test_lazy_engine_tracks_object_loop(policy):
+    loop, lazy = lockstep(synthetic_grid(24, block=12), BatchDemand(rates=0.3), policy)
+    assert loop.metrics.summary() == lazy.metrics.summary()
+    assert loop.metrics.exited > 50
+
+
+def test_lazy_engine_on_tile_roads():
+    loop, lazy = lockstep(GRID, BatchDemand(rates=0.2), compress=False, ticks=400)
+    assert loop.metrics.summary() == lazy.metrics.summary()
+    assert loop.metrics.exited > 20
+
+
+def test_free_flowing_cars_are_not_stepped():
+    scenario = Scenario(grid=synthetic_grid(48, block=24), spawn_fn=BatchDemand(rates=0.1),
+                        horizon_s=300.0, compress=True, lazy=True)
+    sim = build_simulation(scenario, 1)
+    car_ticks = 0
+    while sim.clock.now() <= sim.max_time:
+        car_ticks += sim.world.active_count()
+        sim.step()
+    assert sim.world.engine.stepped < car_ticks / 3
+
+
+def test_checkpoint_keeps_the_lazy_engine(tmp_path):
+    scenario = Scenario(grid=synthetic_grid(24, block=12), spawn_fn=BatchDemand(rates=0.3),
+                        horizon_s=60.0, compress=True, lazy=True)
+    sim = build_simulation(scenario, 4)
+    sim.run()
+    Checkpoint.capture(sim).save(tmp_path / "lazy.npz")
+    sim.max_time = 120.0
+    expected = sim.run()
+    restored = Checkpoint.load(tmp_path / "lazy.npz").restore(
+        FixedCyclePolicy(), BatchDemand(rates=0.3), max_time=120.0)
+    assert type(restored.world.engine).__name__ == "LazyEngine"
+    assert restored.run() == expected
+
+
+def test_lazy_and_array_engines_are_exclusive():
+    with pytest.raises(ValueError):
+        build_world_from_grid(GRID, array_engine=True, lazy=True)
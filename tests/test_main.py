@@ -0,0 +1,35 @@
+import csv
+import json
+
+import pytest
+
+from traffic_sim.__main__ import main
+
+
+def test_headless_run_writes_json_and_csv(tmp_path, capsys):
+    scenario = tmp_path / "city.json"
+    scenario.write_text(json.dumps({"demand": {"type": "poisson", "rate_per_s": 0.3}}))
+
+    assert main([str(scenario), "--headless", "--steps", "200", "--seed", "3"]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result["steps"] == 200 and result["seed"] == 3
+    assert result["steps_per_s"] > 0 and result["summary"]["entered"] > 0
+
+    out = tmp_path / "out.csv"
+    main([str(scenario), "--headless", "--steps", "200", "--seed", "3", "--format", "csv", "-o", str(out)])
+    (row,) = csv.DictReader(out.open())
+    assert int(row["entered"]) == result["summary"]["entered"]
+
+
+@pytest.mark.parametrize("dt", [0.1, 0.3, 0.25])
+def test_steps_count_ticks_exactly_for_inexact_dt(dt, capsys):
+    assert main(["--headless", "--steps", "40", "--dt", str(dt)]) == 0
+    assert json.loads(capsys.readouterr().out)["steps"] == 40
+
+
+def test_more_shards_than_cores_warns(monkeypatch, capsys):
+    monkeypatch.setattr("os.cpu_count", lambda: 1)
+    assert main(["--headless", "--steps", "40", "--shards", "2"]) == 0
+    captured = capsys.readouterr()
+    assert "2 shards on 1 CPU core" in captured.err
+    assert json.loads(captured.out)["steps"] == 40
@@ -0,0 +1,63 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from traffic_sim.metrics.collectors import Metrics
+from traffic_sim.metrics.sketch import QuantileSketch
+
+
+def record(metrics, times):
+    for tt in times:
+        metrics.on_enter()
+        metrics.on_exit(tt, SimpleNamespace(enter_time_s=0.0))
+
+
+def test_summary_matches_exact_statistics():
+    rng = random.Random(1)
+    times = [rng.expovariate(1 / 60.0) for _ in range(5000)]
+    metrics = Metrics()
+    record(metrics, times)
+    summary = metrics.summary()
+
+    assert summary["avg_travel_time_s"] == round(sum(times) / len(times), 2)
+    ordered = sorted(times)
+    for key, q in (("p50_travel_time_s", 0.5), ("p90_travel_time_s", 0.9), ("p99_travel_time_s", 0.99)):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert summary[key] == pytest.approx(exact, rel=0.02)
+
+
+def test_merge_equals_single_collector():
+    rng = random.Random(2)
+    times = [rng.uniform(0, 300) for _ in range(2000)]
+    whole, left, right = Metrics(), Metrics(), Metrics()
+    record(whole, times)
+    record(left, times[:700])
+    record(right, times[700:])
+    left.merge(right)
+
+    assert left.travel_sketch.buckets == whole.travel_sketch.buckets
+    assert left.variance() == pytest.approx(whole.variance())
+    assert left.summary() == whole.summary()
+
+
+def test_sketch_memory_is_bounded():
+    sketch = QuantileSketch(max_buckets=64)
+    for i in range(1, 100000):
+        sketch.add(i * 0.37)
+    assert len(sketch.buckets) <= 64
+    assert sketch.quantile(0.99) == pytest.approx(0.99 * 99999 * 0.37, rel=0.02)
+
+
+def test_sketch_sorts_buckets_only_after_a_new_one():
+    sketch = QuantileSketch()
+    for x in (5.0, 1.0, 3.0):
+        sketch.add(x)
+    assert sketch.quantile(0.5) == pytest.approx(3.0, rel=0.01)
+    keys = sketch._keys
+    sketch.add(3.0)  # same bucket: the sorted keys are reused
+    assert sketch._keys is keys and sketch.quantile(0.5) == pytest.approx(3.0, rel=0.01)
+    sketch.add(0.5)
+    sketch.add(0.6)
+    assert sketch.quantile(0.0) == pytest.approx(0.5, rel=0.01)
+    assert sketch._keys == sorted(sketch.buckets)
@@ -11,3 +11,136 @@ def test_fixed_cycle_decisions():
     assert policy.decide(None, 17.9) == ("EW", "GREEN")
     assert policy.decide(None, 18.0) == ("EW", "YELLOW")
     assert policy.decide(None, 21.5) == ("NS", "GREEN")
+
+
+def test_fixed_cycle_batch_matches_scalar():
+    import numpy as np
+
+    from traffic_sim.models.traffic_light import COLOR_NAMES, DIR_NAMES
+
+    policy = FixedCyclePolicy(green_ns=7, yellow_ns=2, green_ew=5, yellow_ew=3)
+    offsets = np.arange(0.0, 13.0, 0.5)
+    for now in np.arange(0.0, 60.0, 0.25).tolist():
+        dirs, colors = policy.decide_batch([None] * len(offsets), now, offsets)
+        expected = [policy.decide(None, now + off) for off in offsets.tolist()]
+        assert [(DIR_NAMES[d], COLOR_NAMES[c]) for d, c in zip(dirs, colors)] == expected
+
+
+def test_actuated_batch_matches_per_node_decisions():
+    from types import SimpleNamespace
+
+    import numpy as np
+
+    from traffic_sim.control.actuated import ActuatedPolicy
+    from traffic_sim.models.traffic_light import COLOR_NAMES, DIR_NAMES
+
+    queued = SimpleNamespace(road=SimpleNamespace(length_m=50.0), pos_m=40.0)
+    nodes = [
+        SimpleNamespace(vehicles_for=lambda d, q=(i % 3 == 0): [queued] if q and d == "NS" else [])
+        for i in range(9)
+    ]
+    offsets = np.arange(len(nodes)) * 1.5
+    scalar, batch = ActuatedPolicy(), ActuatedPolicy()
+    for now in np.arange(0.0, 120.0, 0.25).tolist():
+        dirs, colors = batch.decide_batch(nodes, now, offsets)
+        expected = [scalar.decide(node, now + off) for node, off in zip(nodes, offsets.tolist())]
+        assert [(DIR_NAMES[d], COLOR_NAMES[c]) for d, c in zip(dirs, colors)] == expected
+
+
+def _drive(policy, nodes, seconds, dt=0.5):
+    import numpy as np
+
+    offsets = np.zeros(len(nodes))
+    return [tuple(map(np.ndarray.tolist, policy.decide_batch(nodes, step * dt, offsets)))
+            for step in range(int(seconds / dt))]
+
+
+def test_actuated_policy_reused_for_a_new_world():
+    from types import SimpleNamespace
+
+    from traffic_sim.control.actuated import ActuatedPolicy
+
+    def world():
+        return [SimpleNamespace(vehicles_for=lambda d: []) for _ in range(9)]
+
+    policy = ActuatedPolicy()
+    nodes = world()
+    _drive(policy, nodes, 30.0)
+    del nodes  # a new world may land on the old nodes' addresses
+    assert _drive(policy, world(), 60.0) == _drive(ActuatedPolicy(), world(), 60.0)
+
+
+def _queue_env(policy, seconds, t0=0.0, nodes=4, dt=0.5, seed=0):
+    """Toy junctions: NS gets most arrivals, a green approach serves one car per tick."""
+    from types import SimpleNamespace
+
+    import numpy as np
+
+    from traffic_sim.models.traffic_light import COLOR_NAMES, DIR_NAMES
+
+    rng = np.random.default_rng(seed)
+    queues = [{"NS": 0, "EW": 0} for _ in range(nodes)]
+    car = SimpleNamespace(road=SimpleNamespace(length_m=50.0), pos_m=45.0)
+    inters = [SimpleNamespace(vehicles_for=lambda d, q=q: [car] * q[d]) for q in queues]
+    offsets = np.zeros(nodes)
+    total = 0
+    for step in range(int(seconds / dt)):
+        dirs, colors = policy.decide_batch(inters, t0 + step * dt, offsets)
+        for q, d, c in zip(queues, dirs.tolist(), colors.tolist()):
+            q["NS"] += rng.random() < 0.5 * dt
+            q["EW"] += rng.random() < 0.15 * dt
+            if COLOR_NAMES[c] == "GREEN":
+                q[DIR_NAMES[d]] = max(0, q[DIR_NAMES[d]] - 1)
+            total += q["NS"] + q["EW"]
+    return total / (seconds / dt) / nodes
+
+
+def test_qlearning_learns_to_beat_long_greens(tmp_path):
+    from traffic_sim.control.rl_qlearning import QLearningPolicy
+
+    policy = QLearningPolicy(seed=1)
+    _queue_env(policy, 8000)
+    assert policy.decisions > 5000 and policy.q.any()
+    policy.learning = False
+    trained = _queue_env(policy, 1000, t0=8000, seed=5)
+    untrained = _queue_env(QLearningPolicy(learning=False), 1000, seed=5)
+    assert trained < 0.6 * untrained
+
+    policy.save(tmp_path / "q.npz")
+    loaded = QLearningPolicy.load(tmp_path / "q.npz", learning=False)
+    assert (loaded.q == policy.q).all() and loaded.decisions == policy.decisions
+
+
+def test_qlearning_trains_across_episodes():
+    from traffic_sim.control.rl_qlearning import QLearningPolicy
+
+    policy = QLearningPolicy(seed=1)
+    per_episode = []
+    for episode in range(4):  # each episode is a fresh set of junctions from t=0
+        before = policy.decisions
+        _queue_env(policy, 500, seed=episode)
+        per_episode.append(policy.decisions - before)
+    assert min(per_episode) > 0.8 * max(per_episode)
+
+
+def test_qlearning_batch_matches_per_node_decisions():
+    from types import SimpleNamespace
+
+    import numpy as np
+
+    from traffic_sim.control.rl_qlearning import QLearningPolicy
+    from traffic_sim.models.traffic_light import COLOR_NAMES, DIR_NAMES
+
+    queued = SimpleNamespace(road=SimpleNamespace(length_m=50.0), pos_m=40.0)
+    nodes = [
+        SimpleNamespace(vehicles_for=lambda d, n=i % 4: [queued] * (n if d == "NS" else 3 - n))
+        for i in range(8)
+    ]
+    offsets = np.arange(len(nodes)) * 1.5
+    table = np.random.default_rng(0).normal(size=QLearningPolicy().q.shape)
+    scalar, batch = QLearningPolicy(learning=False), QLearningPolicy(learning=False)
+    scalar.q[:] = batch.q[:] = table
+    for now in np.arange(0.0, 120.0, 0.25).tolist():
+        dirs, colors = batch.decide_batch(nodes, now, offsets)
+        expected = [scalar.decide(node, now + off) for node, off in zip(nodes, offsets.tolist())]
+        assert [(DIR_NAMES[d], COLOR_NAMES[c]) for d, c in zip(dirs, colors)] == expected
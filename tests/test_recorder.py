@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from traffic_sim.batch import Scenario, build_simulation
+from traffic_sim.core.recorder import TraceReader, TrajectoryRecorder
+from traffic_sim.core.snapshot import WorldSnapshot
+
+
+def test_recorded_trace_replays_every_tick(tmp_path):
+    path = tmp_path / "run.trace"
+    scenario = Scenario(horizon_s=60.0)
+    live = []
+    with TrajectoryRecorder(path, chunk_ticks=16, grid=scenario.grid) as recorder:
+        sim = build_simulation(scenario, 5, recorder=recorder,
+                               render_fn=lambda world: live.append(WorldSnapshot.capture(world, 0.0)))
+        summary = sim.run()
+
+    with TraceReader(path) as reader:
+        assert len(reader) == sim.steps == len(live)
+        assert reader.grid == list(scenario.grid) and reader.n_roads == len(sim.world.roads)
+        for tick in (len(reader) - 1, 0, 37, 36, 100):  # out of order: seeks across chunks
+            snap = reader.snapshot(tick)
+            assert snap.time_s == tick * scenario.dt
+            expected = live[tick]
+            assert [(v, r, k) for v, r, _, k in snap.vehicles] == [(v, r, k) for v, r, _, k in expected.vehicles]
+            assert np.allclose([p for _, _, p, _ in snap.vehicles], [p for _, _, p, _ in expected.vehicles], atol=1e-4)
+        assert reader.snapshot(len(reader) - 1).summary["exited"] == summary["exited"]
+        assert reader.tick_at(30.1) == 120 and reader.time_at(120) == 30.0
+        with pytest.raises(IndexError):
+            reader.snapshot(len(reader))
+
+
+def test_recorder_stride_and_signals(tmp_path):
+    path = tmp_path / "sparse.trace"
+    with TrajectoryRecorder(path, every=4) as recorder:
+        sim = build_simulation(Scenario(horizon_s=20.0), 1, recorder=recorder)
+        sim.run()
+    with TraceReader(path) as reader:
+        assert len(reader) == (sim.steps + 3) // 4
+        assert reader.time_at(1) == 1.0 and reader.grid is None
+        signals = reader.snapshot(2).signals
+        assert len(signals) == len(sim.world.intersections)
+        assert all(d in ("NS", "EW") and c in ("RED", "YELLOW", "GREEN") for d, c in signals)
+
+
+def test_resumed_run_keeps_recording(tmp_path):
+    path = tmp_path / "resumed.trace"
+    recorder = TrajectoryRecorder(path, chunk_ticks=4)
+    sim = build_simulation(Scenario(horizon_s=10.0), 2, recorder=recorder)
+    sim.run()
+    sim.max_time = 100.0
+    sim.run()
+    recorder.close()
+    with TraceReader(path) as reader:
+        assert len(reader) == sim.steps == 401
+    with pytest.raises(RuntimeError):
+        recorder.record(sim.world, sim.clock.now(), sim.metrics)
+
+
+def test_truncated_trace_is_rejected(tmp_path):
+    path = tmp_path / "bad.trace"
+    path.write_bytes(b"TSTRACE1 not finished")
+    with pytest.raises(ValueError):
+        TraceReader(path)
@@ -0,0 +1,113 @@
+import math
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pytest
+
+from traffic_sim.models.grid_world import build_world_from_grid
+from traffic_sim.models.vehicle import Vehicle
+from traffic_sim.scenarios import GRID
+from traffic_sim.ui import network_renderer
+from traffic_sim.ui.network_renderer import LOD_PX, NetworkRenderer, _sprite_angle
+from traffic_sim.ui.pygame_tiles import PygameTilesRenderer
+
+
+@pytest.fixture
+def updates(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pygame.display, "update", lambda rects: calls.append(list(rects)))
+    monkeypatch.setattr(pygame.display, "flip", lambda: calls.append("flip"))
+    return calls
+
+
+def same_pixels(a, b, rect):
+    return pygame.image.tobytes(a.subsurface(rect), "RGB") == pygame.image.tobytes(b.subsurface(rect), "RGB")
+
+
+def test_tiles_renderer_updates_only_the_rects_cars_touched(updates):
+    world = build_world_from_grid(GRID)
+    road = max(world.roads, key=lambda rd: rd.length_m)
+    car = Vehicle(id=1, road=road, pos_m=0.0, kind="taxi", sprite_key="taxi")
+    world.add_vehicle(car)
+    renderer = PygameTilesRenderer(world, GRID)
+    try:
+        renderer.render_frame()
+        assert updates == ["flip"]
+        (old,) = renderer._drawn
+
+        car.pos_m = road.length_m  # far enough that old and new rects don't overlap
+        renderer.render_frame()
+        (new,) = renderer._drawn
+        assert not old.colliderect(new)
+        assert updates[1] == [old, new]  # the erased rect and the redrawn one, nothing else
+
+        # the car left no trail: its old spot shows the background again
+        assert same_pixels(renderer.screen, renderer.background, old)
+        assert not same_pixels(renderer.screen, renderer.background, new)
+
+        renderer.render_frame()  # nothing moved: the same rect is erased and redrawn
+        assert updates[2] == [new, new]
+    finally:
+        renderer.close()
+
+
+@pytest.fixture
+def rotations(monkeypatch):
+    calls = []
+    rotate = pygame.transform.rotate
+    def counting(surf, angle):
+        calls.append(angle)
+        return rotate(surf, angle)
+    monkeypatch.setattr(network_renderer.pygame.transform, "rotate", counting)
+    return calls
+
+
+def _cars_everywhere(world, keys, steps=20):
+    return [(rd, rd.length_m * i / steps, key)
+            for rd in world.roads for i in range(steps + 1) for key in keys]
+
+
+def test_network_renderer_rotates_each_heading_once(rotations):
+    world = build_world_from_grid(GRID)
+    renderer = NetworkRenderer(world, lod_threshold=10**9)
+    cars = _cars_everywhere(world, list(renderer.cars_scaled)[:2])
+    renderer.draw_cars(cars)
+    assert rotations and len(rotations) == len(renderer._rotated)
+    n = len(rotations)
+    renderer.draw_cars(cars)  # same headings again: served from the cache
+    renderer.draw_cars(reversed(cars))
+    assert len(rotations) == n
+
+
+def test_network_renderer_rotation_cache_stays_bounded(rotations):
+    world = build_world_from_grid(GRID)
+    renderer = NetworkRenderer(world, lod_threshold=10**9)
+    key = next(iter(renderer.cars_scaled))
+    headings = {_sprite_angle(math.cos(a / 10), math.sin(a / 10)) for a in range(0, 630)}
+    assert headings == set(range(360))
+    for angle in headings:
+        renderer._sprite(key, angle)
+    renderer.draw_cars(_cars_everywhere(world, [key], steps=200))
+    assert len(renderer._rotated) == len(rotations) == 360
+
+
+def test_network_renderer_draws_squares_past_the_lod_threshold(rotations):
+    world = build_world_from_grid(GRID)
+    renderer = NetworkRenderer(world, lod_threshold=3)
+    key = next(iter(renderer.cars_scaled))
+    road = world.roads[0]
+    cars = [(road, road.length_m * i / 4, key) for i in range(4)]
+    renderer.draw_roads()
+
+    renderer.draw_cars(cars[:3])  # at the threshold: sprites
+    assert rotations and all(r.size != (LOD_PX, LOD_PX) for r in renderer._drawn)
+
+    del rotations[:]
+    renderer._begin_frame()
+    renderer.draw_cars(cars)  # past it: one cheap square per car, no sprites
+    assert not rotations
+    assert [r.size for r in renderer._drawn] == [(LOD_PX, LOD_PX)] * 4
+    colour = renderer.screen.get_at(renderer._drawn[0].center)[:3]
+    assert colour == renderer._lod_color(key)
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from traffic_sim.batch import build_simulation, scenario_from_dict
+from traffic_sim.bench import synthetic_grid
+from traffic_sim.server import SimulationServer, ws_accept_key, ws_frame, ws_read
+
+SCENARIO = {"grid": synthetic_grid(8), "horizon_s": 30.0, "demand": {"type": "poisson", "rate_per_s": 0.5}}
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def expected_summary(seed, **changes):
+    sim = build_simulation(scenario_from_dict({**SCENARIO, **changes}), seed)
+    return sim.run()
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_sessions_step_run_and_report(workers):
+    async def scenario():
+        async with SimulationServer(port=0, workers=workers, slice_ticks=7) as server:
+            port = server.port
+            code, first = await request(port, "POST", "/sessions", {"scenario": SCENARIO, "seed": 3})
+            assert code == 201 and first["steps"] == 0
+            sid = first["id"]
+            code, stepped = await request(port, "POST", f"/sessions/{sid}/step", {"ticks": 10})
+            assert code == 200 and stepped["steps"] == 10
+            code, snap = await request(port, "GET", f"/sessions/{sid}/snapshot")
+            assert code == 200 and snap["time_s"] == stepped["time_s"]
+            assert all(isinstance(road, str) for _, road, _, _ in snap["vehicles"])
+            code, done = await request(port, "POST", f"/sessions/{sid}/run", {})
+            assert done["done"] and done["summary"] == expected_summary(3)
+            code, metrics = await request(port, "GET", f"/sessions/{sid}/metrics")
+            assert metrics["entered"] == done["summary"]["entered"]
+            code, listing = await request(port, "GET", "/sessions")
+            assert [s["id"] for s in listing["sessions"]] == [sid]
+            assert (await request(port, "DELETE", f"/sessions/{sid}"))[0] == 200
+            assert (await request(port, "GET", f"/sessions/{sid}"))[0] == 404
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_concurrent_steps_add_up(workers):
+    async def scenario():
+        async with SimulationServer(port=0, workers=workers, slice_ticks=4) as server:
+            port = server.port
+            sid = (await request(port, "POST", "/sessions", {"scenario": SCENARIO}))[1]["id"]
+            replies = await asyncio.gather(*(request(port, "POST", f"/sessions/{sid}/step", {"ticks": 10})
+                                             for _ in range(3)))
+            assert sorted(r["steps"] for _, r in replies) == [10, 20, 30]
+            code, stepped = await request(port, "POST", f"/sessions/{sid}/step", {"ticks": 5})
+            assert stepped["steps"] == 35
+    asyncio.run(scenario())
+
+
+def test_bad_requests_get_error_codes():
+    async def scenario():
+        async with SimulationServer(port=0, max_sessions=1) as server:
+            port = server.port
+            assert (await request(port, "POST", "/sessions", {"scenario": {"colour": 1}}))[0] == 400
+            assert (await request(port, "POST", "/sessions", {"scenario": {"dt": 0}}))[0] == 400
+            assert (await request(port, "POST", "/sessions", {"scenario": {"horizon_s": -5}}))[0] == 400
+            assert (await request(port, "GET", "/nowhere"))[0] == 404
+            code, created = await request(port, "POST", "/sessions", {})
+            assert code == 201
+            assert (await request(port, "POST", "/sessions", {}))[0] == 503
+            sid = created["id"]
+            assert (await request(port, "POST", f"/sessions/{sid}/step", {"ticks": 0}))[0] == 400
+
+            async def broken(sid):
+                raise KeyError("lane")
+            server.status = broken  # a KeyError inside a live session is not a missing session
+            assert (await request(port, "GET", f"/sessions/{sid}"))[0] == 500
+            del server.status
+            for until_s in ("nan", "inf"):
+                assert (await request(port, "POST", f"/sessions/{sid}/run", {"until_s": float(until_s)}))[0] == 400
+
+            def failing(*args):
+                raise RuntimeError("slice blew up")
+            server._lanes[0].host.advance = failing  # a slice error reaches the waiting request
+            code, reply = await request(port, "POST", f"/sessions/{sid}/run", {})
+            assert code == 500 and "slice blew up" in reply["error"]
+    asyncio.run(scenario())
+
+
+def test_interleaved_sessions_stay_reproducible_and_responsive():
+    n = 100
+
+    async def scenario():
+        async with SimulationServer(port=0, slice_ticks=10) as server:
+            sids = [(await server.create(SCENARIO, seed % 4))["id"] for seed in range(n)]
+            runs = [asyncio.ensure_future(server.run_until(sid, 30.0)) for sid in sids]
+            await asyncio.sleep(0)
+            latencies = []
+            while not all(run.done() for run in runs):
+                start = time.perf_counter()
+                await request(server.port, "GET", f"/sessions/{sids[0]}/metrics")
+                latencies.append(time.perf_counter() - start)
+            results = [run.result()["summary"] for run in runs]
+            return results, latencies
+
+    results, latencies = asyncio.run(scenario())
+    for seed in range(4):
+        assert all(r == expected_summary(seed) for r in results[seed::4])
+    # requests are answered between slices, not after the runs
+    assert len(latencies) > 10 and max(latencies) < 0.5
+
+
+def test_stream_pushes_summaries_over_websocket():
+    async def scenario():
+        async with SimulationServer(port=0, slice_ticks=20, stream_interval_s=0.0) as server:
+            sid = (await server.create(SCENARIO, 1))["id"]
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            key = "dGhlIHNhbXBsZSBub25jZQ=="
+            writer.write(f"GET /sessions/{sid}/stream HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                         f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                         "Sec-WebSocket-Version: 13\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            assert b" 101 " in head and ws_accept_key(key).encode() in head
+            updates = [json.loads((await ws_read(reader))[1])]
+            run = asyncio.ensure_future(server.run_until(sid, 30.0))
+            while updates[-1]["time_s"] <= 30.0:
+                updates.append(json.loads((await ws_read(reader))[1]))
+            await run
+            writer.write(ws_frame(0x8, b"\x03\xe8", mask=os.urandom(4)))
+            assert (await ws_read(reader))[0] == 0x8
+            writer.close()
+            return updates, run.result()
+
+    updates, final = asyncio.run(scenario())
+    assert updates[0]["steps"] == 0 and len(updates) == 1 + 121 // 20 + 1
+    assert [u["steps"] for u in updates] == sorted(u["steps"] for u in updates)
+    assert updates[-1]["summary"] == final["summary"]
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from traffic_sim.batch import Scenario, run_replication
+from traffic_sim.bench import synthetic_grid
+from traffic_sim.demand import BatchDemand
+from traffic_sim.models import array_engine, routing
+from traffic_sim.scenarios import PoissonSpawner
+from traffic_sim.sharding import ShardedSimulation, partition_tiles
+
+
+def test_sharded_run_matches_single_process():
+    scenario = Scenario(horizon_s=90.0)
+    sim = ShardedSimulation(scenario, seed=3, shards=2)
+    assert sim.run() == run_replication(scenario, 3)
+    assert sum(s["entered"] for s in sim.shard_summaries) == sim.metrics.summary()["entered"]
+
+
+def test_sharded_grid_with_cross_region_traffic_matches():
+    scenario = Scenario(grid=synthetic_grid(12), spawn_fn=PoissonSpawner(rate_per_s=2.0), horizon_s=60.0)
+    sim = ShardedSimulation(scenario, seed=5, shards=3)
+    summary = sim.run()
+    assert summary == run_replication(scenario, 5)
+    assert len(sim.shard_summaries) == 3 and all(s["entered"] > 0 for s in sim.shard_summaries)
+
+
+@pytest.mark.parametrize("shards", [2, 3])
+def test_saturated_entries_hold_cars_back_as_in_one_process(shards):
+    scenario = Scenario(grid=synthetic_grid(12), spawn_fn=BatchDemand(rates=3.0), horizon_s=60.0)
+    sim = ShardedSimulation(scenario, seed=5, shards=shards)
+    summary = sim.run()
+    assert summary == run_replication(scenario, 5)
+    assert summary["entered"] < 1000  # over 2000 arrivals get in without backpressure
+
+
+@pytest.mark.parametrize("option", [{"array_engine": True}, {"lazy": True}, {"mode": "hybrid"}])
+def test_sharded_run_rejects_other_engines_and_modes(option):
+    with pytest.raises(ValueError, match="fixed mode"):
+        ShardedSimulation(Scenario(**option), seed=1, shards=2)
+
+
+def test_partition_tiles_makes_balanced_column_strips():
+    tiles = [(r, c) for r in range(4) for c in range(6)]
+    owner = partition_tiles(tiles, 3)
+    sizes = [list(owner.values()).count(k) for k in range(3)]
+    assert sizes == [8, 8, 8]
+    assert all(owner[(r, c)] == c // 2 for r, c in tiles)
+    assert set(partition_tiles(tiles[:2], 5).values()) == {0, 1}
+
+
+def test_vectorized_route_draws_match_scalar_stream():
+    keys = [0, 1, 2**63 + 12345, 2**64 - 1]
+    hops = [0, 7, 3, 1000]
+    u_exit, u_pick = array_engine.route_draws(np.array(keys, dtype=np.uint64), np.array(hops))
+    for i, (key, hop) in enumerate(zip(keys, hops)):
+        assert routing.route_draws(key, hop) == (u_exit[i], u_pick[i])
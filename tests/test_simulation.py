@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from traffic_sim.control.fixed_cycle import FixedCyclePolicy
+from traffic_sim.core.event_bus import EventScheduler
+from traffic_sim.core.profiling import PhaseProfiler
+from traffic_sim.core.simulation import Simulation
+from traffic_sim.models.grid_world import build_world_from_grid
+from traffic_sim.scenarios import GRID, PoissonSpawner
+
+
+def run(mode, render_fn=None, rate=0.003):
+    random.seed(11)
+    world = build_world_from_grid(GRID)
+    sim = Simulation(world, FixedCyclePolicy(), PoissonSpawner(rate, seed=4),
+                     render_fn=render_fn, dt=0.25, max_time=3600.0, mode=mode)
+    return sim.run(), sim
+
+
+def test_hybrid_mode_skips_idle_time_with_identical_metrics():
+    fixed, fixed_sim = run("fixed")
+    hybrid, hybrid_sim = run("hybrid")
+    assert fixed["exited"] > 5
+    assert hybrid == fixed
+    assert hybrid_sim.clock.now() == fixed_sim.clock.now()
+    assert hybrid_sim.steps * 2 < fixed_sim.steps
+
+
+def test_hybrid_mode_renders_signal_changes():
+    frames = []
+    def render(world):
+        signal = world.intersections[0].signal
+        frames.append((signal.direction, signal.color))
+
+    run("hybrid", render_fn=render, rate=0.0)
+    assert len(set(frames)) == 4
+    assert len(frames) < 3600 / 0.25
+
+
+def test_event_scheduler_orders_by_time_then_insertion():
+    events = EventScheduler()
+    events.schedule(2.0, "b")
+    events.schedule(1.0, "a")
+    events.schedule(2.0, "c")
+    assert events.peek_time() == 1.0
+    assert [e.kind for e in events.pop_due(2.0)] == ["a", "b", "c"]
+    assert len(events) == 0
+
+
+def test_profiler_times_each_phase_and_captures_a_window():
+    def sim(profiler=None):
+        random.seed(0)
+        return Simulation(build_world_from_grid(GRID), FixedCyclePolicy(), PoissonSpawner(0.5, seed=1),
+                          dt=0.25, max_time=10.0, profiler=profiler)
+
+    seen = []
+    profiler = PhaseProfiler(capture_ticks=(5, 9))
+    profiler.add_hook(lambda tick, phase, seconds: seen.append((tick, phase)))
+    profiled = sim(profiler)
+    summary = profiled.run()
+
+    report = profiler.summary()
+    assert report["ticks"] == profiled.steps == 41
+    assert set(report["phases"]) == {"policy", "spawn", "world", "exits", "tick"}
+    assert report["phases"]["tick"]["total_s"] >= report["phases"]["world"]["total_s"]
+    assert "simulation.py" in report["cprofile"]
+    assert seen[:5] == [(0, "policy"), (0, "spawn"), (0, "world"), (0, "exits"), (0, "tick")]
+    assert summary == sim().run()
+
+
+def test_render_errors_are_not_swallowed():
+    def render(world, summary):
+        raise TypeError("bug in renderer")
+
+    with pytest.raises(TypeError, match="bug in renderer"):
+        run("fixed", render_fn=render, rate=0.5)
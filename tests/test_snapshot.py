@@ -0,0 +1,40 @@
+import random
+
+from traffic_sim.control.fixed_cycle import FixedCyclePolicy
+from traffic_sim.core.simulation import Simulation
+from traffic_sim.core.snapshot import SnapshotBuffer, WorldSnapshot
+from traffic_sim.models.grid_world import build_world_from_grid
+from traffic_sim.scenarios import GRID, spawn_city
+
+
+def test_buffer_keeps_newest_and_counts_dropped_frames():
+    buffer = SnapshotBuffer(max_fps=0)
+    snaps = [WorldSnapshot(float(t), (), ()) for t in range(3)]
+    for snap in snaps:
+        buffer.publish(snap)
+    prev, cur = buffer.acquire()
+    assert cur is snaps[2] and prev is None
+    assert buffer.dropped == 2
+
+    buffer.publish(WorldSnapshot(3.0, (), ()))
+    prev, cur = buffer.acquire()
+    assert prev is snaps[2] and cur.time_s == 3.0
+
+
+def test_interpolation_blends_cars_on_the_same_road():
+    prev = WorldSnapshot(0.0, ((1, 0, 2.0, "taxi"), (2, 0, 7.0, "van")), ())
+    cur = WorldSnapshot(1.0, ((1, 0, 4.0, "taxi"), (2, 3, 0.0, "van"), (3, 1, 0.0, "van")), ())
+    rows = cur.interpolate(prev, 0.5)
+    assert rows == ((1, 0, 3.0, "taxi"), (2, 3, 0.0, "van"), (3, 1, 0.0, "van"))
+
+
+def test_simulation_publishes_detached_snapshots():
+    random.seed(42)
+    world = build_world_from_grid(GRID)
+    buffer = SnapshotBuffer(max_fps=0)
+    sim = Simulation(world, FixedCyclePolicy(), spawn_city, dt=0.25, max_time=60.0, snapshots=buffer)
+    sim.run()
+    _, snap = buffer.acquire()
+    assert buffer.published == sim.steps and buffer.closed
+    assert len(snap.vehicles) == world.active_count()
+    assert len(snap.signals) == len(world.intersections)
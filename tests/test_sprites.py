@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from traffic_sim.ui.sprite_loader import SpriteInfo, load_scaled_cars
+
+INFOS = [SpriteInfo("a", (0, 0, 8, 16)), SpriteInfo("b", (8, 0, 8, 16))]
+
+
+def _write_sheet(path, color):
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    sheet = pygame.Surface((16, 16), pygame.SRCALPHA)
+    sheet.fill(color)
+    pygame.image.save(sheet, str(path))
+
+
+def test_scaled_sprites_are_cached_and_rebuilt_when_the_sheet_changes(tmp_path):
+    sheet, cache = tmp_path / "cars.png", tmp_path / "cache"
+    _write_sheet(sheet, (200, 10, 10, 255))
+
+    first = load_scaled_cars(str(sheet), (4, 8), overrides=INFOS, cache_dir=cache)
+    assert sorted(first) == ["a", "b"] and first["a"].get_size() == (4, 8)
+    assert len(list(cache.glob("*.png"))) == 1
+
+    again = load_scaled_cars(str(sheet), (4, 8), overrides=INFOS, cache_dir=cache)
+    assert list(again) == ["a", "b"]
+    assert again["b"].get_at((2, 4))[:3] == first["b"].get_at((2, 4))[:3]
+
+    _write_sheet(sheet, (10, 10, 200, 255))
+    changed = load_scaled_cars(str(sheet), (4, 8), overrides=INFOS, cache_dir=cache)
+    assert changed["a"].get_at((2, 4))[:3] == (10, 10, 200)
+    assert len(list(cache.glob("*.png"))) == 2
+
+
+def test_headless_modules_do_not_import_pygame():
+    code = (
+        "import sys, traffic_sim.batch, traffic_sim.__main__, traffic_sim.ui.viewer, "
+        "traffic_sim.ui.sprite_loader; sys.exit('pygame' in sys.modules)"
+    )
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
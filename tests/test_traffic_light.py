@@ -1,6 +1,6 @@
 import pytest
 
-from traffic_sim.models.traffic_light import TrafficLight
+from traffic_sim.models.traffic_light import Color, Direction, TrafficLight
 
 
 def test_set_state_and_queries():
@@ -21,3 +21,17 @@ def test_set_state_rejects_bad_values():
         light.set_state("BAD", "GREEN")
     with pytest.raises(AssertionError):
         light.set_state("NS", "BLUE")
+
+
+def test_string_api_is_backed_by_integer_codes():
+    light = TrafficLight("EW", "GREEN")
+    assert (light.dir_code, light.color_code) == (Direction.EW, Color.GREEN)
+    assert light.green_code == Direction.EW
+    light.color = "YELLOW"
+    assert light.direction == "EW" and light.green_code == -1
+    assert light == TrafficLight("EW", "YELLOW")
+    assert repr(light) == "TrafficLight(direction='EW', color='YELLOW')"
+    with pytest.raises(AttributeError):
+        light.extra = 1  # slotted
+    with pytest.raises(ValueError):
+        light.set_state("NS", "BLUE")
@@ -0,0 +1,204 @@
+import random
+
+import pytest
+
+from traffic_sim.models.grid_world import build_world_from_grid
+from traffic_sim.models.vehicle import Vehicle
+
+GRID = [list(row) for row in [
+    "  |  ",
+    "--+--",
+    "  |  ",
+]]
+
+
+def all_green(world, direction):
+    for inter in world.intersections:
+        inter.signal.set_state(direction, "GREEN")
+
+
+def test_queues_follow_spawn_transfer_and_exit():
+    random.seed(3)
+    world = build_world_from_grid(GRID)
+    road = next(r for r in world.roads if r.from_tile == (1, 0))
+    front = Vehicle(id=1, road=road, pos_m=6.0)
+    back = Vehicle(id=2, road=road, pos_m=0.0)
+    world.add_vehicle(back)
+    world.add_vehicle(front)
+    assert list(world.queue(road)) == [back, front]
+
+    all_green(world, "EW")
+    for _ in range(40):
+        world.tick(0.25)
+        for rd in world.roads:
+            cars = list(world.queue(rd))
+            assert all(v.road is rd and not v.finished for v in cars)
+            assert [v.pos_m for v in cars] == sorted(v.pos_m for v in cars)
+        queued = sum(len(world.queue(rd)) for rd in world.roads)
+        assert queued == sum(1 for v in world.vehicles if not v.finished)
+    assert front.road is not road
+
+
+def test_directly_appended_vehicles_are_queued():
+    world = build_world_from_grid(GRID)
+    road = world.roads[0]
+    car = Vehicle(id=1, road=road)
+    world.vehicles.append(car)
+    all_green(world, "NS")
+    world.tick(0.25)
+    assert car in world.queue(car.road)
+
+
+@pytest.mark.parametrize("array_engine", [False, True])
+def test_finished_vehicles_are_retired_and_reported(array_engine):
+    if array_engine:
+        pytest.importorskip("numpy")
+    random.seed(5)
+    world = build_world_from_grid(GRID, array_engine=array_engine)
+    entry = next(r for r in world.roads if r.from_tile == (1, 0))
+    exits = 0
+    for step in range(2000):
+        if step % 4 == 0:
+            world.add_vehicle(Vehicle(id=step, road=entry))
+        all_green(world, "EW" if (step // 40) % 2 else "NS")
+        for v in world.tick(0.25):
+            assert v.finished
+            exits += 1
+    assert exits > 100
+    assert world.active_count() == sum(1 for v in world.vehicles if not v.finished)
+    assert len(world.vehicles) <= 2 * world.active_count() + 4
+
+
+def test_route_index_tracks_added_and_removed_roads():
+    world = build_world_from_grid(GRID)
+    east = next(r for r in world.roads if r.from_tile == (1, 2) and r.to_tile == (1, 3))
+    incoming = next(r for r in world.roads if r.to_tile == (1, 2) and r.from_tile == (1, 1))
+    assert world.route_index().routes[incoming][1] == [east]
+
+    world.remove_road(east)
+    _, cands, _ = world.route_index().routes[incoming]
+    assert east not in cands and cands
+
+    world.add_road(east)
+    assert world.route_index().routes[incoming][1] == [east]
+
+
+@pytest.mark.parametrize("array_engine", [False, True])
+def test_detector_counts_track_cars_near_the_stop_line(array_engine):
+    from traffic_sim.batch import Scenario, build_simulation
+    from traffic_sim.bench import synthetic_grid
+    from traffic_sim.control.actuated import ActuatedPolicy
+    from traffic_sim.scenarios import PoissonSpawner
+
+    def scanned(world):
+        return [inter.queue_count(d, inter.detector_m + 1e-9) for inter in world.intersections for d in ("NS", "EW")]
+
+    checked = []
+
+    def check(world):
+        counts = [inter.occupancy[d] for inter in world.intersections for d in ("NS", "EW")]
+        assert counts == scanned(world)
+        checked.append(sum(counts))
+
+    scenario = Scenario(grid=synthetic_grid(8), spawn_fn=PoissonSpawner(rate_per_s=2.0),
+                        policy=ActuatedPolicy(), horizon_s=40.0, array_engine=array_engine)
+    build_simulation(scenario, 2, render_fn=check).run()
+    assert max(checked) > 0
+
+
+def test_intersection_lists_its_approaches_and_queue():
+    world = build_world_from_grid(GRID)
+    road = next(r for r in world.roads if r.from_tile == (1, 0))
+    inter = road.to_intersection
+    assert road in inter.incoming["EW"] and len(inter.incoming["EW"]) == 2 and "NS" not in inter.incoming
+    far = Vehicle(id=1, road=road, pos_m=0.0)
+    world.add_vehicle(far)
+    world.add_vehicle(Vehicle(id=2, road=road, pos_m=7.0))
+    assert inter.vehicles_for("EW")[0] is far
+    assert inter.queue_count("EW") == 2 and inter.queue_count("EW", window_m=4.0) == 1
+    assert inter.queue_count("NS") == 0
+
+
+def test_compressed_grid_merges_straight_tiles():
+    from traffic_sim.bench import synthetic_grid
+
+    grid = synthetic_grid(24)
+    full = build_world_from_grid(grid)
+    small = build_world_from_grid(grid, compress=True)
+    assert len(small.intersections) * 4 < len(full.intersections)
+    assert len(small.roads) * 3 < len(full.roads)
+    # same tiles covered, so the same total road length
+    assert sum(r.length_m for r in small.roads) == sum(r.length_m for r in full.roads)
+    nodes = {r.to_tile for r in small.roads}
+    assert all(grid[r][c] == "+" or r in (0, 23) or c in (0, 23) for r, c in nodes)
+
+
+def test_compression_is_an_order_of_magnitude_on_realistic_blocks(monkeypatch):
+    from traffic_sim.bench import synthetic_grid
+    from traffic_sim.control.fixed_cycle import FixedCyclePolicy
+    from traffic_sim.core.simulation import Simulation
+    from traffic_sim.models.world import World
+    from traffic_sim.scenarios import PoissonSpawner
+
+    driven = []  # length of every road a car left through a junction
+    choose = World._choose_next_road
+    monkeypatch.setattr(World, "_choose_next_road", lambda w, rd, v: driven.append(rd.length_m) or choose(w, rd, v))
+
+    grid = synthetic_grid(80, block=20)  # 160 m blocks of 8 m tiles
+    counts = []
+    for compress in (False, True):
+        random.seed(0)
+        driven.clear()
+        world = build_world_from_grid(grid, compress=compress)
+        Simulation(world, FixedCyclePolicy(), PoissonSpawner(1.0, seed=1), dt=0.25, max_time=300.0).run()
+        counts.append((len(world.intersections), len(world.roads), len(driven) / sum(driven)))
+    (nodes, roads, per_m), (c_nodes, c_roads, c_per_m) = counts
+    assert nodes >= 10 * c_nodes and roads >= 10 * c_roads
+    assert per_m >= 10 * c_per_m  # transfers per metre driven
+
+
+def test_compressed_road_follows_corners():
+    grid = [list(row) for row in [
+        "  |   ",
+        "--+-L ",
+        "    | ",
+        "    | ",
+    ]]
+    world = build_world_from_grid(grid, compress=True)
+    road = next(r for r in world.roads if r.from_tile == (1, 2) and r.to_tile == (3, 4))
+    assert road.length_m == 32.0 and road.approach_dir == "NS"
+    assert road.screen_points == [(160, 96), (288, 96), (288, 224)]
+    back = next(r for r in world.roads if r.from_tile == (3, 4))
+    assert back.to_tile == (1, 2) and back.approach_dir == "EW"
+
+    all_green(world, "NS")
+    v = Vehicle(id=1, road=road, pos_m=30.0, target_speed=10.0)
+    world.add_vehicle(v)
+    world.tick(1.0)
+    assert v.road is not road or v.finished
+
+
+def test_can_go_flags_follow_the_signals():
+    world = build_world_from_grid(GRID)
+    roads = world.route_index().roads
+    for direction in ("NS", "EW"):
+        all_green(world, direction)
+        flags = world.refresh_signals()
+        assert flags == [rd.to_intersection.signal.is_green_for(rd.approach_dir) for rd in roads]
+        assert any(flags) and not all(flags)
+
+
+def test_signal_bank_sees_signals_set_outside_it():
+    import numpy as np
+
+    from traffic_sim.models.traffic_light import Color, Direction
+
+    world = build_world_from_grid(GRID)
+    bank = world.signal_bank()
+    n = len(bank)
+    green_ns = (np.full(n, Direction.NS, dtype=np.int8), np.full(n, Color.GREEN, dtype=np.int8))
+    bank.apply(*green_ns)
+    world.intersections[0].signal.set_state("EW", "RED")  # e.g. a per-node policy
+    world.signal_bank().apply(*green_ns)
+    assert world.intersections[0].signal.color == "GREEN"
+    assert world.intersections[0].signal.direction == "NS"
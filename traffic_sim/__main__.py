@@ -1,55 +1,174 @@
-import random
-from traffic_sim.core.simulation import Simulation
+"""Run one simulation, in a window or headless.
+
+    python -m traffic_sim                                  # demo window
+    python -m traffic_sim city.json --headless --seed 7 --format csv
+    python -m traffic_sim --headless --record run.trace    # save every tick
+    python -m traffic_sim --replay run.trace               # watch it later
+
+Headless runs print the metrics summary and throughput (steps per second)
+as JSON or CSV and never import pygame. ``--profile`` adds per-phase
+timings of each tick.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from traffic_sim.batch import Scenario, apply_overrides, build_simulation, load_scenario
 from traffic_sim.control.fixed_cycle import FixedCyclePolicy
-from traffic_sim.models.grid_world import build_world_from_grid
-from traffic_sim.models.world import World
-from traffic_sim.models.vehicle import Vehicle
-from traffic_sim.ui.network_renderer import NetworkRenderer
-
-# Simple four-way layout: a single central intersection with straight
-# north/south and east/west approaches extending to the map edges. This keeps
-# the rendering architecture intact while giving a minimal scene that's easier
-# to parse.
-GRID_STR = [
-    "    |    ",
-    "    |    ",
-    "----+----",
-    "    |    ",
-    "    |    ",
-]
-GRID = [list(row) for row in GRID_STR]
-CAR_KINDS = ["police","taxi","sports_blue","van","sports_yellow","ambulance","sedan_red","motor_blue","motor_red"]
-
-def spawn_city(now_s: float, world: World):
-    spawned = []
-    # keep car count reasonable
-    if sum(1 for v in world.vehicles if not v.finished) > 50:
-        return spawned
-    if random.random() < 0.25:
-        # any entry road whose from_tile is on the border
-        H, W = world._grid_size
-        entries = [r for r in world.roads
-                   if r.from_tile[0] in (0, H-1) or r.from_tile[1] in (0, W-1)]
-        if entries:
-            rd = random.choice(entries)
-            kind = random.choice(CAR_KINDS)
-            vid = len(world.vehicles) + 1
-            car = Vehicle(id=vid, road=rd, pos_m=0.0, enter_time_s=now_s,
-                          kind=kind, sprite_key=kind)
-            car.target_speed *= random.uniform(0.9, 1.1)
-            world.vehicles.append(car)
-            spawned.append(car)
-    return spawned
+from traffic_sim.core.profiling import PhaseProfiler
+from traffic_sim.core.recorder import TrajectoryRecorder
 
-if __name__ == "__main__":
-    random.seed(42)
-    world = build_world_from_grid(GRID)
-    policy = FixedCyclePolicy(green_ns=7, yellow_ns=2, green_ew=7, yellow_ew=2)
-    renderer = NetworkRenderer(world)
 
-    def render(_world, summary):
-        renderer.frame(summary)
+def demo_scenario() -> Scenario:
+    """The built-in four-way scenario shown by ``python -m traffic_sim``."""
+    return Scenario(policy=FixedCyclePolicy(green_ns=7, yellow_ns=2, green_ew=7, yellow_ew=2))
+
+
+def format_result(result: Dict[str, object], fmt: str) -> str:
+    if fmt == "json":
+        return json.dumps(result)
+    row = {k: v for k, v in result.items() if k not in ("summary", "profile")}
+    row.update(result["summary"])
+    for phase, stats in result.get("profile", {}).get("phases", {}).items():
+        row[f"{phase}_total_s"] = stats["total_s"]
+        row[f"{phase}_p99_ms"] = stats["p99_ms"]
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(row), lineterminator="\n")
+    writer.writeheader()
+    writer.writerow(row)
+    return out.getvalue().rstrip("\n")
+
+
+def run_headless(
+    scenario: Scenario,
+    seed: int,
+    profiler: PhaseProfiler | None = None,
+    shards: int = 1,
+    recorder: TrajectoryRecorder | None = None,
+) -> Dict[str, object]:
+    if shards > 1:
+        from traffic_sim.sharding import ShardedSimulation
+        sim = ShardedSimulation(scenario, seed, shards)
+    else:
+        sim = build_simulation(scenario, seed, profiler=profiler, recorder=recorder)
+    start = time.perf_counter()
+    try:
+        summary = sim.run()
+    finally:
+        if recorder is not None:
+            recorder.close()
+    wall_s = time.perf_counter() - start
+    result = {
+        "seed": seed,
+        "sim_time_s": sim.clock.now(),
+        "steps": sim.steps,
+        "wall_s": wall_s,
+        "steps_per_s": sim.steps / wall_s if wall_s > 0 else float("inf"),
+        "summary": summary,
+    }
+    if profiler is not None:
+        result["profile"] = profiler.summary()
+    return result
+
+
+def run_window(scenario: Scenario, seed: int, recorder: TrajectoryRecorder | None = None) -> Dict[str, float]:
+    # pygame is only pulled in here, when a window is actually opened
+    from traffic_sim.ui.network_renderer import NetworkRenderer
+    from traffic_sim.ui.viewer import run_decoupled
+
+    # the simulation runs at full speed; the window shows snapshots at 60 fps
+    sim = build_simulation(scenario, seed, recorder=recorder)
+    try:
+        return run_decoupled(sim, NetworkRenderer(sim.world))
+    finally:
+        if recorder is not None:
+            recorder.close()
 
-    sim = Simulation(world, policy, spawn_city, render_fn=render, dt=0.25, max_time=1e9)
-    summary = sim.run()
-    print("SUMMARY:", summary)
+
+def run_trace(path: str, scenario: Scenario, speed: float = 1.0) -> None:
+    """Replay a recorded trace in a window, on the map stored with it."""
+    from traffic_sim.core.recorder import TraceReader
+    from traffic_sim.models.grid_world import build_world_from_grid
+    from traffic_sim.ui.network_renderer import NetworkRenderer
+    from traffic_sim.ui.viewer import run_replay
+
+    with TraceReader(path) as reader:
+        grid = reader.grid or scenario.grid
+        world = build_world_from_grid([list(row) for row in grid], compress=reader.compress)
+        if len(world.roads) != reader.n_roads:
+            raise SystemExit(f"{path} was recorded on a different map")
+        run_replay(reader, NetworkRenderer(world, title=f"Replay: {path}"), speed=speed)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m traffic_sim", description=__doc__.splitlines()[0])
+    parser.add_argument("scenario", nargs="?", help="JSON scenario file (default: built-in demo)")
+    parser.add_argument("--headless", action="store_true", help="no window; print metrics and exit")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--horizon", type=float, default=None, help="simulated seconds")
+    parser.add_argument("--steps", type=int, default=None, help="number of ticks (overrides --horizon)")
+    parser.add_argument("--dt", type=float, default=None)
+    parser.add_argument("--mode", choices=("fixed", "hybrid"), default=None)
+    parser.add_argument("--array-engine", action="store_true")
+    parser.add_argument("--compress", action="store_true", help="merge straight road tiles into single roads")
+    parser.add_argument("--lazy", action="store_true", help="step only the cars that can interact")
+    parser.add_argument("--shards", type=int, default=1, help="split the map over this many processes")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--profile", action="store_true", help="time each phase of every tick")
+    parser.add_argument("--profile-ticks", type=int, nargs=2, metavar=("FIRST", "LAST"),
+                        help="also run cProfile over this tick window")
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc over --profile-ticks")
+    parser.add_argument("--record", metavar="TRACE", help="record every tick to this trajectory file")
+    parser.add_argument("--replay", metavar="TRACE", help="replay a recorded trace in a window")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (simulated s per wall s)")
+    parser.add_argument("-o", "--output", help="write the result here instead of stdout")
+    args = parser.parse_args(argv)
+
+    scenario = load_scenario(args.scenario) if args.scenario else demo_scenario()
+    if not args.headless and args.horizon is None and args.steps is None:
+        scenario.horizon_s = float("inf")  # the window runs until closed
+    apply_overrides(scenario, args)
+    if args.steps is not None:
+        scenario.horizon_s = (args.steps - 0.5) * scenario.dt  # half a tick of slack for float clocks
+
+    if args.replay:
+        run_trace(args.replay, scenario, args.speed)
+        return 0
+    if args.shards > 1 and args.record:
+        parser.error("--record needs a single-process run")
+    recorder = None
+    if args.record:
+        recorder = TrajectoryRecorder(args.record, grid=scenario.grid, compress=scenario.compress)
+
+    if not args.headless:
+        print("SUMMARY:", run_window(scenario, args.seed, recorder))
+        return 0
+
+    if args.shards > 1 and (args.profile or args.profile_ticks or scenario.array_engine
+                            or scenario.lazy or scenario.mode != "fixed"):
+        parser.error("--shards runs the object loop in fixed mode without profiling")
+    if args.shards > (os.cpu_count() or 1):
+        print(f"warning: {args.shards} shards on {os.cpu_count()} CPU core(s) will run slower "
+              "than a single process", file=sys.stderr)
+    profiler = None
+    if args.profile or args.profile_ticks:
+        profiler = PhaseProfiler(capture_ticks=args.profile_ticks, trace_memory=args.trace_memory)
+    result = run_headless(scenario, args.seed, profiler, args.shards, recorder)
+    text = format_result(result, args.format)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""Headless Monte Carlo replications of a scenario over a process pool.
+
+Run the demo scenario with 32 seeds on all cores::
+
+    python -m traffic_sim.batch --seeds 32
+
+or a scenario file (see :func:`load_scenario`) with
+``--scenario my_city.json``. Each replication's summary is printed as a JSON line as soon as it finishes,
+followed by the aggregate (means and confidence intervals).
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import math
+import os
+import random
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from .control.actuated import ActuatedPolicy
+from .control.fixed_cycle import FixedCyclePolicy
+from .control.policy_base import TrafficSignalPolicy
+from .control.rl_qlearning import QLearningPolicy
+from .core.simulation import Simulation
+from .demand import BatchDemand
+from .models.grid_world import build_world_from_grid
+from .scenarios import GRID_STR, PoissonSpawner, spawn_city
+
+
+@dataclass
+class Scenario:
+    """Everything needed to rebuild and run one simulation in a worker.
+
+    All fields must be picklable: ``spawn_fn`` has to be a module-level
+    function and ``policy`` is copied into every replication.
+    """
+
+    grid: Sequence[str] = field(default_factory=lambda: list(GRID_STR))
+    policy: TrafficSignalPolicy = field(default_factory=FixedCyclePolicy)
+    spawn_fn: Callable[[float, object], list] = spawn_city
+    dt: float = 0.25
+    horizon_s: float = 600.0
+    array_engine: bool = False
+    mode: str = "fixed"
+    compress: bool = False  # merge straight tiles into single roads
+    lazy: bool = False  # step only the cars that can interact (LazyEngine)
+
+
+POLICIES = {"fixed": FixedCyclePolicy, "actuated": ActuatedPolicy, "qlearning": QLearningPolicy}
+DEMANDS = {"city": spawn_city, "poisson": PoissonSpawner, "batch": BatchDemand}
+
+
+def scenario_from_dict(data: Dict[str, object]) -> Scenario:
+    """Build a :class:`Scenario` from a plain dict, e.g. a parsed JSON file::
+
+        {
+          "grid": ["    |    ", "----+----", "    |    "],
+          "policy": {"type": "fixed", "green_ns": 7, "green_ew": 7},
+          "demand": {"type": "poisson", "rate_per_s": 0.4},
+          "dt": 0.25, "horizon_s": 600, "mode": "hybrid"
+        }
+
+    Every key is optional. ``policy`` and ``demand`` take a ``type`` from
+    :data:`POLICIES` / :data:`DEMANDS`; the remaining keys are passed to it.
+    ``dt`` and ``horizon_s`` must be positive.
+    """
+    data = dict(data)
+    unknown = set(data) - (set(Scenario.__dataclass_fields__) - {"spawn_fn"}) - {"demand"}
+    if unknown:
+        raise ValueError(f"Unknown scenario keys: {sorted(unknown)}")
+    kwargs: Dict[str, object] = {}
+    if "grid" in data:
+        kwargs["grid"] = list(data.pop("grid"))
+    if "policy" in data:
+        spec = dict(data.pop("policy"))
+        kind = spec.pop("type", "fixed")
+        if kind not in POLICIES:
+            raise ValueError(f"Unknown policy {kind!r}; choose from {sorted(POLICIES)}")
+        kwargs["policy"] = POLICIES[kind](**spec)
+    if "demand" in data:
+        spec = dict(data.pop("demand"))
+        kind = spec.pop("type", "city")
+        if kind not in DEMANDS:
+            raise ValueError(f"Unknown demand {kind!r}; choose from {sorted(DEMANDS)}")
+        demand = DEMANDS[kind]
+        kwargs["spawn_fn"] = demand(**spec) if isinstance(demand, type) else demand
+    kwargs.update(data)
+    scenario = Scenario(**kwargs)
+    for name in ("dt", "horizon_s"):
+        if not getattr(scenario, name) > 0:  # also rejects NaN
+            raise ValueError(f"{name} must be positive")
+    return scenario
+
+
+def load_scenario(path: str) -> Scenario:
+    """Read a JSON scenario file; see :func:`scenario_from_dict` for the keys."""
+    with open(path, encoding="utf-8") as fh:
+        return scenario_from_dict(json.load(fh))
+
+
+def build_simulation(scenario: Scenario, seed: int, **kwargs) -> Simulation:
+    """Fresh world, policy and spawner for one run of ``scenario``.
+
+    Spawners with their own RNG (``reset(seed)``) are reseeded from ``seed``
+    unless the scenario pinned one. Extra ``kwargs`` go to :class:`Simulation`.
+    """
+    random.seed(seed)
+    world = build_world_from_grid([list(row) for row in scenario.grid],
+                                  array_engine=scenario.array_engine, compress=scenario.compress,
+                                  lazy=scenario.lazy)
+    policy = copy.deepcopy(scenario.policy)
+    spawn_fn = copy.deepcopy(scenario.spawn_fn)
+    if hasattr(spawn_fn, "reset"):
+        spawn_fn.reset(seed)
+    kwargs.setdefault("max_time", scenario.horizon_s)
+    return Simulation(world, policy, spawn_fn, dt=scenario.dt, mode=scenario.mode, **kwargs)
+
+
+def run_replication(scenario: Scenario, seed: int) -> Dict[str, float]:
+    """Run ``scenario`` once with ``seed`` and return its metrics summary."""
+    return build_simulation(scenario, seed).run()
+
+
+def iter_replications(
+    scenario: Scenario,
+    seeds: Iterable[int],
+    workers: int | None = None,
+) -> Iterator[Tuple[int, Dict[str, float]]]:
+    """Yield ``(seed, summary)`` pairs in completion order.
+
+    ``workers=1`` runs in-process, which is handy for debugging and tests.
+    """
+    seeds = list(seeds)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(seeds) <= 1:
+        for seed in seeds:
+            yield seed, run_replication(scenario, seed)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(seeds))) as pool:
+        futures = {pool.submit(run_replication, scenario, seed): seed for seed in seeds}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+
+def _t_within(t: float, df: int) -> float:
+    # P(|T| < t) for Student's t with integer df (Abramowitz & Stegun 26.7.3-4)
+    theta = math.atan(t / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    term = total = 1.0
+    if df % 2:
+        for k in range(1, (df - 1) // 2):
+            term *= 2 * k / (2 * k + 1) * c2
+            total += term
+        tail = math.sin(theta) * math.cos(theta) * total if df > 1 else 0.0
+        return 2 / math.pi * (theta + tail)
+    for k in range(1, df // 2):
+        term *= (2 * k - 1) / (2 * k) * c2
+        total += term
+    return math.sin(theta) * total
+
+
+def _t_critical(df: int, confidence: float) -> float:
+    """Two-sided Student-t critical value: P(|T| < t) = ``confidence``."""
+    if df == 1:
+        return math.tan(math.pi * confidence / 2)
+    if df == 2:
+        return confidence * math.sqrt(2 / (1 - confidence**2))
+    # Cornish-Fisher expansion around the normal quantile; exact enough for
+    # large df and a close start for Newton's method on the exact CDF below
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    g1 = (z**3 + z) / 4
+    g2 = (5 * z**5 + 16 * z**3 + 3 * z) / 96
+    g3 = (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384
+    t = z + g1 / df + g2 / df**2 + g3 / df**3
+    if df > 1000:
+        return t
+    log_norm = math.lgamma((df + 1) / 2) - math.lgamma(df / 2) - 0.5 * math.log(df * math.pi)
+    for _ in range(50):
+        density = 2 * math.exp(log_norm - (df + 1) / 2 * math.log1p(t * t / df))
+        step = (_t_within(t, df) - confidence) / density
+        t -= step
+        if abs(step) < 1e-12 * t:
+            break
+    return t
+
+
+def aggregate(summaries: Sequence[Dict[str, float]], confidence: float = 0.95) -> Dict[str, Dict[str, float]]:
+    """Mean and ``confidence`` interval for every numeric summary field."""
+    n = len(summaries)
+    out: Dict[str, Dict[str, float]] = {"mean": {}, "ci_low": {}, "ci_high": {}, "stdev": {}}
+    if not n:
+        return out
+    keys = [k for k, v in summaries[0].items() if isinstance(v, (int, float))]
+    for key in keys:
+        values = [float(s[key]) for s in summaries]
+        mean = statistics.fmean(values)
+        sd = statistics.stdev(values) if n > 1 else 0.0
+        half = _t_critical(n - 1, confidence) * sd / math.sqrt(n) if n > 1 else 0.0
+        out["mean"][key] = mean
+        out["stdev"][key] = sd
+        out["ci_low"][key] = mean - half
+        out["ci_high"][key] = mean + half
+    return out
+
+
+def run_replications(
+    scenario: Scenario,
+    seeds: Iterable[int],
+    workers: int | None = None,
+    confidence: float = 0.95,
+    on_result: Callable[[int, Dict[str, float]], None] | None = None,
+) -> Dict[str, object]:
+    """Run all seeds and return per-replication summaries plus the aggregate.
+
+    ``on_result`` is called for each replication as it finishes.
+    """
+    results: List[Dict[str, object]] = []
+    for seed, summary in iter_replications(scenario, seeds, workers):
+        results.append({"seed": seed, "summary": summary})
+        if on_result is not None:
+            on_result(seed, summary)
+    results.sort(key=lambda r: r["seed"])
+    return {
+        "replications": results,
+        "confidence": confidence,
+        **aggregate([r["summary"] for r in results], confidence),
+    }
+
+
+def apply_overrides(scenario: Scenario, args: argparse.Namespace) -> None:
+    """Let command-line flags win over the scenario file."""
+    if getattr(args, "policy", None):
+        scenario.policy = POLICIES[args.policy]()
+    if getattr(args, "dt", None) is not None:
+        scenario.dt = args.dt
+    if getattr(args, "horizon", None) is not None:
+        scenario.horizon_s = args.horizon
+    if getattr(args, "array_engine", False):
+        scenario.array_engine = True
+    if getattr(args, "mode", None):
+        scenario.mode = args.mode
+    if getattr(args, "compress", False):
+        scenario.compress = True
+    if getattr(args, "lazy", False):
+        scenario.lazy = True
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m traffic_sim.batch", description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", help="JSON scenario file (see load_scenario)")
+    parser.add_argument("--seeds", type=int, default=16, help="number of replications")
+    parser.add_argument("--base-seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default=None)
+    parser.add_argument("--dt", type=float, default=None)
+    parser.add_argument("--horizon", type=float, default=None, help="simulated seconds per replication")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--array-engine", action="store_true")
+    parser.add_argument("--compress", action="store_true", help="merge straight road tiles into single roads")
+    parser.add_argument("--lazy", action="store_true", help="step only the cars that can interact")
+    args = parser.parse_args(argv)
+
+    scenario = load_scenario(args.scenario) if args.scenario else Scenario()
+    apply_overrides(scenario, args)
+
+    def emit(seed, summary):
+        print(json.dumps({"seed": seed, "summary": summary}), flush=True)
+
+    seeds = range(args.base_seed, args.base_seed + args.seeds)
+    result = run_replications(scenario, seeds, args.workers, args.confidence, on_result=emit)
+    result.pop("replications")
+    print(json.dumps({"aggregate": result}), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
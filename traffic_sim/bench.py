@@ -0,0 +1,365 @@
+"""Scaling benchmarks for the simulation core.
+
+Sweep synthetic grids and vehicle densities, time the hot paths separately
+and store the numbers as a baseline; later runs can be compared against it::
+
+    python -m traffic_sim.bench --save benchmarks/baseline.json
+    python -m traffic_sim.bench --compare benchmarks/baseline.json --tolerance 0.5
+
+Cases (``kind/grid size/cars per road/variant``):
+
+* ``tick`` -- ``World.tick`` on a pre-filled network, object loop and array engine
+* ``run`` -- a headless ``Simulation.run`` with Poisson demand
+* ``policy`` -- one signal decision for every node, batched and per node
+* ``routing`` -- ``World._choose_next_road`` and rebuilding the route index
+
+Each case runs in a fresh process (unless ``--in-process``) so its peak RSS
+is its own. Two memory figures per tick are measured in a separate short
+run, so tracing does not slow the timed loop. ``peak_traced_kb_per_tick``
+is the tracemalloc high-water mark of a tick above the memory held before
+it. ``allocs_per_tick`` counts the memory blocks a tick allocates and
+leaves alive, from tracemalloc snapshots before and after it (the growth
+in blocks per allocation site, summed). Temporaries freed within the tick
+add to the peak but not to the count.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .control.fixed_cycle import FixedCyclePolicy
+from .control.policy_base import TrafficSignalPolicy
+from .core.simulation import Simulation
+from .models.grid_world import build_world_from_grid
+from .models.vehicle import Vehicle
+from .scenarios import PoissonSpawner, border_entries
+
+DT = 0.25
+SIZES = (20, 40, 80)
+DENSITIES = (0.25, 1.0)
+QUICK_SIZES = (12,)
+QUICK_DENSITIES = (0.5,)
+
+Case = Tuple[str, int, float, str]  # kind, grid size, cars per road, variant
+CASES_BY_KIND = {
+    "tick": ("object", "array"),
+    "run": ("object", "array"),
+    "policy": ("batch", "loop"),
+    "routing": ("object",),
+}
+LOWER_IS_BETTER = ("peak_rss_mb", "peak_traced_kb_per_tick", "allocs_per_tick")
+
+
+def synthetic_grid(size: int, block: int = 4) -> List[List[str]]:
+    """A ``size`` x ``size`` Manhattan grid with a street every ``block`` tiles."""
+    def tile(r: int, c: int) -> str:
+        on_row, on_col = r % block == 1, c % block == 1
+        return "+" if on_row and on_col else "-" if on_row else "|" if on_col else " "
+    return [[tile(r, c) for c in range(size)] for r in range(size)]
+
+
+def populated_world(size: int, density: float, array_engine: bool = False, seed: int = 0):
+    """Grid world with about ``density`` cars per road at random positions."""
+    rng = random.Random(seed)
+    world = build_world_from_grid(synthetic_grid(size), array_engine=array_engine)
+    for i in range(int(len(world.roads) * density)):
+        rd = rng.choice(world.roads)
+        world.add_vehicle(Vehicle(id=i, road=rd, pos_m=rng.uniform(0, rd.length_m)))
+    policy = FixedCyclePolicy()
+    for inter in world.intersections:
+        inter.apply_policy(policy, 0.0)
+    return world
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes vs KiB
+
+
+def _tick_memory(tick: Callable[[], None], n: int = 5) -> Dict[str, float]:
+    """``peak_traced_kb_per_tick`` and ``allocs_per_tick`` of ``n`` calls to ``tick``."""
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    try:
+        peak = 0
+        for _ in range(n):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            tick()
+            peak += tracemalloc.get_traced_memory()[1] - before
+        allocs = 0
+        for _ in range(n):
+            before = tracemalloc.take_snapshot().filter_traces(ignore)
+            tick()
+            after = tracemalloc.take_snapshot().filter_traces(ignore)
+            allocs += sum(stat.count_diff for stat in after.compare_to(before, "traceback") if stat.count_diff > 0)
+    finally:
+        tracemalloc.stop()
+    return {"peak_traced_kb_per_tick": peak / n / 1024, "allocs_per_tick": allocs / n}
+
+
+def _fastest(setup: Callable[[], Callable[[], Dict[str, int]]], repeats: int) -> Dict[str, float]:
+    """Rates from the fastest of ``repeats`` runs.
+
+    ``setup()`` (untimed) returns the timed loop, which reports how much work
+    it did, e.g. ``{"steps": 50}``; the result then holds ``steps_per_s``.
+    """
+    best = None
+    for _ in range(repeats):
+        loop = setup()
+        start = time.perf_counter()
+        counts = loop()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, counts)
+    elapsed, counts = best
+    return {f"{name}_per_s": n / elapsed for name, n in counts.items()}
+
+
+def bench_tick(size: int, density: float, variant: str, ticks: int, repeats: int = 3) -> Dict[str, float]:
+    def setup():
+        world = populated_world(size, density, array_engine=variant == "array")
+        world.tick(DT)  # warm-up: engine arrays, queues
+
+        def loop():
+            updates = 0
+            for _ in range(ticks):
+                updates += world.active_count()
+                world.tick(DT)
+            return {"steps": ticks, "veh_updates": updates}
+        return loop
+
+    world = populated_world(size, density, array_engine=variant == "array")
+    return {
+        "vehicles": len(world.vehicles),
+        **_fastest(setup, repeats),
+        **_tick_memory(lambda: world.tick(DT)),
+    }
+
+
+def _headless_sim(size: int, density: float, variant: str, ticks: int, counter: List[int]) -> Simulation:
+    world = populated_world(size, density, array_engine=variant == "array")
+    # pre-filled, then fed by arrivals at a rate that keeps traffic going
+    spawner = PoissonSpawner(rate_per_s=density * len(border_entries(world)) / 4, seed=0)
+
+    def spawn(now_s, w):
+        counter[0] += w.active_count()
+        return spawner(now_s, w)
+
+    return Simulation(world, FixedCyclePolicy(), spawn, dt=DT, max_time=(ticks - 1) * DT)
+
+
+def bench_run(size: int, density: float, variant: str, ticks: int, repeats: int = 3) -> Dict[str, float]:
+    def setup():
+        updates = [0]
+        sim = _headless_sim(size, density, variant, ticks, updates)
+
+        def loop():
+            sim.run()
+            return {"steps": sim.steps, "veh_updates": updates[0]}
+        return loop
+
+    sim = _headless_sim(size, density, variant, ticks, [0])
+    return {
+        "vehicles": len(sim.world.vehicles),
+        **_fastest(setup, repeats),
+        **_tick_memory(sim.step),
+    }
+
+
+def bench_policy(size: int, density: float, variant: str, ticks: int, repeats: int = 3) -> Dict[str, float]:
+    world = populated_world(size, density)
+    bank = world.signal_bank()
+    policy = FixedCyclePolicy()
+    decide = policy.decide_batch if variant == "batch" else (
+        lambda inters, now_s, offsets: TrafficSignalPolicy.decide_batch(policy, inters, now_s, offsets))
+
+    def step(now_s: float) -> None:
+        bank.apply(*decide(bank.intersections, now_s, bank.offsets))
+
+    def setup():
+        def loop():
+            for k in range(ticks):
+                step(k * DT)
+            return {"steps": ticks, "node_decisions": ticks * len(bank.intersections)}
+        return loop
+
+    return {
+        "nodes": len(bank.intersections),
+        **_fastest(setup, repeats),
+        **_tick_memory(lambda: step(0.0)),
+    }
+
+
+def bench_routing(size: int, density: float, variant: str, ticks: int, repeats: int = 3) -> Dict[str, float]:
+    world = populated_world(size, density)
+    rng = random.Random(0)
+    cars = [Vehicle(id=i, road=rng.choice(world.roads), route_key=rng.getrandbits(64))
+            for i in range(max(1, int(len(world.roads) * density)))]
+    choose = world._choose_next_road
+    builds = max(1, ticks // 5)
+
+    def setup_routes():
+        def loop():
+            for _ in range(ticks):
+                for v in cars:
+                    choose(v.road, v)
+            return {"routes": ticks * len(cars)}
+        return loop
+
+    def setup_builds():
+        def loop():
+            for _ in range(builds):
+                world.rebuild_routes()
+            return {"index_builds": builds}
+        return loop
+
+    return {
+        "roads": len(world.roads),
+        **_fastest(setup_routes, repeats),
+        **_fastest(setup_builds, repeats),
+        **_tick_memory(lambda: [choose(v.road, v) for v in cars]),
+    }
+
+
+BENCHES = {"tick": bench_tick, "run": bench_run, "policy": bench_policy, "routing": bench_routing}
+
+
+def case_key(case: Case) -> str:
+    kind, size, density, variant = case
+    return f"{kind}/{size}/{density:g}/{variant}"
+
+
+def run_case(case: Case, ticks: int, repeats: int = 3) -> Dict[str, float]:
+    kind, size, density, variant = case
+    result = BENCHES[kind](size, density, variant, ticks, repeats)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def iter_cases(kinds: Iterable[str], sizes: Sequence[int], densities: Sequence[float]) -> Iterable[Case]:
+    for kind in kinds:
+        for size in sizes:
+            for density in densities:
+                for variant in CASES_BY_KIND[kind]:
+                    yield kind, size, density, variant
+
+
+def run_suite(
+    cases: Iterable[Case],
+    ticks: int = 50,
+    repeats: int = 3,
+    isolate: bool = True,
+    on_result: Callable[[str, Dict[str, float]], None] | None = None,
+) -> Dict[str, Dict[str, float]]:
+    """Run every case and return ``{case_key: metrics}``."""
+    results: Dict[str, Dict[str, float]] = {}
+    for case in cases:
+        if isolate:
+            # a fresh interpreter per case, so peak RSS is not inherited
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                metrics = pool.submit(run_case, case, ticks, repeats).result()
+        else:
+            metrics = run_case(case, ticks, repeats)
+        results[case_key(case)] = metrics
+        if on_result is not None:
+            on_result(case_key(case), metrics)
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = 0.5,
+) -> List[str]:
+    """Describe every metric that got worse than ``baseline`` by more than ``tolerance``.
+
+    Rates (``*_per_s``) regress when they drop, memory figures when they
+    grow. Cases missing from either side are ignored.
+    """
+    problems = []
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for name, value in metrics.items():
+            old = base.get(name)
+            if not old or old != old or value != value:  # missing, zero or NaN
+                continue
+            if name.endswith("_per_s"):
+                change = (old - value) / old
+            elif name in LOWER_IS_BETTER:
+                change = (value - old) / old
+            else:
+                continue
+            if change > tolerance:
+                problems.append(f"{key} {name}: {old:.4g} -> {value:.4g} ({change:+.0%} worse)")
+    return problems
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m traffic_sim.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--kinds", nargs="+", choices=sorted(BENCHES), default=list(BENCHES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=None, help="grid side lengths in tiles")
+    parser.add_argument("--densities", nargs="+", type=float, default=None, help="cars per road")
+    parser.add_argument("--ticks", type=int, default=50, help="timed iterations per case")
+    parser.add_argument("--repeats", type=int, default=3, help="keep the fastest of this many runs")
+    parser.add_argument("--quick", action="store_true", help="one small grid, for smoke tests")
+    parser.add_argument("--in-process", action="store_true", help="don't isolate cases in subprocesses")
+    parser.add_argument("--save", help="write results to this baseline file")
+    parser.add_argument("--compare", help="baseline file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    densities = args.densities or (QUICK_DENSITIES if args.quick else DENSITIES)
+
+    def emit(key, metrics):
+        print(json.dumps({"case": key, **{k: round(v, 4) for k, v in metrics.items()}}), flush=True)
+
+    results = run_suite(iter_cases(args.kinds, sizes, densities), args.ticks, args.repeats,
+                        isolate=not args.in_process, on_result=emit)
+
+    if args.save:
+        doc = {
+            "meta": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "system": platform.system(),
+                "ticks": args.ticks,
+                "repeats": args.repeats,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(doc, fh, indent=1, sort_keys=True)
+            fh.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+        problems = compare(results, baseline, args.tolerance)
+        for line in problems:
+            print("REGRESSION", line, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
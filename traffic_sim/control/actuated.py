@@ -3,11 +3,26 @@ from __future__ import annotations
 
 from typing import Tuple
 
-from .policy_base import TrafficSignalPolicy
+import numpy as np
 
+from .policy_base import NodeStatePolicy, queued_count
+from ..models.traffic_light import COLOR_NAMES, DIR_NAMES, Color, Direction
 
-class ActuatedPolicy(TrafficSignalPolicy):
-    """Queue-detection-based signal switching with min/max green times."""
+
+class ActuatedPolicy(NodeStatePolicy):
+    """Queue-detection-based signal switching with min/max green times.
+
+    Each intersection runs its own controller. Their state (current direction,
+    color and phase start) is kept in arrays indexed by a per-node slot, which
+    lets :meth:`decide_batch` advance every node with array operations.
+    Reusing the policy for a new world starts that world's nodes afresh.
+    """
+
+    node_fields = (
+        ("direction", np.int8, Direction.NS),
+        ("color", np.int8, Color.GREEN),
+        ("phase_start", np.float64, 0.0),
+    )
 
     def __init__(
         self,
@@ -20,37 +35,62 @@ class ActuatedPolicy(TrafficSignalPolicy):
         self.max_green = float(max_green)
         self.yellow = float(yellow)
         self.queue_window_m = float(queue_window_m)
-        self.current_direction = "NS"
-        self.phase_start = 0.0
-        self.current_color = "GREEN"
+        super().__init__()
 
     def decide(self, intersection, now_s: float) -> Tuple[str, str]:
-        time_in_phase = now_s - self.phase_start
+        i = self._slot(intersection)
+        time_in_phase = now_s - self.phase_start[i]
 
-        if self.current_color == "GREEN":
+        if self.color[i] == Color.GREEN:
             if time_in_phase >= self.max_green:
-                self._switch_to_yellow(now_s)
-            elif time_in_phase >= self.min_green and not self._has_queue(intersection, self.current_direction):
-                self._switch_to_yellow(now_s)
+                self._switch_to_yellow(i, now_s)
+            elif time_in_phase >= self.min_green and not self._has_queue(
+                intersection, DIR_NAMES[self.direction[i]]
+            ):
+                self._switch_to_yellow(i, now_s)
 
-        elif self.current_color == "YELLOW":
+        elif self.color[i] == Color.YELLOW:
             if time_in_phase >= self.yellow:
-                self._switch_to_other_green(now_s)
+                self._switch_to_other_green(i, now_s)
+
+        return DIR_NAMES[self.direction[i]], COLOR_NAMES[self.color[i]]
+
+    def decide_batch(self, intersections, now_s: float, offsets: np.ndarray):
+        slots = self._bind(intersections)
+        now = now_s + offsets
+        color = self.color[slots]
+        time_in_phase = now - self.phase_start[slots]
+
+        green = color == Color.GREEN
+        to_yellow = green & (time_in_phase >= self.max_green)
+        check = np.flatnonzero(green & ~to_yellow & (time_in_phase >= self.min_green))
+        if check.size:
+            dirs = self.direction[slots[check]]
+            no_queue = [
+                not self._has_queue(intersections[k], DIR_NAMES[d])
+                for k, d in zip(check.tolist(), dirs.tolist())
+            ]
+            to_yellow[check[np.array(no_queue, dtype=bool)]] = True
+        to_green = (color == Color.YELLOW) & (time_in_phase >= self.yellow)
+
+        s = slots[to_yellow]
+        self.color[s] = Color.YELLOW
+        self.phase_start[s] = now[to_yellow]
+        s = slots[to_green]
+        self.direction[s] = 1 - self.direction[s]  # NS <-> EW
+        self.color[s] = Color.GREEN
+        self.phase_start[s] = now[to_green]
 
-        return self.current_direction, self.current_color
+        return self.direction[slots], self.color[slots]
 
-    def _switch_to_yellow(self, now_s: float) -> None:
-        self.current_color = "YELLOW"
-        self.phase_start = now_s
+    def _switch_to_yellow(self, i: int, now_s: float) -> None:
+        self.color[i] = Color.YELLOW
+        self.phase_start[i] = now_s
 
-    def _switch_to_other_green(self, now_s: float) -> None:
-        self.current_direction = "EW" if self.current_direction == "NS" else "NS"
-        self.current_color = "GREEN"
-        self.phase_start = now_s
+    def _switch_to_other_green(self, i: int, now_s: float) -> None:
+        self.direction[i] = Direction.EW if self.direction[i] == Direction.NS else Direction.NS
+        self.color[i] = Color.GREEN
+        self.phase_start[i] = now_s
 
     def _has_queue(self, intersection, direction: str) -> bool:
-        for vehicle in intersection.vehicles_for(direction):
-            distance_to_stop = vehicle.road.length_m - vehicle.pos_m
-            if distance_to_stop <= self.queue_window_m:
-                return True
-        return False
+        return queued_count(intersection, direction, self.queue_window_m) > 0
@@ -1,5 +1,13 @@
 from dataclasses import dataclass
+
+import numpy as np
+
 from .policy_base import TrafficSignalPolicy
+from ..models.traffic_light import Color, Direction
+
+# phase index (0..3) -> codes, in cycle order NS green, NS yellow, EW green, EW yellow
+_PHASE_DIRS = np.array([Direction.NS, Direction.NS, Direction.EW, Direction.EW], dtype=np.int8)
+_PHASE_COLORS = np.array([Color.GREEN, Color.YELLOW, Color.GREEN, Color.YELLOW], dtype=np.int8)
 
 @dataclass
 class FixedCyclePolicy(TrafficSignalPolicy):
@@ -8,6 +16,8 @@ class FixedCyclePolicy(TrafficSignalPolicy):
     green_ew: float = 8.0
     yellow_ew: float = 2.0
 
+    stateless = True
+
     def decide(self, intersection, now_s: float):
         cycle = self.green_ns + self.yellow_ns + self.green_ew + self.yellow_ew
         t = now_s % cycle
@@ -18,4 +28,29 @@ class FixedCyclePolicy(TrafficSignalPolicy):
         elif t < self.green_ns + self.yellow_ns + self.green_ew:
             return ("EW", "GREEN")
         else:
-            return ("EW", "YELLOW")
\ No newline at end of file
+            return ("EW", "YELLOW")
+
+    def decide_batch(self, intersections, now_s: float, offsets: np.ndarray):
+        cycle = self.green_ns + self.yellow_ns + self.green_ew + self.yellow_ew
+        t = (now_s + offsets) % cycle
+        bounds = np.array([
+            self.green_ns,
+            self.green_ns + self.yellow_ns,
+            self.green_ns + self.yellow_ns + self.green_ew,
+        ])
+        phase = np.searchsorted(bounds, t, side="right")
+        return _PHASE_DIRS[phase], _PHASE_COLORS[phase]
+
+    def next_change_time(self, now_s: float) -> float:
+        """Earliest time after ``now_s`` at which ``decide`` changes output."""
+        cycle = self.green_ns + self.yellow_ns + self.green_ew + self.yellow_ew
+        t = now_s % cycle
+        for boundary in (
+            self.green_ns,
+            self.green_ns + self.yellow_ns,
+            self.green_ns + self.yellow_ns + self.green_ew,
+            cycle,
+        ):
+            if t < boundary:
+                return now_s - t + boundary
+        return now_s - t + cycle
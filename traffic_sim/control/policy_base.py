@@ -1,8 +1,113 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from ..models.traffic_light import Color, Direction
+
+def queued_count(intersection, direction: str, window_m: float) -> int:
+    """Cars within ``window_m`` of the stop line on ``direction``'s approaches.
+
+    Reads the intersection's detector counts when it keeps them (O(1) for
+    the detector's own reach); otherwise scans ``vehicles_for``.
+    """
+    count = getattr(intersection, "queue_count", None)
+    if count is not None:
+        return count(direction, window_m)
+    return sum(1 for v in intersection.vehicles_for(direction) if v.road.length_m - v.pos_m <= window_m)
+
 
 class TrafficSignalPolicy(ABC):
+    # True when decide() is a pure function of time, so calls may be skipped
+    stateless = False
+
     @abstractmethod
     def decide(self, intersection, now_s: float) -> Tuple[str, str]:
         """Return (direction, color) with direction in {'NS','EW'} and color in {'GREEN','YELLOW','RED'}."""
-        ...
\ No newline at end of file
+        ...
+
+    def decide_batch(self, intersections: Sequence, now_s: float, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Decide for all nodes at once; node ``i`` sees time ``now_s + offsets[i]``.
+
+        Returns ``(dirs, colors)`` as :class:`Direction` / :class:`Color` code
+        arrays. This fallback calls :meth:`decide` per node; policies override
+        it with a vectorized version, which :class:`Simulation` then uses.
+        """
+        dirs = np.empty(len(intersections), dtype=np.int8)
+        colors = np.empty(len(intersections), dtype=np.int8)
+        for i, (inter, t) in enumerate(zip(intersections, (now_s + offsets).tolist())):
+            d, c = self.decide(inter, t)
+            dirs[i] = Direction[d]
+            colors[i] = Color[c]
+        return dirs, colors
+
+    def checkpoint_state(self, intersections: Sequence) -> Dict[str, np.ndarray]:
+        """Internal controller state as arrays ordered like ``intersections``.
+
+        Used by :mod:`traffic_sim.core.checkpoint`; stateless policies keep
+        the default empty dict.
+        """
+        return {}
+
+    def restore_state(self, intersections: Sequence, state: Dict[str, np.ndarray]) -> None:
+        """Load state produced by :meth:`checkpoint_state` for ``intersections``."""
+
+
+class NodeStatePolicy(TrafficSignalPolicy):
+    """Base for policies that keep per-node controller state in arrays.
+
+    Subclasses list their arrays in ``node_fields`` as ``(name, dtype,
+    initial value)`` and call ``super().__init__()``. The arrays are indexed
+    by a slot per node, in the order of the node list last passed to
+    :meth:`decide_batch`. The policy holds on to the nodes it has slots for,
+    so a policy reused for another world never mistakes a new node for an
+    old one; when a different list comes in, nodes in both keep their state,
+    new nodes start from the initial values and the rest are dropped.
+    """
+
+    node_fields: Tuple[Tuple[str, type, float], ...] = ()
+
+    def __init__(self) -> None:
+        self._nodes: List = []
+        self._slots: Dict[int, int] = {}  # id(node) -> slot; _nodes keeps the ids in use
+        self._bound = None  # (node list, its length) the slots are ordered by
+        for name, dtype, _ in self.node_fields:
+            setattr(self, name, np.zeros(0, dtype=dtype))
+
+    def _slot(self, intersection) -> int:
+        slot = self._slots.get(id(intersection))
+        if slot is None:
+            slot = self._slots[id(intersection)] = len(self._nodes)
+            self._nodes.append(intersection)
+            if slot >= len(getattr(self, self.node_fields[0][0])):
+                grow = max(16, slot)
+                for name, dtype, init in self.node_fields:
+                    setattr(self, name, np.concatenate([getattr(self, name), np.full(grow, init, dtype=dtype)]))
+        return slot
+
+    def _bind(self, intersections: Sequence) -> np.ndarray:
+        """Slots of ``intersections``, re-indexing the state when the list changed."""
+        bound = self._bound
+        if bound is None or bound[0] is not intersections or bound[1] != len(intersections):
+            old = np.array([self._slots.get(id(inter), -1) for inter in intersections], dtype=np.int64)
+            kept = old >= 0
+            for name, dtype, init in self.node_fields:
+                arr = np.full(len(old), init, dtype=dtype)
+                arr[kept] = getattr(self, name)[old[kept]]
+                setattr(self, name, arr)
+            self._nodes = list(intersections)
+            self._slots = {id(inter): k for k, inter in enumerate(self._nodes)}
+            self._bound = (intersections, len(intersections))
+            self._bound_slots = np.arange(len(old), dtype=np.int64)
+        return self._bound_slots
+
+    def checkpoint_state(self, intersections: Sequence) -> Dict[str, np.ndarray]:
+        slots = np.array([self._slot(inter) for inter in intersections], dtype=np.int64)
+        return {name: getattr(self, name)[slots] for name, _, _ in self.node_fields}
+
+    def restore_state(self, intersections: Sequence, state: Dict[str, np.ndarray]) -> None:
+        self._nodes = list(intersections)
+        self._slots = {id(inter): k for k, inter in enumerate(self._nodes)}
+        self._bound = None
+        for name, dtype, _ in self.node_fields:
+            setattr(self, name, np.array(state[name], dtype=dtype))
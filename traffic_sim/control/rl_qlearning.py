@@ -1,27 +1,211 @@
-"""Placeholder Q-learning controller that delegates to the actuated policy."""
+"""Tabular Q-learning signal controller."""
 from __future__ import annotations
 
-from typing import Tuple
+import json
+from typing import Dict, Sequence, Tuple
 
-from .actuated import ActuatedPolicy
-from .policy_base import TrafficSignalPolicy
+import numpy as np
 
+from .policy_base import NodeStatePolicy, queued_count
+from ..models.traffic_light import COLOR_NAMES, DIR_NAMES, Color, Direction
 
-class QLearningPolicy(TrafficSignalPolicy):
-    """Skeleton for future reinforcement-learning based signal control.
+KEEP, SWITCH = 0, 1
 
-    TODOs for a full Q-learning implementation:
-    - Encode state features (e.g., queue presence/length per approach).
-    - Maintain a Q-table keyed by discretised state/action pairs.
-    - Select actions via an epsilon-greedy strategy and update Q-values using
-      observed rewards (throughput minus delay is a good starting signal).
 
-    For now we delegate to :class:`ActuatedPolicy` so the simulation remains
-    functional while preserving the policy interface.
+class QLearningPolicy(NodeStatePolicy):
+    """Epsilon-greedy tabular Q-learning over discretised queue features.
+
+    Every node runs its own controller but all nodes share one Q-table.
+    Once a green has lasted ``min_green`` seconds the node decides every
+    ``decision_s`` seconds whether to keep it or switch (through ``yellow``
+    to the other direction); ``max_green`` forces a switch.
+
+    The state is an integer code built from the green direction, the number
+    of queued cars on each approach (cars within ``queue_window_m`` of the
+    stop line, bucketed by ``queue_bins``) and the time already spent in
+    the green (bucketed by ``time_bins``), so the Q-table is a plain
+    ``(n_states, 2)`` array. The reward for a decision, collected at the
+    next one, is throughput minus delay: the drop in queued cars since the
+    last decision minus ``delay_weight`` times the queued car-seconds.
+
+    State per node lives in arrays indexed by a per-node slot and
+    :meth:`decide_batch` handles every due node with array operations, as
+    in :class:`ActuatedPolicy`. That state is reset for each new world
+    while the Q-table carries over, so one policy trains across episodes.
+    Set ``learning=False`` to act greedily on a trained table without
+    updating it; :meth:`save` / :meth:`load` store the table as a compact
+    ``.npz``.
     """
 
-    def __init__(self) -> None:
-        self._delegate = ActuatedPolicy()
+    node_fields = (
+        ("direction", np.int8, Direction.NS),
+        ("color", np.int8, Color.GREEN),
+        ("phase_start", np.float64, 0.0),
+        ("last_decision", np.float64, 0.0),
+        ("last_state", np.int64, -1),  # -1 before the first decision
+        ("last_action", np.int8, KEEP),
+        ("last_queued", np.int64, 0),
+    )
+
+    def __init__(
+        self,
+        min_green: float = 5.0,
+        max_green: float = 40.0,
+        yellow: float = 2.0,
+        decision_s: float = 2.0,
+        queue_window_m: float = 25.0,
+        queue_bins: Sequence[int] = (1, 2, 4, 8),
+        time_bins: Sequence[float] = (10.0, 20.0),
+        alpha: float = 0.1,
+        gamma: float = 0.9,
+        epsilon: float = 0.1,
+        delay_weight: float = 0.1,
+        learning: bool = True,
+        seed: int | None = None,
+    ) -> None:
+        self.min_green = float(min_green)
+        self.max_green = float(max_green)
+        self.yellow = float(yellow)
+        self.decision_s = float(decision_s)
+        self.queue_window_m = float(queue_window_m)
+        self.queue_bins = np.asarray(queue_bins, dtype=np.int64)
+        self.time_bins = np.asarray(time_bins, dtype=np.float64)
+        self.alpha = float(alpha)
+        self.gamma = float(gamma)
+        self.epsilon = float(epsilon)
+        self.delay_weight = float(delay_weight)
+        self.learning = learning
+        self.rng = np.random.default_rng(seed)
+
+        self._n_queue = len(self.queue_bins) + 1
+        self._n_time = len(self.time_bins) + 1
+        self.q = np.zeros((self.n_states, 2), dtype=np.float64)
+        self.decisions = 0
+
+        super().__init__()
 
+    @property
+    def n_states(self) -> int:
+        return 2 * self._n_queue * self._n_queue * self._n_time
+
+    # --- state encoding -------------------------------------------------------
+    def encode(self, direction: np.ndarray, queued_ns: np.ndarray, queued_ew: np.ndarray,
+               time_in_green: np.ndarray) -> np.ndarray:
+        """Integer state codes for arrays of node observations."""
+        nq, nt = self._n_queue, self._n_time
+        q_ns = np.searchsorted(self.queue_bins, queued_ns, side="right")
+        q_ew = np.searchsorted(self.queue_bins, queued_ew, side="right")
+        t = np.searchsorted(self.time_bins, time_in_green, side="right")
+        return ((direction.astype(np.int64) * nq + q_ns) * nq + q_ew) * nt + t
+
+    # --- decisions ------------------------------------------------------------
     def decide(self, intersection, now_s: float) -> Tuple[str, str]:
-        return self._delegate.decide(intersection, now_s)
+        i = self._slot(intersection)
+        self._step(np.array([i]), [intersection], np.array([now_s]))
+        return DIR_NAMES[self.direction[i]], COLOR_NAMES[self.color[i]]
+
+    def decide_batch(self, intersections, now_s: float, offsets: np.ndarray):
+        slots = self._bind(intersections)
+        self._step(slots, intersections, now_s + offsets)
+        return self.direction[slots], self.color[slots]
+
+    def _step(self, slots: np.ndarray, intersections, now: np.ndarray) -> None:
+        color = self.color[slots]
+        time_in_phase = now - self.phase_start[slots]
+
+        # yellow -> other direction's green
+        to_green = (color == Color.YELLOW) & (time_in_phase >= self.yellow)
+        s = slots[to_green]
+        self.direction[s] = 1 - self.direction[s]
+        self.color[s] = Color.GREEN
+        self.phase_start[s] = now[to_green]
+
+        green = color == Color.GREEN
+        forced = green & (time_in_phase >= self.max_green)
+        due = np.flatnonzero(
+            green & ~forced & (time_in_phase >= self.min_green)
+            & (now - self.last_decision[slots] >= self.decision_s)
+        )
+        switch = forced
+        if due.size:
+            switch = switch.copy()
+            switch[due] = self._decide_due(slots[due], [intersections[k] for k in due.tolist()],
+                                           now[due], time_in_phase[due])
+
+        s = slots[switch]
+        self.color[s] = Color.YELLOW
+        self.phase_start[s] = now[switch]
+
+    def _decide_due(self, slots: np.ndarray, nodes, now: np.ndarray, time_in_green: np.ndarray) -> np.ndarray:
+        window = self.queue_window_m
+        ns = np.array([queued_count(node, "NS", window) for node in nodes], dtype=np.int64)
+        ew = np.array([queued_count(node, "EW", window) for node in nodes], dtype=np.int64)
+        state = self.encode(self.direction[slots], ns, ew, time_in_green)
+        queued = ns + ew
+
+        if self.learning:
+            prev = self.last_state[slots]
+            seen = prev >= 0
+            if seen.any():
+                dt = now[seen] - self.last_decision[slots[seen]]
+                served = np.maximum(0, self.last_queued[slots[seen]] - queued[seen])
+                reward = served - self.delay_weight * queued[seen] * dt
+                target = reward + self.gamma * self.q[state[seen]].max(axis=1)
+                s, a = prev[seen], self.last_action[slots[seen]]
+                np.add.at(self.q, (s, a), self.alpha * (target - self.q[s, a]))
+
+        action = np.argmax(self.q[state], axis=1).astype(np.int8)
+        if self.learning and self.epsilon > 0:
+            explore = self.rng.random(len(slots)) < self.epsilon
+            action[explore] = self.rng.integers(0, 2, int(explore.sum()))
+
+        self.last_state[slots] = state
+        self.last_action[slots] = action
+        self.last_queued[slots] = queued
+        self.last_decision[slots] = now
+        self.decisions += len(slots)
+        return action == SWITCH
+
+    # --- persistence ----------------------------------------------------------
+    def _config(self) -> Dict[str, np.ndarray]:
+        return {
+            "queue_bins": self.queue_bins,
+            "time_bins": self.time_bins,
+            "timing": np.array([self.min_green, self.max_green, self.yellow, self.decision_s,
+                                self.queue_window_m]),
+            "learning_rates": np.array([self.alpha, self.gamma, self.epsilon, self.delay_weight]),
+        }
+
+    def save(self, path) -> None:
+        """Write the Q-table and settings to ``path`` (``.npz``)."""
+        with open(path, "wb") as fh:
+            np.savez_compressed(fh, q=self.q, decisions=np.array([self.decisions]), **self._config())
+
+    @classmethod
+    def load(cls, path, **kwargs) -> "QLearningPolicy":
+        """A policy with the table saved at ``path``; ``kwargs`` override settings."""
+        with np.load(path, allow_pickle=False) as data:
+            min_green, max_green, yellow, decision_s, window = data["timing"].tolist()
+            alpha, gamma, epsilon, delay_weight = data["learning_rates"].tolist()
+            settings = dict(min_green=min_green, max_green=max_green, yellow=yellow,
+                            decision_s=decision_s, queue_window_m=window,
+                            queue_bins=data["queue_bins"].tolist(), time_bins=data["time_bins"].tolist(),
+                            alpha=alpha, gamma=gamma, epsilon=epsilon, delay_weight=delay_weight)
+            settings.update(kwargs)
+            policy = cls(**settings)
+            if data["q"].shape != policy.q.shape:
+                raise ValueError("Q-table shape does not match the state encoding")
+            policy.q[:] = data["q"]
+            policy.decisions = int(data["decisions"][0])
+        return policy
+
+    def checkpoint_state(self, intersections) -> Dict[str, np.ndarray]:
+        state = super().checkpoint_state(intersections)
+        state["q"] = self.q
+        state["rng"] = np.frombuffer(json.dumps(self.rng.bit_generator.state).encode(), dtype=np.uint8)
+        return state
+
+    def restore_state(self, intersections, state: Dict[str, np.ndarray]) -> None:
+        super().restore_state(intersections, state)
+        self.q = np.array(state["q"], dtype=np.float64)
+        self.rng.bit_generator.state = json.loads(state["rng"].tobytes().decode())
@@ -0,0 +1,279 @@
+"""Binary checkpoints of a running :class:`Simulation`, with restore and fork.
+
+A :class:`Checkpoint` holds the complete state as flat NumPy arrays: the
+road network, every car on it (in queue order), signal colors, policy and
+spawner state, the clock, metrics and the global ``random`` state. Nothing
+is pickled; :meth:`Checkpoint.save` writes the arrays to one ``.npz`` file
+and :meth:`Checkpoint.load` reads them back without ``allow_pickle``.
+
+Warm up once, then branch policy variants from the same state::
+
+    sim.max_time = 1800.0
+    sim.run()
+    ckpt = Checkpoint.capture(sim)
+    for policy, branch in zip(variants, ckpt.fork(variants, spawn_fn=spawner, max_time=3600.0)):
+        print(policy, branch.run())
+
+A restored simulation continues exactly as the original would have.
+Policies and spawners take part through ``checkpoint_state()`` /
+``restore_state()`` methods; a policy's state is only restored into a
+policy of the same class.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import random
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .simulation import Simulation
+from .timekeeper import SimClock
+from ..metrics.collectors import Metrics
+from ..metrics.sketch import QuantileSketch
+from ..models.grid_world import attach_engine
+from ..models.intersection import Intersection
+from ..models.road import Road
+from ..models.traffic_light import DIR_CODES, DIR_NAMES
+from ..models.vehicle import Vehicle
+from ..models.world import World
+
+FORMAT_VERSION = 1
+
+# float64 vehicle columns, in Vehicle attribute order
+_VEHICLE_FLOATS = ("pos_m", "length_m", "max_accel", "max_decel", "target_speed",
+                   "enter_time_s", "exit_time_s")
+
+
+def pack_rng_state(state: tuple) -> np.ndarray:
+    """``random.Random.getstate()`` as a uint64 array (version, words, gauss)."""
+    version, words, gauss = state
+    g = np.float64(np.nan if gauss is None else gauss).view(np.uint64)
+    return np.array([version, *words, g], dtype=np.uint64)
+
+
+def unpack_rng_state(arr: np.ndarray) -> tuple:
+    gauss = float(arr[-1:].view(np.float64)[0])
+    return int(arr[0]), tuple(int(w) for w in arr[1:-1]), None if gauss != gauss else gauss
+
+
+def _codes(values: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    # small string table plus int32 codes; -1 stands for None
+    table: Dict[str, int] = {}
+    codes = [-1 if s is None else table.setdefault(s, len(table)) for s in values]
+    return np.array(list(table), dtype=str), np.array(codes, dtype=np.int32)
+
+
+class Checkpoint:
+    """Packed simulation state; see the module docstring."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, object]) -> None:
+        self.arrays = arrays
+        self.meta = meta
+
+    # --- capture ------------------------------------------------------------
+    @classmethod
+    def capture(cls, sim: Simulation) -> "Checkpoint":
+        """Snapshot ``sim`` between ticks (e.g. after :meth:`Simulation.run`)."""
+        world = sim.world
+        a: Dict[str, np.ndarray] = {}
+        meta: Dict[str, object] = {
+            "version": FORMAT_VERSION,
+            "time_s": sim.clock.now(),
+            "dt": sim.dt,
+            "max_time": sim.max_time,
+            "mode": sim.mode,
+            "steps": sim.steps,
+            "grid_size": list(getattr(world, "_grid_size", None) or ()),
+            "array_engine": type(world.engine).__name__ == "ArrayEngine",
+            "lazy": type(world.engine).__name__ == "LazyEngine",
+            "policy": type(sim.policy).__qualname__,
+        }
+
+        # network
+        inters = world.intersections
+        inter_index = {id(inter): k for k, inter in enumerate(inters)}
+        a["inter_name"] = np.array([i.name for i in inters], dtype=str)
+        a["inter_offset"] = np.array([i.phase_offset_s for i in inters], dtype=np.float64)
+        a["signal_dir"] = np.array([i.signal.dir_code for i in inters], dtype=np.int8)
+        a["signal_color"] = np.array([i.signal.color_code for i in inters], dtype=np.int8)
+
+        roads = world.route_index().roads
+        a["road_name"] = np.array([rd.name for rd in roads], dtype=str)
+        a["road_length"] = np.array([rd.length_m for rd in roads], dtype=np.float64)
+        a["road_speed"] = np.array([rd.speed_mps for rd in roads], dtype=np.float64)
+        a["road_to"] = np.array([inter_index[id(rd.to_intersection)] for rd in roads], dtype=np.int32)
+        a["road_dir"] = np.array([DIR_CODES[rd.approach_dir] for rd in roads], dtype=np.int8)
+        a["road_tiles"] = np.array(
+            [(rd.from_tile or (-1, -1)) + (rd.to_tile or (-1, -1)) for rd in roads], dtype=np.int32
+        ).reshape(len(roads), 4)
+        points = [rd.screen_points or [] for rd in roads]
+        a["road_points_len"] = np.array([len(p) for p in points], dtype=np.int32)
+        a["road_points"] = np.array([xy for p in points for xy in p], dtype=np.int32).reshape(-1, 2)
+
+        # cars, grouped by road and back to front within each queue
+        rank = world.route_index().rank
+        queues = world.road_queues()
+        cars = [v for road in roads for v in queues.get(road, ())]
+        a["car_road"] = np.array([rank[v.road] for v in cars], dtype=np.int32)
+        a["car_id"] = np.array([v.id for v in cars], dtype=np.int64)
+        for name in _VEHICLE_FLOATS:
+            a[f"car_{name}"] = np.array([getattr(v, name) for v in cars], dtype=np.float64)
+        a["car_route_key"] = np.array([v.route_key for v in cars], dtype=np.uint64)
+        a["car_hops"] = np.array([v.hops for v in cars], dtype=np.int64)
+        a["kind_table"], a["car_kind"] = _codes([v.kind for v in cars])
+        a["sprite_table"], a["car_sprite"] = _codes([v.sprite_key for v in cars])
+
+        # metrics
+        m = sim.metrics
+        a["metrics_counts"] = np.array([m.entered, m.exited], dtype=np.int64)
+        a["metrics_travel"] = np.array([m.total_travel_s, m.mean_travel_s, m.m2_travel], dtype=np.float64)
+        sk = m.travel_sketch
+        keys = sorted(sk.buckets)
+        a["sketch_keys"] = np.array(keys, dtype=np.int64)
+        a["sketch_counts"] = np.array([sk.buckets[k] for k in keys], dtype=np.int64)
+        a["sketch_totals"] = np.array([sk.zero_count, sk.count, sk.max_buckets], dtype=np.int64)
+        meta["sketch_accuracy"] = sk.rel_accuracy
+
+        # random streams and controller state
+        a["rng"] = pack_rng_state(random.getstate())
+        for key, arr in sim.policy.checkpoint_state(inters).items():
+            a[f"policy/{key}"] = np.asarray(arr)
+        if hasattr(sim.spawn_fn, "checkpoint_state"):
+            for key, arr in sim.spawn_fn.checkpoint_state().items():
+                a[f"spawn/{key}"] = np.asarray(arr)
+        return cls(a, meta)
+
+    # --- files --------------------------------------------------------------
+    def save(self, path) -> None:
+        meta = np.frombuffer(json.dumps(self.meta).encode(), dtype=np.uint8)
+        with open(path, "wb") as fh:
+            np.savez(fh, __meta__=meta, **self.arrays)
+
+    @classmethod
+    def load(cls, path) -> "Checkpoint":
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        meta = json.loads(arrays.pop("__meta__").tobytes().decode())
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {meta.get('version')!r}")
+        return cls(arrays, meta)
+
+    # --- restore ------------------------------------------------------------
+    def _world(self, array_engine: bool, lazy: bool) -> World:
+        a = self.arrays
+        inters = []
+        for name, offset, d, c in zip(a["inter_name"].tolist(), a["inter_offset"].tolist(),
+                                      a["signal_dir"].tolist(), a["signal_color"].tolist()):
+            inter = Intersection(name=name, phase_offset_s=offset)
+            inter.signal.dir_code, inter.signal.color_code = d, c
+            inters.append(inter)
+
+        roads = []
+        points = a["road_points"].tolist()
+        start = 0
+        for name, length, speed, to, d, tiles, n_pts in zip(
+            a["road_name"].tolist(), a["road_length"].tolist(), a["road_speed"].tolist(),
+            a["road_to"].tolist(), a["road_dir"].tolist(), a["road_tiles"].tolist(),
+            a["road_points_len"].tolist(),
+        ):
+            rd = Road(name=name, length_m=length, speed_mps=speed,
+                      to_intersection=inters[to], approach_dir=DIR_NAMES[d])
+            if n_pts:
+                rd.screen_points = [tuple(p) for p in points[start:start + n_pts]]
+                start += n_pts
+            rd.from_tile = tuple(tiles[:2]) if tiles[0] >= 0 else None
+            rd.to_tile = tuple(tiles[2:]) if tiles[2] >= 0 else None
+            roads.append(rd)
+
+        world = World(roads=roads, intersections=inters, vehicles=[])
+        if self.meta["grid_size"]:
+            world._grid_size = tuple(self.meta["grid_size"])
+        world.rebuild_routes()
+        attach_engine(world, array_engine, lazy)
+
+        kinds = a["kind_table"].tolist()
+        sprites = a["sprite_table"].tolist()
+        columns = [a[f"car_{name}"].tolist() for name in _VEHICLE_FLOATS]
+        queues: Dict[Road, List[Vehicle]] = {}
+        for ri, vid, kind, sprite, key, hops, *values in zip(
+            a["car_road"].tolist(), a["car_id"].tolist(), a["car_kind"].tolist(),
+            a["car_sprite"].tolist(), a["car_route_key"].tolist(), a["car_hops"].tolist(), *columns,
+        ):
+            road = roads[ri]
+            v = Vehicle(id=vid, road=road, kind=kinds[kind],
+                        sprite_key=sprites[sprite] if sprite >= 0 else None,
+                        route_key=key, hops=hops)
+            for name, value in zip(_VEHICLE_FLOATS, values):
+                setattr(v, name, value)  # also undoes __post_init__'s speed factor
+            queues.setdefault(road, []).append(v)
+        world.load_queues(queues)
+        return world
+
+    def _metrics(self) -> Metrics:
+        a = self.arrays
+        entered, exited = a["metrics_counts"].tolist()
+        total, mean, m2 = a["metrics_travel"].tolist()
+        zero, count, max_buckets = a["sketch_totals"].tolist()
+        sketch = QuantileSketch(rel_accuracy=self.meta["sketch_accuracy"], max_buckets=max_buckets,
+                                buckets=dict(zip(a["sketch_keys"].tolist(), a["sketch_counts"].tolist())),
+                                zero_count=zero, count=count)
+        return Metrics(entered=entered, exited=exited, total_travel_s=total,
+                       mean_travel_s=mean, m2_travel=m2, travel_sketch=sketch)
+
+    def _section(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {key[len(prefix):]: arr for key, arr in self.arrays.items() if key.startswith(prefix)}
+
+    def restore(
+        self,
+        policy,
+        spawn_fn: Callable[[float, object], list] | None = None,
+        array_engine: Optional[bool] = None,
+        lazy: Optional[bool] = None,
+        **sim_kwargs,
+    ) -> Simulation:
+        """Rebuild the simulation around ``policy`` and ``spawn_fn``.
+
+        Also resets the global ``random`` state to the captured one. The
+        policy's state is restored when it is the same class as the captured
+        policy; a different policy starts from its own initial state.
+        ``array_engine`` and ``lazy`` default to the engine the captured
+        world used, and ``sim_kwargs`` (``max_time``, ``render_fn``, ...) go
+        to :class:`Simulation`.
+        """
+        meta = self.meta
+        if array_engine is None:
+            array_engine = meta["array_engine"] and not lazy
+        if lazy is None:
+            lazy = meta.get("lazy", False) and not array_engine
+        world = self._world(array_engine, lazy)
+        if type(policy).__qualname__ == meta["policy"]:
+            policy.restore_state(world.intersections, self._section("policy/"))
+        if spawn_fn is not None and hasattr(spawn_fn, "restore_state"):
+            spawn_fn.restore_state(self._section("spawn/"))
+
+        kwargs = {"dt": meta["dt"], "max_time": meta["max_time"], "mode": meta["mode"]}
+        kwargs.update(sim_kwargs)
+        clock = SimClock(dt=kwargs["dt"])
+        clock.t = meta["time_s"]
+        sim = Simulation(world, policy, spawn_fn, clock=clock, **kwargs)
+        sim.steps = meta["steps"]
+        sim.metrics = self._metrics()
+        random.setstate(unpack_rng_state(self.arrays["rng"]))
+        return sim
+
+    def fork(
+        self,
+        policies: Iterable,
+        spawn_fn: Callable[[float, object], list] | None = None,
+        **kwargs,
+    ) -> Iterator[Simulation]:
+        """Yield one restored simulation per policy, each from this state.
+
+        Branches share the global ``random`` module, which is reset as each
+        one is yielded, so run every branch before advancing to the next.
+        ``spawn_fn`` is copied for each branch.
+        """
+        for policy in policies:
+            yield self.restore(policy, copy.deepcopy(spawn_fn), **kwargs)
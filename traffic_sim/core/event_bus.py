@@ -0,0 +1,47 @@
+"""Priority-queue event scheduler used by the hybrid simulation mode."""
+from __future__ import annotations
+
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+
+@dataclass(order=True)
+class Event:
+    time_s: float
+    seq: int
+    kind: str = field(compare=False)
+    payload: Any = field(default=None, compare=False)
+
+
+class EventScheduler:
+    """Min-heap of timed events; ties pop in scheduling order."""
+
+    def __init__(self) -> None:
+        self._heap: List[Event] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, time_s: float, kind: str, payload: Any = None) -> Event:
+        ev = Event(time_s, next(self._seq), kind, payload)
+        heapq.heappush(self._heap, ev)
+        return ev
+
+    def peek_time(self) -> Optional[float]:
+        return self._heap[0].time_s if self._heap else None
+
+    def pop(self) -> Event:
+        return heapq.heappop(self._heap)
+
+    def pop_due(self, now_s: float) -> List[Event]:
+        """Remove and return every event scheduled at or before ``now_s``."""
+        due = []
+        while self._heap and self._heap[0].time_s <= now_s:
+            due.append(heapq.heappop(self._heap))
+        return due
+
+    def clear(self) -> None:
+        self._heap.clear()
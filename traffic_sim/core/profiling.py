@@ -0,0 +1,126 @@
+"""Opt-in per-phase timing for :class:`Simulation` ticks."""
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from ..metrics.sketch import QuantileSketch
+
+# hook(tick, phase, seconds); phase "tick" reports the whole tick
+PhaseHook = Callable[[int, str, float], None]
+
+
+class PhaseProfiler:
+    """Wall-time counters and latency histograms for each phase of a tick.
+
+    Pass one to ``Simulation(profiler=...)``. The simulation calls
+    :meth:`begin` at the start of every tick, :meth:`mark` after each phase
+    (``policy``, ``spawn``, ``world``, ``exits``, ``render``, ``snapshot``,
+    ``record``)
+    and :meth:`end` when the tick is done; without a profiler none of this
+    runs. Durations go into cumulative totals, the last tick's values and a
+    :class:`QuantileSketch` per phase (milliseconds).
+
+    ``capture_ticks=(first, last)`` additionally runs cProfile and/or
+    tracemalloc over that inclusive tick window. Hooks registered with
+    :meth:`add_hook` see every phase as it finishes, for forwarding to an
+    external profiler or tracer.
+    """
+
+    def __init__(
+        self,
+        capture_ticks: Optional[tuple] = None,
+        cprofile: bool = True,
+        trace_memory: bool = False,
+        top: int = 15,
+    ) -> None:
+        self.totals: Dict[str, float] = {}
+        self.last: Dict[str, float] = {}
+        self.sketches: Dict[str, QuantileSketch] = {}
+        self.ticks = 0
+        self.hooks: List[PhaseHook] = []
+        self.capture_ticks = capture_ticks
+        self.cprofile = cprofile
+        self.trace_memory = trace_memory
+        self.top = top
+        self.profile: Optional[cProfile.Profile] = None
+        self.memory: Optional[tracemalloc.Snapshot] = None
+        self._capturing = False
+        self._t0 = 0.0
+        self._mark = 0.0
+
+    def add_hook(self, hook: PhaseHook) -> None:
+        self.hooks.append(hook)
+
+    def begin(self) -> None:
+        if self.capture_ticks is not None and self.ticks == self.capture_ticks[0]:
+            self._start_capture()
+        self._t0 = self._mark = perf_counter()
+
+    def mark(self, phase: str) -> None:
+        now = perf_counter()
+        self._record(phase, now - self._mark)
+        self._mark = now
+
+    def end(self) -> None:
+        self._record("tick", perf_counter() - self._t0)
+        if self._capturing and self.ticks >= self.capture_ticks[1]:
+            self._stop_capture()
+        self.ticks += 1
+
+    def _record(self, phase: str, seconds: float) -> None:
+        self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+        self.last[phase] = seconds
+        sketch = self.sketches.get(phase)
+        if sketch is None:
+            sketch = self.sketches[phase] = QuantileSketch()
+        sketch.add(seconds * 1e3)
+        for hook in self.hooks:
+            hook(self.ticks, phase, seconds)
+
+    def _start_capture(self) -> None:
+        self._capturing = True
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.cprofile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def _stop_capture(self) -> None:
+        self._capturing = False
+        if self.profile is not None:
+            self.profile.disable()
+        if self.trace_memory:
+            self.memory = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def finish(self) -> None:
+        """Close a capture window the run ended inside of."""
+        if self._capturing:
+            self._stop_capture()
+
+    def summary(self) -> Dict[str, object]:
+        """Per-phase totals and latency quantiles, plus any capture results."""
+        phases = {}
+        for phase, total in self.totals.items():
+            q = self.sketches[phase].quantile
+            phases[phase] = {
+                "total_s": round(total, 6),
+                "mean_ms": round(total * 1e3 / max(1, self.sketches[phase].count), 4),
+                "p50_ms": round(q(0.5), 4),
+                "p90_ms": round(q(0.9), 4),
+                "p99_ms": round(q(0.99), 4),
+                "max_ms": round(q(1.0), 4),
+            }
+        out: Dict[str, object] = {"ticks": self.ticks, "phases": phases}
+        if self.profile is not None:
+            buf = io.StringIO()
+            pstats.Stats(self.profile, stream=buf).sort_stats("cumulative").print_stats(self.top)
+            out["cprofile"] = buf.getvalue()
+        if self.memory is not None:
+            out["tracemalloc"] = [str(s) for s in self.memory.statistics("lineno")[: self.top]]
+        return out
@@ -0,0 +1,295 @@
+"""Columnar trajectory recording and memory-mapped replay.
+
+A :class:`TrajectoryRecorder` passed as ``Simulation(recorder=...)`` stores
+every recorded tick's cars (id, road index, position, sprite) and signal
+states. Ticks are grouped into chunks; each chunk is laid out column by
+column, zlib-compressed and appended to the file by a background thread, so
+the simulation only pays for collecting the arrays. An index of chunk
+offsets and times is written as a footer when the recorder is closed.
+
+A :class:`TraceReader` memory-maps the file and decompresses only the chunk
+holding the tick asked for, so any tick can be reached without loading the
+trace or re-simulating; :meth:`TraceReader.snapshot` returns a
+:class:`WorldSnapshot` that the renderers draw directly
+(see :func:`traffic_sim.ui.viewer.run_replay`).
+
+File layout: ``MAGIC``, the compressed chunks, the JSON index, then the
+index length as a little-endian uint64 and ``MAGIC`` again.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import queue
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .snapshot import WorldSnapshot
+from ..models.traffic_light import COLOR_NAMES, DIR_NAMES
+
+MAGIC = b"TSTRACE1"
+_TAIL = struct.Struct("<Q")
+
+# (name, dtype) per column, in on-disk order: one value per tick, then one per car
+_TICK_COLUMNS = (("time", np.float64), ("entered", np.int64), ("exited", np.int64),
+                 ("avg_travel", np.float64))
+_CAR_COLUMNS = (("vid", np.int64), ("road", np.int32), ("pos", np.float32), ("sprite", np.int16))
+
+
+class TrajectoryRecorder:
+    """Append per-tick car and signal states to ``path``.
+
+    Records every ``every``-th tick, in chunks of ``chunk_ticks`` ticks
+    compressed at zlib ``level``. ``grid`` (the scenario's tile rows) and
+    ``compress`` (whether the network was built with straight tiles merged)
+    are kept in the index so a replay can rebuild the map on its own.
+    Close the recorder (or use it as a context manager) once the simulation
+    is done; :meth:`Simulation.run` leaves it open so a run can be resumed.
+    """
+
+    def __init__(
+        self,
+        path,
+        every: int = 1,
+        chunk_ticks: int = 64,
+        level: int = 1,
+        grid: Optional[Sequence[str]] = None,
+        compress: bool = False,
+    ) -> None:
+        self.path = str(path)
+        self.every = max(1, every)
+        self.chunk_ticks = chunk_ticks
+        self.level = level
+        self.grid = ["".join(row) for row in grid] if grid is not None else None
+        self.compress = compress
+        self.ticks = 0
+        self.closed = False
+        self._calls = 0
+        self._sprites: Dict[str, int] = {}
+        self._n_roads = self._n_inters = None
+        self._pending: List[tuple] = []
+        self._chunks: List[Dict[str, object]] = []
+        self._fh = open(self.path, "wb")
+        self._fh.write(MAGIC)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=8)
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    # --- producer (simulation thread) ----------------------------------------
+    def record(self, world, now_s: float, metrics) -> None:
+        """Capture one tick (skipped unless it falls on the ``every`` stride)."""
+        self._calls += 1
+        if (self._calls - 1) % self.every:
+            return
+        if self.closed:
+            raise RuntimeError(f"Trace {self.path} is already closed")
+        if self._error is not None:
+            raise self._error
+        world.sync()
+        rank = world.route_index().rank
+        bank = world.signal_bank()
+        if self._n_roads is None:
+            self._n_roads, self._n_inters = len(rank), len(bank)
+
+        live = [v for v in world.vehicles if not v.finished]
+        sprites = self._sprites
+        n = len(live)
+        cars = (
+            np.fromiter((v.id for v in live), np.int64, n),
+            np.fromiter((rank[v.road] for v in live), np.int32, n),
+            np.fromiter((v.pos_m for v in live), np.float32, n),
+            np.fromiter((sprites.setdefault(v.sprite_key or v.kind, len(sprites)) for v in live),
+                        np.int16, n),
+        )
+        avg = metrics.total_travel_s / metrics.exited if metrics.exited else 0.0
+        stats = (now_s, metrics.entered, metrics.exited, avg)
+        self._pending.append((stats, cars, bank.dirs.copy(), bank.colors.copy()))
+        self.ticks += 1
+        if len(self._pending) >= self.chunk_ticks:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._queue.put(self._pending)
+            self._pending = []
+
+    def close(self) -> None:
+        """Write the last chunk and the index, and wait for the writer."""
+        if self.closed:
+            return
+        self.closed = True
+        self._flush()
+        self._queue.put(None)
+        self._writer.join()
+        index = {
+            "version": 1,
+            "ticks": self.ticks,
+            "roads": self._n_roads or 0,
+            "intersections": self._n_inters or 0,
+            "sprites": list(self._sprites),
+            "grid": self.grid,
+            "compress": self.compress,
+            "chunks": self._chunks,
+        }
+        blob = json.dumps(index).encode()
+        self._fh.write(blob)
+        self._fh.write(_TAIL.pack(len(blob)))
+        self._fh.write(MAGIC)
+        self._fh.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "TrajectoryRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- writer thread --------------------------------------------------------
+    def _write_loop(self) -> None:
+        first = 0
+        while True:
+            ticks = self._queue.get()
+            if ticks is None:
+                return
+            if self._error is not None:
+                continue  # keep draining so the producer never blocks
+            try:
+                first = self._write_chunk(ticks, first)
+            except BaseException as exc:  # surfaced on the next record()/close()
+                self._error = exc
+
+    def _write_chunk(self, ticks: List[tuple], first: int) -> int:
+        stats = list(zip(*(t[0] for t in ticks)))
+        counts = np.array([len(t[1][0]) for t in ticks], dtype=np.int64)
+        columns = [np.array(col, dtype=dtype) for col, (_, dtype) in zip(stats, _TICK_COLUMNS)]
+        columns += [np.concatenate([t[1][k] for t in ticks]) for k in range(len(_CAR_COLUMNS))]
+        columns += [np.concatenate([t[2] for t in ticks]), np.concatenate([t[3] for t in ticks])]
+        raw = b"".join([counts.tobytes()] + [np.ascontiguousarray(c).tobytes() for c in columns])
+        data = zlib.compress(raw, self.level)
+        offset = self._fh.tell()
+        self._fh.write(data)
+        self._chunks.append({
+            "offset": offset,
+            "size": len(data),
+            "first": first,
+            "ticks": len(ticks),
+            "rows": int(counts.sum()),
+            "t0": float(columns[0][0]),
+        })
+        return first + len(ticks)
+
+
+class TraceReader:
+    """Random access to a recorded trace through a memory map."""
+
+    def __init__(self, path, cache_chunks: int = 2) -> None:
+        self.path = str(path)
+        self._fh = open(self.path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if mm[:len(MAGIC)] != MAGIC or mm[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a complete trajectory trace")
+        end = len(mm) - len(MAGIC)
+        (size,) = _TAIL.unpack(mm[end - _TAIL.size:end])
+        index = json.loads(mm[end - _TAIL.size - size:end - _TAIL.size].decode())
+        self.index = index
+        self.sprites: List[str] = index["sprites"]
+        self.grid: Optional[List[str]] = index["grid"]
+        self.compress: bool = index.get("compress", False)
+        self.n_roads: int = index["roads"]
+        self.n_intersections: int = index["intersections"]
+        self._chunks = index["chunks"]
+        self._firsts = [c["first"] for c in self._chunks]
+        self._t0s = [c["t0"] for c in self._chunks]
+        self._cache: Dict[int, Dict[str, np.ndarray]] = {}
+        self._cache_chunks = cache_chunks
+
+    def __len__(self) -> int:
+        return self.index["ticks"]
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _chunk(self, k: int) -> Dict[str, np.ndarray]:
+        cols = self._cache.get(k)
+        if cols is not None:
+            return cols
+        meta = self._chunks[k]
+        raw = zlib.decompress(self._mm[meta["offset"]:meta["offset"] + meta["size"]])
+        n_ticks, n_rows, n_sig = meta["ticks"], meta["rows"], meta["ticks"] * self.n_intersections
+        cols, at = {}, 0
+        layout = [("counts", np.int64, n_ticks)]
+        layout += [(name, dtype, n_ticks) for name, dtype in _TICK_COLUMNS]
+        layout += [(name, dtype, n_rows) for name, dtype in _CAR_COLUMNS]
+        layout += [("dirs", np.int8, n_sig), ("colors", np.int8, n_sig)]
+        for name, dtype, count in layout:
+            cols[name] = np.frombuffer(raw, dtype=dtype, count=count, offset=at)
+            at += count * np.dtype(dtype).itemsize
+        cols["starts"] = np.concatenate([[0], np.cumsum(cols["counts"])])
+        if len(self._cache) >= self._cache_chunks:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[k] = cols
+        return cols
+
+    def _locate(self, tick: int) -> Tuple[Dict[str, np.ndarray], int]:
+        if not 0 <= tick < len(self):
+            raise IndexError(f"tick {tick} outside trace of {len(self)} ticks")
+        k = bisect_right(self._firsts, tick) - 1
+        return self._chunk(k), tick - self._firsts[k]
+
+    def time_at(self, tick: int) -> float:
+        cols, i = self._locate(tick)
+        return float(cols["time"][i])
+
+    def tick_at(self, time_s: float) -> int:
+        """Index of the last recorded tick at or before ``time_s`` (0 if none)."""
+        if not self._chunks:
+            return 0
+        k = max(0, bisect_right(self._t0s, time_s) - 1)
+        cols = self._chunk(k)
+        i = max(0, int(np.searchsorted(cols["time"], time_s, side="right")) - 1)
+        return self._firsts[k] + i
+
+    def cars(self, tick: int) -> Dict[str, np.ndarray]:
+        """Column arrays (``vid``, ``road``, ``pos``, ``sprite``) for one tick."""
+        cols, i = self._locate(tick)
+        a, b = cols["starts"][i], cols["starts"][i + 1]
+        return {name: cols[name][a:b] for name, _ in _CAR_COLUMNS}
+
+    def snapshot(self, tick: int) -> WorldSnapshot:
+        """The recorded tick as a :class:`WorldSnapshot` for a renderer."""
+        cols, i = self._locate(tick)
+        a, b = cols["starts"][i], cols["starts"][i + 1]
+        sprites = self.sprites
+        vehicles = tuple(
+            (vid, ri, pos, sprites[s])
+            for vid, ri, pos, s in zip(cols["vid"][a:b].tolist(), cols["road"][a:b].tolist(),
+                                       cols["pos"][a:b].tolist(), cols["sprite"][a:b].tolist())
+        )
+        m = self.n_intersections
+        signals = tuple(
+            (DIR_NAMES[d], COLOR_NAMES[c])
+            for d, c in zip(cols["dirs"][i * m:(i + 1) * m].tolist(),
+                            cols["colors"][i * m:(i + 1) * m].tolist())
+        )
+        summary = {
+            "entered": int(cols["entered"][i]),
+            "exited": int(cols["exited"][i]),
+            "avg_travel_time_s": round(float(cols["avg_travel"][i]), 2),
+        }
+        return WorldSnapshot(float(cols["time"][i]), vehicles, signals, summary)
@@ -1,12 +1,32 @@
 """Main simulation loop implementation."""
 from __future__ import annotations
+import inspect
 from typing import Callable, Optional
 
+from .event_bus import EventScheduler
+from .profiling import PhaseProfiler
+from .recorder import TrajectoryRecorder
+from .snapshot import SnapshotBuffer, WorldSnapshot
+from ..control.policy_base import TrafficSignalPolicy
 from .timekeeper import SimClock
 from ..metrics.collectors import Metrics
 
 class Simulation:
-    """Coordinates the policy, world state, spawning, and rendering."""
+    """Coordinates the policy, world state, spawning, and rendering.
+
+    ``mode="hybrid"`` jumps over idle stretches: while no vehicle is on the
+    network the clock advances straight to the next scheduled spawn (and,
+    when rendering, the next signal change) instead of stepping through
+    empty ticks. It needs a spawner exposing ``next_spawn_time(now_s)`` and a
+    ``stateless`` policy with ``next_change_time``; otherwise, and whenever
+    cars are moving, it steps by ``dt`` exactly like ``mode="fixed"``, so
+    metrics are identical in both modes.
+
+    Pass a :class:`PhaseProfiler` as ``profiler`` to time each phase of a
+    tick; without one no timing code runs. A :class:`TrajectoryRecorder`
+    passed as ``recorder`` stores every tick for later replay; :meth:`run`
+    may be resumed, so the recorder stays open until its owner closes it.
+    """
 
     def __init__(
         self,
@@ -17,7 +37,13 @@ class Simulation:
         dt: float = 1.0,
         max_time: float = 120.0,
         clock: Optional[SimClock] = None,
+        mode: str = "fixed",
+        snapshots: Optional[SnapshotBuffer] = None,
+        profiler: Optional[PhaseProfiler] = None,
+        recorder: Optional[TrajectoryRecorder] = None,
     ) -> None:
+        if mode not in ("fixed", "hybrid"):
+            raise ValueError(f"Unknown simulation mode {mode!r}")
         self.world = world
         self.policy = policy
         self.spawn_fn = spawn_fn or (lambda now_s, world: [])
@@ -25,42 +51,150 @@ class Simulation:
         self.dt = dt
         self.clock = clock or SimClock(dt=dt)
         self.max_time = max_time
+        self.mode = mode
         self.metrics = Metrics()
+        self.steps = 0  # ticks actually simulated
+        self.snapshots = snapshots  # optional double buffer feeding a viewer
+        self.profiler = profiler
+        self.recorder = recorder
+        self._render_summary = render_fn is not None and _takes_summary(render_fn)
+        self._stop = False
+        self.events = EventScheduler()
+        # use the policy's vectorized decide_batch when it has one
+        decide_batch = getattr(type(policy), "decide_batch", None)
+        self._batch_policy = decide_batch is not None and decide_batch is not TrafficSignalPolicy.decide_batch
 
-    def run(self) -> dict:
-        if not self.world.intersections:
-            raise ValueError("World must contain at least one intersection")
+    def _can_jump(self) -> bool:
+        return (
+            self.mode == "hybrid"
+            and hasattr(self.spawn_fn, "next_spawn_time")
+            and getattr(self.policy, "stateless", False)
+            and hasattr(self.policy, "next_change_time")
+        )
 
-        while self.clock.now() <= self.max_time:
-            now_s = self.clock.now()
+    def _schedule_events(self, now_s: float) -> None:
+        self.events.clear()
+        self.events.schedule(self.spawn_fn.next_spawn_time(now_s), "spawn")
+        if self.render_fn is not None:
+            # only a viewer can tell when lights change on an empty network
+            for inter in self.world.intersections:
+                self.events.schedule(inter.next_change_time(self.policy, now_s), "phase", inter)
+
+    def _reschedule_due(self, now_s: float) -> None:
+        events = self.events
+        for ev in events.pop_due(now_s):
+            if ev.kind == "phase":
+                events.schedule(ev.payload.next_change_time(self.policy, now_s), "phase", ev.payload)
+            else:
+                events.schedule(self.spawn_fn.next_spawn_time(now_s), "spawn")
+
+    def step(self) -> None:
+        """Advance one ``dt``: signals, spawns, movement, exits, render."""
+        now_s = self.clock.now()
+        prof = self.profiler
+        if prof is not None:
+            prof.begin()
 
-            # Apply signal policy at every node (supports phase offsets per node)
+        # Apply signal policy at every node (supports phase offsets per node)
+        if self._batch_policy:
+            bank = self.world.signal_bank()
+            bank.apply(*self.policy.decide_batch(bank.intersections, now_s, bank.offsets))
+        else:
             for inter in self.world.intersections:
                 inter.apply_policy(self.policy, now_s)
+        if prof is not None:
+            prof.mark("policy")
+
+        # Spawn vehicles
+        new_cars = self.spawn_fn(now_s, self.world) or []
+        if new_cars:
+            self.metrics.on_enter(len(new_cars))
+        if prof is not None:
+            prof.mark("spawn")
+
+        # Advance world state; it reports the cars that left the network
+        exited = self.world.tick(self.dt)
+        if prof is not None:
+            prof.mark("world")
 
-            # Spawn vehicles
-            new_cars = self.spawn_fn(now_s, self.world) or []
-            for _ in new_cars:
-                self.metrics.on_enter()
+        # Record exits
+        for vehicle in exited:
+            vehicle.exit_time_s = now_s
+            self.metrics.on_exit(now_s, vehicle)
+        if prof is not None:
+            prof.mark("exits")
 
-            # Advance world state
-            self.world.tick(self.dt)
+        # Optional render (accepts (world, summary) or just (world))
+        if self.render_fn is not None:
+            self.world.sync()
+            if self._render_summary:
+                frame = self.render_fn(self.world, self.metrics.summary())
+            else:
+                frame = self.render_fn(self.world)
+            if frame:
+                print(frame)
+            if prof is not None:
+                prof.mark("render")
+
+        # Hand a snapshot to a decoupled viewer when it can use one
+        if self.snapshots is not None and self.snapshots.due():
+            self.snapshots.publish(WorldSnapshot.capture(self.world, now_s, self.metrics.summary()))
+            if prof is not None:
+                prof.mark("snapshot")
+
+        # Append the tick to a trajectory trace
+        if self.recorder is not None:
+            self.recorder.record(self.world, now_s, self.metrics)
+            if prof is not None:
+                prof.mark("record")
+
+        self.steps += 1
+        self.clock.tick()
+        if prof is not None:
+            prof.end()
+
+    def run(self) -> dict:
+        if not self.world.intersections:
+            raise ValueError("World must contain at least one intersection")
+
+        jump = self._can_jump()
+        if jump:
+            self._schedule_events(self.clock.now())
+
+        while self.clock.now() <= self.max_time and not self._stop:
+            now_s = self.clock.now()
+            if jump and self.world.active_count() == 0:
+                target = self.events.peek_time()
+                if target > now_s:
+                    # tick the clock itself so times match fixed stepping exactly
+                    while self.clock.now() < target and self.clock.now() <= self.max_time:
+                        self.clock.tick()
+                    continue
+            self.step()
+            if jump:
+                self._reschedule_due(now_s)
 
-            # Record exits
-            for vehicle in list(self.world.vehicles):
-                if vehicle.finished and vehicle.exit_time_s == 0.0:
-                    vehicle.exit_time_s = now_s
-                    self.metrics.on_exit(now_s, vehicle)
+        if self.snapshots is not None:
+            self.snapshots.close()
+        if self.profiler is not None:
+            self.profiler.finish()
+        return self.metrics.summary()
 
-            # Optional render (accepts (world, summary) or just (world))
-            if self.render_fn is not None:
-                try:
-                    frame = self.render_fn(self.world, self.metrics.summary())
-                except TypeError:
-                    frame = self.render_fn(self.world)
-                if frame:
-                    print(frame)
+    def request_stop(self) -> None:
+        """Ask a running :meth:`run` (e.g. in another thread) to return early."""
+        self._stop = True
 
-            self.clock.tick()
 
-        return self.metrics.summary()
\ No newline at end of file
+def _takes_summary(render_fn: Callable) -> bool:
+    """Whether ``render_fn`` accepts ``(world, summary)`` rather than ``(world)``."""
+    try:
+        params = inspect.signature(render_fn).parameters.values()
+    except (TypeError, ValueError):  # builtins without a signature
+        return True
+    positional = 0
+    for p in params:
+        if p.kind is p.VAR_POSITIONAL:
+            return True
+        if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD):
+            positional += 1
+    return positional >= 2
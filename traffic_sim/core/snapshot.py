@@ -0,0 +1,92 @@
+"""Immutable world snapshots and a double buffer to hand them to a viewer."""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+# (vehicle id, index into world.roads, pos_m, sprite key)
+VehicleRow = Tuple[object, int, float, str]
+
+
+@dataclass(frozen=True)
+class WorldSnapshot:
+    """Everything a renderer needs for one frame, detached from the world."""
+
+    time_s: float
+    vehicles: Tuple[VehicleRow, ...]
+    signals: Tuple[Tuple[str, str], ...]  # (direction, color) per intersection
+    summary: Dict[str, float] = field(default_factory=dict)
+    wall_time: float = field(default_factory=time.perf_counter)
+
+    @classmethod
+    def capture(cls, world, time_s: float, summary: Optional[Dict[str, float]] = None) -> "WorldSnapshot":
+        world.sync()
+        rank = world.route_index().rank
+        vehicles = tuple(
+            (v.id, rank[v.road], v.pos_m, v.sprite_key or v.kind)
+            for v in world.vehicles if not v.finished
+        )
+        signals = tuple((i.signal.direction, i.signal.color) for i in world.intersections)
+        return cls(time_s, vehicles, signals, dict(summary or {}))
+
+    def interpolate(self, prev: Optional["WorldSnapshot"], alpha: float) -> Tuple[VehicleRow, ...]:
+        """Vehicle rows blended from ``prev`` towards this snapshot.
+
+        Cars that changed road (or are new) are shown at their current spot.
+        """
+        if prev is None or alpha >= 1.0:
+            return self.vehicles
+        before = {vid: (ri, pos) for vid, ri, pos, _ in prev.vehicles}
+        rows = []
+        for vid, ri, pos, key in self.vehicles:
+            old = before.get(vid)
+            if old is not None and old[0] == ri:
+                pos = old[1] + (pos - old[1]) * alpha
+            rows.append((vid, ri, pos, key))
+        return tuple(rows)
+
+
+class SnapshotBuffer:
+    """Double buffer between a simulation thread and a render loop.
+
+    The producer fills the back slot with :meth:`publish`; the consumer
+    swaps it to the front with :meth:`acquire`. Snapshots overwritten before
+    the consumer saw them are counted in ``dropped``. :meth:`due` throttles
+    capture to ``max_fps`` so the simulation only pays for frames a viewer
+    can actually show.
+    """
+
+    def __init__(self, max_fps: float = 60.0) -> None:
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._back: Optional[WorldSnapshot] = None
+        self._front: Optional[WorldSnapshot] = None
+        self._prev: Optional[WorldSnapshot] = None
+        self._last_publish = float("-inf")
+        self.published = 0
+        self.dropped = 0
+        self.closed = False
+
+    def due(self) -> bool:
+        return time.perf_counter() - self._last_publish >= self.min_interval
+
+    def publish(self, snap: WorldSnapshot) -> None:
+        with self._lock:
+            if self._back is not None:
+                self.dropped += 1
+            self._back = snap
+            self.published += 1
+        self._last_publish = snap.wall_time
+
+    def acquire(self) -> Tuple[Optional[WorldSnapshot], Optional[WorldSnapshot]]:
+        """Return ``(previous, current)``; ``current`` is the newest snapshot."""
+        with self._lock:
+            if self._back is not None:
+                self._prev, self._front, self._back = self._front, self._back, None
+            return self._prev, self._front
+
+    def close(self) -> None:
+        """Mark the producer as finished."""
+        self.closed = True
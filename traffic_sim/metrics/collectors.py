@@ -1,19 +1,66 @@
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import Dict
+
+from .sketch import QuantileSketch
 
 @dataclass
 class Metrics:
-    completed_times: List[float] = field(default_factory=list)
+    """Streaming travel-time statistics with O(1) memory per exit.
+
+    Keeps running count/sum/variance (Welford) and a quantile sketch, so
+    summaries are cheap to read every tick and collectors from parallel runs
+    or shards can be combined with :meth:`merge`.
+    """
     entered: int = 0
     exited: int = 0
+    total_travel_s: float = 0.0
+    mean_travel_s: float = 0.0
+    m2_travel: float = 0.0  # sum of squared deviations from the mean
+    travel_sketch: QuantileSketch = field(default_factory=QuantileSketch)
+    _summary: Dict[str, float] | None = field(default=None, init=False, repr=False, compare=False)
 
-    def on_enter(self):
-        self.entered += 1
+    def on_enter(self, n: int = 1):
+        self.entered += n
+        self._summary = None
 
     def on_exit(self, t: float, car):
+        tt = max(0.0, t - car.enter_time_s)
         self.exited += 1
-        self.completed_times.append(max(0.0, t - car.enter_time_s))
+        self.total_travel_s += tt
+        delta = tt - self.mean_travel_s
+        self.mean_travel_s += delta / self.exited
+        self.m2_travel += delta * (tt - self.mean_travel_s)
+        self.travel_sketch.add(tt)
+        self._summary = None
+
+    def merge(self, other: "Metrics") -> None:
+        """Fold another collector into this one (Chan et al. for variance)."""
+        n_a, n_b = self.exited, other.exited
+        n = n_a + n_b
+        if n:
+            delta = other.mean_travel_s - self.mean_travel_s
+            self.mean_travel_s += delta * n_b / n
+            self.m2_travel += other.m2_travel + delta * delta * n_a * n_b / n
+        self.entered += other.entered
+        self.exited = n
+        self.total_travel_s += other.total_travel_s
+        self.travel_sketch.merge(other.travel_sketch)
+        self._summary = None
+
+    def variance(self) -> float:
+        return self.m2_travel / (self.exited - 1) if self.exited > 1 else 0.0
 
     def summary(self) -> Dict[str, float]:
-        avg = sum(self.completed_times)/len(self.completed_times) if self.completed_times else 0.0
-        return {"entered": self.entered, "exited": self.exited, "avg_travel_time_s": round(avg, 2)}
\ No newline at end of file
+        if self._summary is None:
+            avg = self.total_travel_s / self.exited if self.exited else 0.0
+            q = self.travel_sketch.quantile
+            self._summary = {
+                "entered": self.entered,
+                "exited": self.exited,
+                "avg_travel_time_s": round(avg, 2),
+                "std_travel_time_s": round(self.variance() ** 0.5, 2),
+                "p50_travel_time_s": round(q(0.5), 2),
+                "p90_travel_time_s": round(q(0.9), 2),
+                "p99_travel_time_s": round(q(0.99), 2),
+            }
+        return dict(self._summary)
@@ -0,0 +1,79 @@
+"""Mergeable quantile sketch with bounded memory."""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class QuantileSketch:
+    """Log-bucketed histogram giving quantiles within ``rel_accuracy``.
+
+    Values fall into buckets ``(gamma**(k-1), gamma**k]`` with
+    ``gamma = (1 + a) / (1 - a)``, so any reported quantile is within a
+    relative error ``a`` of the true sample. Two sketches with the same
+    accuracy merge exactly by adding bucket counts. Memory is capped at
+    ``max_buckets``; past that the lowest buckets are folded together, which
+    only loses accuracy at the very bottom of the distribution.
+    """
+
+    rel_accuracy: float = 0.01
+    max_buckets: int = 2048
+    buckets: Dict[int, int] = field(default_factory=dict)
+    zero_count: int = 0  # values <= 0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self._gamma = (1 + self.rel_accuracy) / (1 - self.rel_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._keys: Optional[List[int]] = None  # sorted bucket keys, rebuilt after a new bucket
+
+    def _sorted_keys(self) -> List[int]:
+        if self._keys is None:
+            self._keys = sorted(self.buckets)
+        return self._keys
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        if x <= 0.0:
+            self.zero_count += 1
+            return
+        k = math.ceil(math.log(x) / self._log_gamma)
+        n = self.buckets.get(k)
+        if n is None:
+            self._keys = None
+            n = 0
+        self.buckets[k] = n + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.rel_accuracy != self.rel_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for k, n in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + n
+        self._keys = None
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile ``q`` in [0, 1]; 0.0 for an empty sketch."""
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        keys = self._sorted_keys()
+        for k in keys:
+            seen += self.buckets[k]
+            if rank < seen:
+                return 2.0 * self._gamma ** k / (self._gamma + 1)
+        return 2.0 * self._gamma ** keys[-1] / (self._gamma + 1)
+
+    def _collapse(self) -> None:
+        keys = self._sorted_keys()
+        self.buckets[keys[1]] += self.buckets.pop(keys.pop(0))
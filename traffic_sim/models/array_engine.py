@@ -0,0 +1,318 @@
+"""Structure-of-arrays vehicle engine backed by NumPy."""
+from __future__ import annotations
+
+from typing import Dict, List
+
+import numpy as np
+
+from .routing import EXIT_PROB, GOLDEN, MASK, MIX1, MIX2
+from .traffic_light import DIR_CODES, Color
+from .world import MIN_GAP_M
+
+_U64 = np.uint64
+_GREEN = int(Color.GREEN)
+
+
+def _mix64(z: np.ndarray) -> np.ndarray:
+    z = (z ^ (z >> _U64(30))) * _U64(MIX1)
+    z = (z ^ (z >> _U64(27))) * _U64(MIX2)
+    return z ^ (z >> _U64(31))
+
+
+def route_draws(keys: np.ndarray, hops: np.ndarray):
+    """Vectorized :func:`traffic_sim.models.routing.route_draws` (uint64 wraps like ``& MASK``)."""
+    base = keys + hops.astype(np.uint64) * _U64((2 * GOLDEN) & MASK)
+    z1 = _mix64(base + _U64(GOLDEN))
+    z2 = _mix64(base + _U64((2 * GOLDEN) & MASK))
+    scale = 2.0**-53
+    return (z1 >> _U64(11)).astype(np.float64) * scale, (z2 >> _U64(11)).astype(np.float64) * scale
+
+
+class ArrayEngine:
+    """Advance a :class:`World` with batched array operations.
+
+    Positions, speeds, target speeds, road indices and finished flags live in
+    contiguous arrays. Car-following, stop-line clamping, end-of-road
+    detection and routing (with the same per-car draws as
+    :meth:`World._choose_next_road`) are computed for all cars at once. An
+    entry sequence number per car reproduces the per-object loop's queue
+    order for cars tied on position (the later arrival queues behind).
+
+    The arrays are authoritative while the engine is attached. ``Vehicle``
+    objects are refreshed by :meth:`sync`, except that cars which finish are
+    flagged right away and returned from :meth:`tick`. Their slots go on a
+    free list and are reused by later spawns, so the arrays stay sized to the
+    peak number of active cars.
+    """
+
+    def __init__(self, world, capacity: int = 1024) -> None:
+        self.world = world
+        self.pos = np.zeros(capacity, dtype=np.float64)
+        self.speed = np.zeros(capacity, dtype=np.float64)
+        self.target_speed = np.zeros(capacity, dtype=np.float64)
+        self.road = np.zeros(capacity, dtype=np.int32)
+        self.seq = np.zeros(capacity, dtype=np.int64)
+        self.route_key = np.zeros(capacity, dtype=np.uint64)
+        self.hops = np.zeros(capacity, dtype=np.int64)
+        self.finished = np.zeros(capacity, dtype=bool)
+        self.objs: List = []  # slot -> Vehicle, None for free slots
+        self._free: List[int] = []
+        self._n = 0
+        self._next_seq = 0
+        self._back_key = None  # roads last asked for by back_positions
+        self.rebuild_roads()
+
+    # --- static road tables -------------------------------------------------
+    def rebuild_roads(self) -> None:
+        """(Re)build per-road arrays and routing tables from the world's route index."""
+        world = self.world
+        old_roads = getattr(self, "roads", None)
+        self._index = world.route_index()
+        roads = self._index.roads
+        self.roads = roads
+        self.road_index: Dict[object, int] = self._index.rank
+        self.road_len = np.array([rd.length_m for rd in roads], dtype=np.float64)
+
+        dir_codes: Dict[str, int] = {}
+        self._dir_codes = dir_codes
+        self.road_dir = np.array(
+            [dir_codes.setdefault(rd.approach_dir, len(dir_codes)) for rd in roads],
+            dtype=np.int32,
+        )
+
+        inter_index: Dict[int, int] = {}
+        self._inters = []
+        self._signals = []
+        road_inter = []
+        for rd in roads:
+            inter = rd.to_intersection
+            k = inter_index.get(id(inter))
+            if k is None:
+                k = inter_index[id(inter)] = len(self._signals)
+                self._inters.append(inter)
+                self._signals.append(inter.signal)
+            road_inter.append(k)
+        self.road_inter = np.array(road_inter, dtype=np.int32)
+        # signal direction code each road waits for (-2: never green)
+        self.road_signal_dir = np.array([DIR_CODES.get(rd.approach_dir, -2) for rd in roads], dtype=np.int32)
+
+        # detector reach per road and last published counts per (node, direction)
+        self._dir_names = list(dir_codes)
+        self.road_window = np.array([rd.to_intersection.detector_m for rd in roads], dtype=np.float64)
+        self._det_counts = np.zeros(len(self._inters) * max(1, len(dir_codes)), dtype=np.int64)
+
+        # Routing tables taken from the world's junction index: candidates
+        # padded into a (road, choice) table, -1 fallback for none
+        index = self._index
+        rank = self.road_index
+        routes = [index.routes[rd] for rd in roads]
+        width = max([len(cands) for _, cands, _ in routes] + [1])
+        self._border = np.array([at_border for at_border, _, _ in routes], dtype=bool)
+        self._n_choices = np.array([len(cands) for _, cands, _ in routes], dtype=np.int64)
+        self._choices = np.full((len(roads), width), -1, dtype=np.int32)
+        for i, (_, cands, _) in enumerate(routes):
+            self._choices[i, :len(cands)] = [rank[r2] for r2 in cands]
+        self._fallback = np.array(
+            [-1 if fallback is None else rank[fallback] for _, _, fallback in routes], dtype=np.int32)
+
+        # re-map vehicles already tracked
+        if old_roads is not None and self._n:
+            remap = np.array([self.road_index.get(rd, -1) for rd in old_roads], dtype=np.int32)
+            self.road[:self._n] = remap[self.road[:self._n]]
+
+    def _route(self, slots: np.ndarray, r: np.ndarray) -> np.ndarray:
+        """Next road index for the cars in ``slots`` leaving roads ``r`` (-1 = exit)."""
+        u_exit, u_pick = route_draws(self.route_key[slots], self.hops[slots])
+        self.hops[slots] += 1
+        n = self._n_choices[r]
+        pick = np.minimum((u_pick * n).astype(np.int64), np.maximum(n - 1, 0))
+        nxt = np.where(n > 0, self._choices[r, pick], self._fallback[r])
+        nxt[self._border[r] & (u_exit < EXIT_PROB)] = -1
+        return nxt
+
+    # --- vehicle storage ----------------------------------------------------
+    def _grow(self, need: int) -> None:
+        cap = len(self.pos)
+        if need <= cap:
+            return
+        new_cap = max(need, cap * 2)
+        for name in ("pos", "speed", "target_speed", "road", "seq", "route_key", "hops", "finished"):
+            old = getattr(self, name)
+            arr = np.zeros(new_cap, dtype=old.dtype)
+            arr[:cap] = old
+            setattr(self, name, arr)
+
+    def add(self, vehicles: List) -> None:
+        """Track new vehicles, reusing slots freed by retired ones first."""
+        if not vehicles:
+            return
+        if self._index is not self.world.route_index():
+            self.rebuild_roads()
+        k = min(len(vehicles), len(self._free))
+        reused = [self._free.pop() for _ in range(k)]
+        start = self._n
+        end = start + len(vehicles) - k
+        self._grow(end)
+        self._n = end
+        slots = np.array(reused + list(range(start, end)), dtype=np.int64)
+        self.objs.extend([None] * (end - start))
+        for i, v in zip(slots.tolist(), vehicles):
+            self.objs[i] = v
+
+        self.pos[slots] = [v.pos_m for v in vehicles]
+        self.speed[slots] = 0.0
+        self.target_speed[slots] = [v.target_speed for v in vehicles]
+        self.road[slots] = [self.road_index[v.road] for v in vehicles]
+        self.route_key[slots] = np.array([v.route_key for v in vehicles], dtype=np.uint64)
+        self.hops[slots] = [v.hops for v in vehicles]
+        self.finished[slots] = False
+        self.seq[slots] = np.arange(self._next_seq, self._next_seq + len(vehicles))
+        self._next_seq += len(vehicles)
+
+    def back_positions(self, roads) -> List[float]:
+        """Position of the rearmost tracked car on each of ``roads`` (``inf`` when empty)."""
+        if self._index is not self.world.route_index():
+            self.rebuild_roads()
+        m = len(roads)
+        key = (id(roads), m, self._index)
+        if self._back_key != key:
+            # road rank -> position in ``roads``; m for roads not asked for
+            self._back_slot = np.full(len(self.roads), m, dtype=np.int64)
+            self._back_slot[[self.road_index[rd] for rd in roads]] = np.arange(m)
+            self._back_key = key
+        n = self._n
+        slot = self._back_slot[self.road[:n]]
+        on = np.flatnonzero((slot < m) & ~self.finished[:n])
+        out = np.full(m + 1, np.inf)
+        np.minimum.at(out, slot[on], self.pos[on])
+        return out[:m].tolist()
+
+    def reset(self) -> None:
+        """Drop every tracked car."""
+        self.finished[:self._n] = True
+        self.objs = []
+        self._free = []
+        self._n = 0
+        self._next_seq = 0
+
+    def queues(self) -> Dict[object, List]:
+        """Tracked cars per road, back of the queue to the front (as ``World.queue``)."""
+        self.sync()
+        active = np.flatnonzero(~self.finished[:self._n])
+        order = active[np.lexsort((-self.seq[active], self.pos[active], self.road[active]))]
+        out: Dict[object, List] = {}
+        roads, objs = self.roads, self.objs
+        for i, ri in zip(order.tolist(), self.road[order].tolist()):
+            out.setdefault(roads[ri], []).append(objs[i])
+        return out
+
+    def update_detectors(self, full: bool = False) -> None:
+        """Publish per-approach detector counts to the intersections.
+
+        Counts are recomputed with one ``bincount`` over the cars; only the
+        entries that changed since the last call are written back, unless
+        ``full``.
+        """
+        if self._index is not self.world.route_index():
+            self.rebuild_roads()
+            full = True
+        nd = max(1, len(self._dir_names))
+        active = np.flatnonzero(~self.finished[:self._n])
+        r = self.road[active]
+        inside = r[self.road_len[r] - self.pos[active] <= self.road_window[r]]
+        counts = np.bincount(self.road_inter[inside] * nd + self.road_dir[inside],
+                             minlength=len(self._det_counts))
+        changed = np.arange(len(counts)) if full else np.flatnonzero(counts != self._det_counts)
+        inters, names = self._inters, self._dir_names
+        for k, c in zip(changed.tolist(), counts[changed].tolist()):
+            if k % nd < len(names):
+                inters[k // nd].occupancy[names[k % nd]] = c
+        self._det_counts = counts
+
+    def _green_roads(self) -> np.ndarray:
+        signals = self._signals
+        green_dir = np.fromiter((s.dir_code if s.color_code == _GREEN else -1 for s in signals),
+                                np.int32, len(signals))
+        return green_dir[self.road_inter] == self.road_signal_dir
+
+    # --- stepping -----------------------------------------------------------
+    def tick(self, dt: float) -> List:
+        """Advance all tracked cars; return the vehicles that left the network."""
+        if self._index is not self.world.route_index():
+            self.rebuild_roads()
+        n = self._n
+        active = np.flatnonzero(~self.finished[:n])
+        if active.size == 0:
+            return []
+
+        # Sort each road's cars back to front; ties put the later arrival behind.
+        order = np.lexsort((-self.seq[active], self.pos[active], self.road[active]))
+        idx = active[order]
+        r = self.road[idx]
+        p = self.pos[idx]
+        length = self.road_len[r]
+
+        # leader gap: the next car on the same road, using its pre-tick position
+        max_pos = length.copy()
+        same_road = r[1:] == r[:-1]
+        max_pos[:-1][same_road] = np.maximum(0.0, p[1:][same_road] - MIN_GAP_M)
+
+        # red/yellow constraint
+        can_go = self._green_roads()[r]
+        stop_line = length - 2.0
+        blocked = ~can_go
+        max_pos[blocked] = np.minimum(max_pos[blocked], stop_line[blocked])
+
+        new = np.minimum(max_pos, p + self.target_speed[idx] * dt)
+
+        # at end
+        at_end = new >= length - 1e-6
+        wait = at_end & blocked
+        new[wait] = stop_line[wait]
+
+        out = np.flatnonzero(at_end & can_go)
+        if out.size:
+            # per-object loop's transfer order (by road, front car first) sets
+            # the queue order of cars entering the same road this tick
+            out = out[np.lexsort((-out, r[out]))]
+            nxt = self._route(idx[out], r[out])
+            moved = nxt >= 0
+            new[out[moved]] = 0.0
+            gone = out[~moved]
+        else:
+            gone = out
+
+        self.speed[idx] = (new - p) / dt if dt else 0.0
+        self.pos[idx] = new
+        if out.size:
+            entered = idx[out[moved]]
+            self.road[entered] = nxt[moved]
+            self.seq[entered] = np.arange(self._next_seq, self._next_seq + entered.size)
+            self._next_seq += entered.size
+        exited = []
+        if gone.size:
+            # retire: flag the objects now and hand their slots to the free list
+            done = idx[gone]
+            self.finished[done] = True
+            self.speed[done] = 0.0
+            objs = self.objs
+            for i, p_end, hops in zip(done.tolist(), self.pos[done].tolist(), self.hops[done].tolist()):
+                v = objs[i]
+                v.pos_m = p_end
+                v.hops = hops
+                v.finished = True
+                objs[i] = None
+                exited.append(v)
+            self._free.extend(done.tolist())
+        return exited
+
+    def sync(self) -> None:
+        """Write array state back onto the ``Vehicle`` objects."""
+        n = self._n
+        roads = self.roads
+        for v, p, ri, hops in zip(self.objs, self.pos[:n].tolist(), self.road[:n].tolist(),
+                                  self.hops[:n].tolist()):
+            if v is not None:
+                v.pos_m = p
+                v.road = roads[ri]
+                v.hops = hops
@@ -11,7 +11,61 @@ def is_road(ch: str) -> bool:
 
 DIRS = {"N": (-1, 0), "S": (1, 0), "W": (0, -1), "E": (0, 1)}
 
-def build_world_from_grid(grid: List[List[str]]) -> World:
+JUNCTION_TILES = {"+", "T"}
+
+
+def build_world_from_grid(
+    grid: List[List[str]],
+    array_engine: bool = False,
+    compress: bool = False,
+    lazy: bool = False,
+) -> World:
+    """Road network for an ASCII tile grid.
+
+    By default every road tile is a signalised node linked to its
+    neighbours by one-tile roads. With ``compress`` only real junctions
+    (``+``/``T`` tiles and tiles that do not continue in exactly two
+    directions, such as dead ends at the map edge) become nodes, and each
+    run of tiles between two of them becomes a single road whose
+    ``screen_points`` follow the tiles, corners included.
+
+    ``array_engine`` / ``lazy`` attach an :class:`ArrayEngine` /
+    :class:`LazyEngine` (see :func:`attach_engine`).
+    """
+    if compress:
+        world = _build_compressed(grid)
+    else:
+        world = _build_tiles(grid)
+    world.rebuild_routes()
+    attach_engine(world, array_engine, lazy)
+    return world
+
+
+def attach_engine(world: World, array_engine: bool = False, lazy: bool = False) -> World:
+    """Step ``world`` with the array engine, the lazy engine or (neither) the object loop."""
+    if array_engine and lazy:
+        raise ValueError("Choose either the array engine or the lazy engine")
+    if array_engine:
+        from .array_engine import ArrayEngine  # needs numpy
+        world.engine = ArrayEngine(world)
+    elif lazy:
+        from .lazy_engine import LazyEngine
+        world.engine = LazyEngine(world)
+    return world
+
+
+def _center_px(rc: Tuple[int, int]) -> Tuple[int, int]:
+    rr, cc = rc
+    return int((cc + 0.5) * TILE_PX), int((rr + 0.5) * TILE_PX)
+
+
+def _node(r: int, c: int) -> Intersection:
+    inter = Intersection(name=f"I{r}_{c}")
+    inter.phase_offset_s = ((r * 37 + c * 17) % 13) * 0.5
+    return inter
+
+
+def _build_tiles(grid: List[List[str]]) -> World:
     H, W = len(grid), len(grid[0])
     nodes: Dict[Tuple[int, int], Intersection] = {}
     roads: List[Road] = []
@@ -20,13 +74,7 @@ def build_world_from_grid(grid: List[List[str]]) -> World:
     for r in range(H):
         for c in range(W):
             if is_road(grid[r][c]):
-                inter = Intersection(name=f"I{r}_{c}")
-                inter.phase_offset_s = ((r * 37 + c * 17) % 13) * 0.5
-                nodes[(r, c)] = inter
-
-    def center_px(rc: Tuple[int, int]) -> Tuple[int, int]:
-        rr, cc = rc
-        return int((cc + 0.5) * TILE_PX), int((rr + 0.5) * TILE_PX)
+                nodes[(r, c)] = _node(r, c)
 
     # directed roads between neighbors
     for (r, c), a in nodes.items():
@@ -43,11 +91,55 @@ def build_world_from_grid(grid: List[List[str]]) -> World:
                     to_intersection=b,
                     approach_dir=approach,
                 )
-                rd.screen_points = [center_px((r, c)), center_px((r2, c2))]
+                rd.screen_points = [_center_px((r, c)), _center_px((r2, c2))]
                 rd.from_tile = (r, c)
                 rd.to_tile = (r2, c2)
                 roads.append(rd)
 
     world = World(roads=roads, intersections=list(nodes.values()), vehicles=[])
     world._grid_size = (H, W)  # hint for border exits
-    return world
\ No newline at end of file
+    return world
+
+
+def _build_compressed(grid: List[List[str]]) -> World:
+    H, W = len(grid), len(grid[0])
+    tiles = {(r, c) for r in range(H) for c in range(W) if is_road(grid[r][c])}
+
+    def neighbours(rc: Tuple[int, int]) -> List[Tuple[int, int]]:
+        r, c = rc
+        return [(r + dr, c + dc) for dr, dc in DIRS.values() if (r + dr, c + dc) in tiles]
+
+    nodes: Dict[Tuple[int, int], Intersection] = {}
+    for rc in sorted(tiles):
+        if grid[rc[0]][rc[1]] in JUNCTION_TILES or len(neighbours(rc)) != 2:
+            nodes[rc] = _node(*rc)
+
+    # one road per (node, outgoing direction): follow the tiles to the next node
+    roads: List[Road] = []
+    for start in nodes:
+        for first in neighbours(start):
+            path = [start, first]
+            while path[-1] not in nodes:
+                step = [n for n in neighbours(path[-1]) if n != path[-2]]
+                path.append(step[0])
+            end, before = path[-1], path[-2]
+            # keep only the end points and the corners of the polyline
+            points = [path[0]] + [
+                b for a, b, c in zip(path, path[1:], path[2:])
+                if (b[0] - a[0], b[1] - a[1]) != (c[0] - b[0], c[1] - b[1])
+            ] + [end]
+            rd = Road(
+                name=f"R{start[0]}_{start[1]}_to_{end[0]}_{end[1]}",
+                length_m=TILE_M * (len(path) - 1),
+                speed_mps=10.0,
+                to_intersection=nodes[end],
+                approach_dir="EW" if before[0] == end[0] else "NS",
+            )
+            rd.screen_points = [_center_px(rc) for rc in points]
+            rd.from_tile = start
+            rd.to_tile = end
+            roads.append(rd)
+
+    world = World(roads=roads, intersections=list(nodes.values()), vehicles=[])
+    world._grid_size = (H, W)
+    return world
@@ -1,12 +1,55 @@
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence
+
 from .traffic_light import TrafficLight
 
-@dataclass
+if TYPE_CHECKING:
+    from .road import Road
+
+DETECTOR_M = 25.0  # default detector reach upstream of the stop line
+
+
+@dataclass(slots=True)
 class Intersection:
     name: str
     signal: TrafficLight = field(default_factory=TrafficLight)
     phase_offset_s: float = 0.0  # to desync lights city-wide
+    detector_m: float = DETECTOR_M
+
+    # Incoming roads per approach, and cars within ``detector_m`` of the stop
+    # line per approach; the owning World keeps both up to date.
+    incoming: Dict[str, List["Road"]] = field(default_factory=dict, repr=False, compare=False)
+    occupancy: Dict[str, int] = field(default_factory=lambda: {"NS": 0, "EW": 0}, repr=False, compare=False)
+    _queue_of: Optional[Callable[["Road"], Sequence]] = field(default=None, repr=False, compare=False)
 
     def apply_policy(self, policy, now_s: float):
         direction, color = policy.decide(self, now_s + self.phase_offset_s)
-        self.signal.set_state(direction, color)
\ No newline at end of file
+        self.signal.set_state(direction, color)
+
+    def next_change_time(self, policy, now_s: float) -> float:
+        """When ``policy`` next changes this node's signal (stateless policies only)."""
+        return policy.next_change_time(now_s + self.phase_offset_s) - self.phase_offset_s
+
+    def register_road(self, road, queue_of: Optional[Callable[["Road"], Sequence]] = None):
+        """Record ``road`` as an approach; ``queue_of(road)`` lists its cars (set by World)."""
+        self.incoming.setdefault(road.approach_dir, []).append(road)
+        if queue_of is not None:
+            self._queue_of = queue_of
+
+    def vehicles_for(self, direction: str) -> List:
+        """Cars on the approaches from ``direction``, each road back to front."""
+        queue_of = self._queue_of
+        if queue_of is None:
+            return []
+        return [v for road in self.incoming.get(direction, ()) for v in queue_of(road)]
+
+    def queue_count(self, direction: str, window_m: Optional[float] = None) -> int:
+        """Cars within ``window_m`` of the stop line on the ``direction`` approaches.
+
+        O(1) from the detector counts when ``window_m`` is the detector reach;
+        other windows scan :meth:`vehicles_for`.
+        """
+        if self._queue_of is not None and (window_m is None or window_m == self.detector_m):
+            return self.occupancy.get(direction, 0)
+        window = self.detector_m if window_m is None else window_m
+        return sum(1 for v in self.vehicles_for(direction) if v.road.length_m - v.pos_m <= window)
@@ -0,0 +1,352 @@
+"""Event-driven vehicle engine that moves free-flowing cars in closed form."""
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from operator import attrgetter
+from typing import Dict, List, Optional
+
+from .world import MIN_GAP_M
+
+
+class _Car:
+    """Engine-side state of one vehicle.
+
+    The car is at ``p0`` at the start of tick ``k0`` and moves ``step``
+    metres per tick until tick ``wake``, when it is stepped explicitly
+    again. ``ahead`` / ``behind`` link the cars on a road in queue order,
+    and ``key`` grows towards the front of the queue.
+    """
+
+    __slots__ = ("v", "p0", "k0", "step", "wake", "ahead", "behind", "key")
+
+    def __init__(self, v, k0: int) -> None:
+        self.v = v
+        self.p0 = v.pos_m
+        self.k0 = k0
+        self.step = 0.0
+        self.wake: Optional[int] = None
+        self.ahead: Optional["_Car"] = None
+        self.behind: Optional["_Car"] = None
+        self.key = 0.0
+
+    def pos(self, k: int) -> float:
+        return self.p0 if k == self.k0 else self.p0 + self.step * (k - self.k0)
+
+
+_key = attrgetter("key")
+
+
+class LazyEngine:
+    """Advance a :class:`World` stepping only the cars that can interact.
+
+    A car in free flow, with no leader within reach and no stop line or
+    detector boundary ahead within reach, moves ``target_speed * dt`` every
+    tick, so it is kept as a position at a known tick plus that step. The
+    engine works out the first tick at which the car could next be
+    constrained: its current leader (assumed to keep its pace only until
+    its own wake and to stand still after that, which can only be early),
+    the stop line whatever the light, or the edge of the detector zone.
+    Until then the car is not touched; its position is computed when it is
+    observed (:meth:`sync`, :meth:`queues`, :meth:`back_positions`) or when
+    it becomes somebody's leader. Waking a car early also wakes the cars
+    behind it that counted on it.
+
+    Cars that are stepped follow exactly the rule of :meth:`World._advance`
+    (front car first, leaders at their pre-tick positions), and
+    transfers are routed and queued in the same order. Free-flowing
+    positions are products rather than running sums, so they can differ
+    from the object loop in the last bits.
+
+    A car right behind a leader that moves at a steady pace repeats the
+    leader's moves one tick later, so it sleeps until the leader's wake. A
+    car stopped at a red light, and the stopped queue behind it, sleep until
+    the light lets them go.
+
+    Per-tick work scales with the cars that were due: cars near a junction
+    and cars in a queue that is starting or closing up are stepped every
+    tick. Long roads (see ``build_world_from_grid(compress=True)``) are
+    where most cars run free.
+    """
+
+    def __init__(self, world) -> None:
+        self.world = world
+        self.k = 0          # index of the next tick
+        self.dt: Optional[float] = None
+        self.stepped = 0    # explicit car updates so far
+        self._cars: Dict[int, _Car] = {}             # id(vehicle) -> state
+        self._ends: Dict[object, List[_Car]] = {}    # road -> [back car, front car]
+        self._due: Dict[int, List[_Car]] = defaultdict(list)  # tick -> cars to step then
+        self._parked: Dict[object, _Car] = {}        # road -> car waiting at its red light
+
+    # --- queue bookkeeping ----------------------------------------------------
+    def _schedule(self, c: _Car, k: int) -> None:
+        c.wake = k
+        self._due[k].append(c)
+
+    def _link(self, c: _Car, road, k: int) -> None:
+        """Queue ``c`` on ``road`` by position; ties go behind."""
+        ends = self._ends.get(road)
+        if ends is None:
+            c.ahead = c.behind = None
+            c.key = 0.0
+            self._ends[road] = [c, c]
+            return
+        p = c.p0
+        behind, ahead = None, ends[0]
+        while ahead is not None and ahead.pos(k) < p:
+            behind, ahead = ahead, ahead.ahead
+        c.ahead, c.behind = ahead, behind
+        if ahead is None:
+            c.key = behind.key + 1.0
+            ends[1] = c
+        else:
+            ahead.behind = c
+        if behind is None:
+            c.key = ahead.key - 1.0
+            ends[0] = c
+        else:
+            behind.ahead = c
+            if ahead is not None:
+                c.key = (behind.key + ahead.key) / 2
+            self._wake_chain(behind, k)  # it has a new, closer leader
+
+    def _wake_chain(self, c: Optional[_Car], k: int) -> None:
+        """Step ``c`` at tick ``k``, and the cars behind whose free run assumed it kept going."""
+        while c is not None and (c.wake is None or c.wake > k):
+            self._schedule(c, k)
+            c = c.behind
+
+    def _free_ticks(self, leader: _Car, k: int, p: float, step: float) -> float:
+        """Ticks from ``k`` that a car at ``p`` moving ``step`` surely stays clear of ``leader``.
+
+        The leader keeps its own step until its wake and never moves back
+        after that.
+        """
+        lead = leader.pos(k)
+        wake = leader.wake
+        if wake is None or wake <= k:
+            return (lead - MIN_GAP_M - p) / step - 1.0
+        ticks = (leader.pos(wake) - MIN_GAP_M - p) / step - 1.0
+        if leader.step < step:  # closing in before the leader's wake
+            ticks = min(ticks, (lead - MIN_GAP_M - p - step) / (step - leader.step))
+        return ticks
+
+    def _steady(self, leader: _Car, k: int, pos: float, step: float) -> bool:
+        """Whether ``leader``, at ``pos`` at the start of tick ``k``, keeps a pace of at most ``step``.
+
+        It must have moved ``leader.step`` in tick ``k`` and keep doing so
+        until its wake, at least one more tick.
+        """
+        wake = leader.wake
+        return (wake is not None and wake > k + 1 and 0.0 < leader.step <= step
+                and abs(leader.pos(k + 1) - pos - leader.step) <= 1e-9)
+
+    def _unlink(self, c: _Car, road) -> None:
+        ends = self._ends[road]
+        if c.ahead is None:
+            ends[1] = c.behind
+        else:
+            c.ahead.behind = c.behind
+        if c.behind is None:
+            ends[0] = c.ahead
+        else:
+            c.behind.ahead = c.ahead
+        if ends[0] is None:
+            del self._ends[road]
+        c.ahead = c.behind = None
+
+    def _occupy(self, road, pos: float, delta: int) -> None:
+        inter = road.to_intersection
+        if road.length_m - pos <= inter.detector_m:
+            inter.occupancy[road.approach_dir] += delta
+
+    def add(self, vehicles: List) -> None:
+        """Track new vehicles; each is stepped in the next tick."""
+        k = self.k
+        for v in vehicles:
+            c = self._cars[id(v)] = _Car(v, k)
+            if self.dt is not None:
+                c.step = v.target_speed * self.dt
+            self._link(c, v.road, k)
+            self._occupy(v.road, c.p0, 1)
+            self._schedule(c, k)
+
+    def reset(self) -> None:
+        """Drop every tracked car."""
+        self._cars = {}
+        self._ends = {}
+        self._due = defaultdict(list)
+        self._parked = {}
+
+    # --- observation ----------------------------------------------------------
+    def sync(self) -> None:
+        """Write current positions back onto the ``Vehicle`` objects."""
+        k = self.k
+        for c in self._cars.values():
+            c.v.pos_m = c.pos(k)
+
+    def queues(self) -> Dict[object, List]:
+        """Tracked cars per road, back of the queue to the front (as ``World.queue``)."""
+        self.sync()
+        out: Dict[object, List] = {}
+        for road, (c, _) in self._ends.items():
+            cars = out[road] = []
+            while c is not None:
+                cars.append(c.v)
+                c = c.ahead
+        return out
+
+    def back_positions(self, roads) -> List[float]:
+        """Position of the rearmost tracked car on each of ``roads`` (``inf`` when empty)."""
+        k, ends = self.k, self._ends
+        return [ends[rd][0].pos(k) if rd in ends else math.inf for rd in roads]
+
+    def update_detectors(self, full: bool = False) -> None:
+        """Detector counts are kept up to date as cars are stepped; ``full`` recounts them."""
+        if not full:
+            return
+        k = self.k
+        for road, (c, _) in self._ends.items():
+            while c is not None:
+                self._occupy(road, c.pos(k), 1)
+                c = c.ahead
+
+    # --- stepping -------------------------------------------------------------
+    def _rebase(self, dt: float) -> None:
+        # a new dt changes every step: restart all cars from where they are
+        k = self.k
+        self._due = defaultdict(list)
+        self._parked = {}
+        for c in self._cars.values():
+            c.p0, c.k0 = c.pos(k), k
+            c.step = c.v.target_speed * dt
+            self._schedule(c, k)
+        self.dt = dt
+
+    def tick(self, dt: float) -> List:
+        """Step the cars that are due; return the vehicles that left the network."""
+        if dt != self.dt:
+            self._rebase(dt)
+        k = self.k
+        k1 = k + 1
+        world = self.world
+        rank = world.route_index().rank
+        go = world.refresh_signals()
+        for road, c in list(self._parked.items()):
+            if go[rank[road]]:
+                del self._parked[road]
+                if c.v.road is road:
+                    self._wake_chain(c, k)
+        by_road: Dict[object, List[_Car]] = {}
+        for c in self._due.pop(k, ()):
+            if c.wake == k:
+                c.wake = None
+                cars = by_road.get(c.v.road)
+                if cars is None:
+                    by_road[c.v.road] = [c]
+                else:
+                    cars.append(c)
+
+        due = self._due
+        moving = []
+        for road, cars in by_road.items():
+            if len(cars) > 1:
+                cars.sort(key=_key, reverse=True)  # front car first
+            inter = road.to_intersection
+            can_go = go[rank[road]]
+            length = road.length_m
+            stop_line = length - 2.0
+            window = inter.detector_m
+            crossed = 0
+            last = None  # the car stepped just before, and its pre-tick position
+            last_p = 0.0
+            for c in cars:
+                v = c.v
+                p = c.p0 if c.k0 == k else c.p0 + c.step * (k - c.k0)
+                desired = v.target_speed * dt
+                leader = c.ahead
+                if leader is not None:
+                    # a leader stepped this tick is the car stepped just before
+                    ahead = last_p if leader is last else leader.pos(k)
+                    max_pos = max(0.0, ahead - MIN_GAP_M)
+                else:
+                    max_pos = length
+                if not can_go:
+                    max_pos = min(max_pos, stop_line)
+                new = min(max_pos, p + desired)
+                last, last_p = c, p
+
+                c.p0, c.k0, c.step = new, k1, desired
+                if new >= length - 1e-6:
+                    if can_go:
+                        moving.append(v)
+                        continue
+                    new = c.p0 = stop_line  # wait
+                if (length - new <= window) != (length - p <= window):
+                    crossed += 1 if length - new <= window else -1
+
+                if desired <= 0.0:
+                    continue
+                if new == p and (leader is None or leader.wake is None or new == stop_line):
+                    if new == stop_line and not can_go:
+                        self._parked[road] = c  # at a red light
+                    elif leader is None or leader.wake is not None or new != ahead - MIN_GAP_M:
+                        c.wake = k1
+                        due[k1].append(c)
+                        continue
+                    c.step = 0.0  # parked until woken from the front
+                    continue
+                if new == p + desired:
+                    wake = None  # free
+                elif leader is not None and new == ahead - MIN_GAP_M and self._steady(leader, k, ahead, desired):
+                    # right behind a leader that keeps a steady pace no faster
+                    # than ours: the car repeats its moves one tick later
+                    c.step = leader.step
+                    wake = leader.wake
+                else:
+                    c.wake = k1  # held back: step again next tick
+                    due[k1].append(c)
+                    continue
+                # sleep until the nearest thing it could run into
+                reach = stop_line
+                if length - new > window:
+                    reach = min(reach, length - window)
+                ticks = (reach - new) / c.step - 1.0
+                if wake is None and leader is not None:
+                    ticks = min(ticks, self._free_ticks(leader, k1, new, desired))
+                wake_at = k1 + max(0, int(ticks) - 1)
+                if wake is not None and wake < wake_at:
+                    wake_at = wake
+                c.wake = wake_at
+                due[wake_at].append(c)
+            if crossed:
+                inter.occupancy[road.approach_dir] += crossed
+            self.stepped += len(cars)
+
+        exited = []
+        if moving:
+            moving.sort(key=lambda v: rank[v.road])
+            self.k = k1  # cars queued below start from the next tick
+            for v in moving:
+                road = v.road
+                c = self._cars[id(v)]
+                v.pos_m = c.p0
+                if c.behind is not None and c.behind.wake is None:
+                    self._wake_chain(c.behind, k1)  # cars parked behind it can move up
+                self._unlink(c, road)
+                self._occupy(road, c.p0, -1)
+                nxt = world._choose_next_road(road, v)
+                if nxt is not None:
+                    v.road = nxt
+                    v.pos_m = c.p0 = 0.0
+                    v.finished = False
+                    self._link(c, nxt, k1)
+                    self._occupy(nxt, 0.0, 1)
+                    self._schedule(c, k1)
+                else:
+                    v.finished = True
+                    del self._cars[id(v)]
+                    exited.append(v)
+        self.k = k1
+        return exited
@@ -5,7 +5,7 @@
 # AFTER
 from dataclasses import dataclass
 
-@dataclass(eq=False)   # identity-based equality & hash, safe for dict keys
+@dataclass(eq=False, slots=True)   # identity-based equality & hash, safe for dict keys
 class Road:
     name: str
     length_m: float
@@ -0,0 +1,71 @@
+"""Junction adjacency index used to route cars between roads."""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .road import Road
+
+Tile = Tuple[int, int]
+EXIT_PROB = 0.35  # chance a car leaves the map at a border junction
+
+# SplitMix64 constants for the per-car routing stream
+GOLDEN = 0x9E3779B97F4A7C15
+MIX1 = 0xBF58476D1CE4E5B9
+MIX2 = 0x94D049BB133111EB
+MASK = (1 << 64) - 1
+# (at_border, candidates, fallback): candidates already prefer straight ahead
+# and exclude U-turns; fallback is used only when there are no candidates.
+Route = Tuple[bool, List[Road], Optional[Road]]
+
+
+class RouteIndex:
+    """Outgoing roads per tile and a precomputed route for every road."""
+
+    def __init__(self, roads: Sequence[Road], grid_size: Tuple[int, int] | None = None) -> None:
+        self.roads: List[Road] = list(roads)
+        self.rank: Dict[Road, int] = {rd: i for i, rd in enumerate(self.roads)}
+
+        self.outgoing: Dict[Optional[Tile], List[Road]] = {}
+        for rd in self.roads:
+            self.outgoing.setdefault(getattr(rd, "from_tile", None), []).append(rd)
+
+        self.routes: Dict[Road, Route] = {}
+        for rd in self.roads:
+            tile = getattr(rd, "to_tile", None)
+            prev_tile = getattr(rd, "from_tile", None)
+
+            at_border = False
+            if grid_size and tile is not None:
+                H, W = grid_size
+                r, c = tile
+                at_border = (r == 0 or r == H - 1 or c == 0 or c == W - 1)
+
+            outgoing = self.outgoing.get(tile, [])
+            cands = [r2 for r2 in outgoing if getattr(r2, "to_tile", None) != prev_tile]
+            straight = [r2 for r2 in cands if r2.approach_dir == rd.approach_dir]
+            fallback = outgoing[0] if outgoing and not cands else None
+            self.routes[rd] = (at_border, straight or cands, fallback)
+
+    def __len__(self) -> int:
+        return len(self.roads)
+
+
+def _mix64(z: int) -> int:
+    z = ((z ^ (z >> 30)) * MIX1) & MASK
+    z = ((z ^ (z >> 27)) * MIX2) & MASK
+    return z ^ (z >> 31)
+
+
+def route_draws(key: int, hop: int) -> Tuple[float, float]:
+    """Two uniform draws in [0, 1) for a car's ``hop``-th junction.
+
+    Routing randomness is a counter-based SplitMix64 stream keyed by the
+    car's ``route_key``, so a decision depends only on the car and how many
+    junctions it has passed, not on which other cars were routed before it.
+    That keeps runs reproducible whatever order (or process) cars are
+    routed in.
+    """
+    base = key + 2 * hop * GOLDEN
+    z1 = _mix64((base + GOLDEN) & MASK)
+    z2 = _mix64((base + 2 * GOLDEN) & MASK)
+    return (z1 >> 11) * 2.0**-53, (z2 >> 11) * 2.0**-53
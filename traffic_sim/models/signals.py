@@ -0,0 +1,48 @@
+"""Array view of every intersection's signal, for batched policies."""
+from __future__ import annotations
+
+from typing import List, Sequence
+
+import numpy as np
+
+from .intersection import Intersection
+from .traffic_light import TrafficLight
+
+
+class SignalBank:
+    """Phase offsets and direction/color codes for a list of intersections.
+
+    :meth:`apply` takes the code arrays returned by a policy's
+    ``decide_batch`` and writes only the signals that actually changed back
+    onto the ``TrafficLight`` objects, so per-tick Python work is
+    proportional to the number of phase changes rather than nodes.
+    """
+
+    def __init__(self, intersections: Sequence[Intersection]) -> None:
+        self.intersections: List[Intersection] = list(intersections)
+        self.signals = [inter.signal for inter in self.intersections]
+        self.offsets = np.array([inter.phase_offset_s for inter in self.intersections], dtype=np.float64)
+        self.dirs = np.empty(len(self.signals), dtype=np.int8)
+        self.colors = np.empty(len(self.signals), dtype=np.int8)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.signals)
+
+    def refresh(self) -> None:
+        """Re-read codes from the signal objects (after per-node updates)."""
+        self.seen = TrafficLight.changes
+        self.dirs[:] = [s.dir_code for s in self.signals]
+        self.colors[:] = [s.color_code for s in self.signals]
+
+    def apply(self, dirs: np.ndarray, colors: np.ndarray) -> None:
+        changed = np.flatnonzero((dirs != self.dirs) | (colors != self.colors))
+        if not changed.size:
+            return
+        signals = self.signals
+        for k, d, c in zip(changed.tolist(), dirs[changed].tolist(), colors[changed].tolist()):
+            sig = signals[k]
+            sig.dir_code = d
+            sig.color_code = c
+        self.dirs[changed] = dirs[changed]
+        self.colors[changed] = colors[changed]
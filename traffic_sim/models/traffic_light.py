@@ -1,20 +1,95 @@
-from dataclasses import dataclass
+from enum import IntEnum
 
 VALID_DIRS = {"NS", "EW"}
 VALID_COLORS = {"RED", "YELLOW", "GREEN"}
 
-@dataclass
+
+class Direction(IntEnum):
+    """Integer codes for signal directions, used by batched policies."""
+    NS = 0
+    EW = 1
+
+
+class Color(IntEnum):
+    """Integer codes for signal colors, used by batched policies."""
+    RED = 0
+    YELLOW = 1
+    GREEN = 2
+
+
+DIR_NAMES = tuple(d.name for d in Direction)
+COLOR_NAMES = tuple(c.name for c in Color)
+
+# plain dicts: much cheaper per lookup than Enum.__getitem__
+DIR_CODES = {name: code for code, name in enumerate(DIR_NAMES)}
+COLOR_CODES = {name: code for code, name in enumerate(COLOR_NAMES)}
+_GREEN = int(Color.GREEN)
+_YELLOW = int(Color.YELLOW)
+
+
+class SignalStateError(ValueError, AssertionError):
+    """An unknown direction or color; an AssertionError as when set_state used assert."""
+
+
 class TrafficLight:
-    direction: str = "NS"
-    color: str = "RED"
+    """Which direction a node's signal serves and in which color.
+
+    State is held as the integer codes ``dir_code`` / ``color_code``
+    (:class:`Direction` / :class:`Color`); ``direction`` and ``color`` read
+    and write the same state as strings. Every :meth:`set_state` bumps the
+    class-wide ``changes`` counter, which tells a :class:`SignalBank` that
+    its cached codes may be stale; code writing the integer codes directly
+    must refresh the bank itself.
+    """
+
+    __slots__ = ("dir_code", "color_code")
+    changes = 0
+
+    def __init__(self, direction: str = "NS", color: str = "RED"):
+        self.set_state(direction, color)
+
+    def __repr__(self) -> str:
+        return f"TrafficLight(direction={self.direction!r}, color={self.color!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TrafficLight):
+            return NotImplemented
+        return self.dir_code == other.dir_code and self.color_code == other.color_code
+
+    __hash__ = None  # mutable, like the dataclass it replaces
+
+    @property
+    def direction(self) -> str:
+        return DIR_NAMES[self.dir_code]
+
+    @direction.setter
+    def direction(self, direction: str):
+        self.set_state(direction, self.color)
+
+    @property
+    def color(self) -> str:
+        return COLOR_NAMES[self.color_code]
+
+    @color.setter
+    def color(self, color: str):
+        self.set_state(self.direction, color)
+
+    @property
+    def green_code(self) -> int:
+        """``dir_code`` while green, else -1."""
+        return self.dir_code if self.color_code == _GREEN else -1
 
     def set_state(self, direction: str, color: str):
-        assert direction in VALID_DIRS and color in VALID_COLORS
-        self.direction = direction
-        self.color = color
+        d = DIR_CODES.get(direction)
+        c = COLOR_CODES.get(color)
+        if d is None or c is None:
+            raise SignalStateError(f"Bad signal state {direction!r}/{color!r}")
+        self.dir_code = d
+        self.color_code = c
+        TrafficLight.changes += 1
 
     def is_green_for(self, approach_dir: str) -> bool:
-        return self.direction == approach_dir and self.color == "GREEN"
+        return self.color_code == _GREEN and self.dir_code == DIR_CODES.get(approach_dir)
 
     def is_yellow_for(self, approach_dir: str) -> bool:
-        return self.direction == approach_dir and self.color == "YELLOW"
\ No newline at end of file
+        return self.color_code == _YELLOW and self.dir_code == DIR_CODES.get(approach_dir)
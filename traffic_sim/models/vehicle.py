@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Vehicle:
     id: int
     road: "Road"
@@ -14,6 +14,8 @@ class Vehicle:
     exit_time_s: float = 0.0
     kind: str = "sedan"
     sprite_key: str | None = None
+    route_key: int | None = None  # seeds this car's routing draws; set on entry
+    hops: int = 0                 # junctions passed so far
 
     def __post_init__(self):
         if self.target_speed is None:
@@ -25,6 +27,14 @@ class Vehicle:
         elif self.kind.startswith("sports"):
             self.target_speed *= 1.2
 
-    # Movement handled in World.tick (car-following + signals)
-    def update(self, dt: float, intersection: "Intersection"):  # noqa: ARG002
-        return
\ No newline at end of file
+    def update(self, dt: float, intersection: "Intersection"):
+        """Advance this car alone on its road, stopping at the line unless green.
+
+        World.tick applies the same rule to whole queues (plus car-following
+        and transfers); this is the single-car version.
+        """
+        road = self.road
+        max_pos = road.length_m
+        if not intersection.signal.is_green_for(road.approach_dir):
+            max_pos = road.length_m - 2.0  # stop line
+        self.pos_m = min(max_pos, self.pos_m + self.target_speed * dt)
\ No newline at end of file
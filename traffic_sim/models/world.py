@@ -1,90 +1,332 @@
+import math
+import random
+from bisect import bisect_left
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Dict
+from operator import attrgetter
+from typing import TYPE_CHECKING, Deque, List, Dict, Optional, Sequence
 from .road import Road
 from .vehicle import Vehicle
 from .intersection import Intersection
+from .routing import EXIT_PROB, RouteIndex, route_draws
+from .traffic_light import DIR_CODES, Color, TrafficLight
+
+if TYPE_CHECKING:
+    from .array_engine import ArrayEngine
+    from .signals import SignalBank
 
 MIN_GAP_M = 5.0  # min bumper distance
+_GREEN = int(Color.GREEN)
+
+_pos = attrgetter("pos_m")
 
 @dataclass
 class World:
     roads: List[Road] = field(default_factory=list)
     intersections: List[Intersection] = field(default_factory=list)
     vehicles: List[Vehicle] = field(default_factory=list)
+    engine: Optional["ArrayEngine"] = field(default=None, repr=False)  # see array_engine.py, lazy_engine.py
+
+    # Per-road queues ordered back to front; updated on spawn, transfer and exit.
+    _queues: Dict[Road, Deque[Vehicle]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _n_seen: int = field(default=0, init=False, repr=False, compare=False)
+    _active: int = field(default=0, init=False, repr=False, compare=False)
+    _stale: int = field(default=0, init=False, repr=False, compare=False)  # finished cars still listed
+    _moving: List[Vehicle] = field(default_factory=list, init=False, repr=False, compare=False)
+    _routes: Optional[RouteIndex] = field(default=None, init=False, repr=False, compare=False)
+    _signals: Optional["SignalBank"] = field(default=None, init=False, repr=False, compare=False)
+    _road_signals: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _can_go: List[bool] = field(default_factory=list, init=False, repr=False, compare=False)
+
+    def sync(self):
+        """Refresh ``Vehicle`` objects from the array engine, if one is attached."""
+        if self.engine is not None:
+            self.engine.sync()
+
+    def tick(self, dt: float) -> List[Vehicle]:
+        """Advance all cars by ``dt`` and return the ones that left the network."""
+        self._absorb_new()
+        if self.engine is not None:
+            exited = self.engine.tick(dt)
+            self._retire(exited)
+            self.engine.update_detectors()
+            return exited
 
-    def tick(self, dt: float):
-        # Group vehicles by road and sort by position
-        by_road: Dict[Road, List[Vehicle]] = {}
-        for v in self.vehicles:
-            if not v.finished:
-                by_road.setdefault(v.road, []).append(v)
-        for road, cars in by_road.items():
-            cars.sort(key=lambda x: x.pos_m)
-
-        # Car-following + lights
-        for road, cars in by_road.items():
+        # Transfers are applied after the walk so a car moves once per tick;
+        # routing runs in road order, front car first.
+        moving = self._advance(dt)
+        exited: List[Vehicle] = []
+        if moving:
+            for v in moving:
+                road = v.road
+                self._detach(v)
+                nxt = self._choose_next_road(road, v)
+                if nxt is not None:
+                    v.road = nxt
+                    v.pos_m = 0.0
+                    v.finished = False
+                    self._enqueue(v)
+                else:
+                    v.finished = True
+                    exited.append(v)
+            moving.clear()
+            self._retire(exited)
+        return exited
+
+    def _advance(self, dt: float) -> List[Vehicle]:
+        """Move every queued car; return the ones ready to leave their road.
+
+        The returned list is in routing order (road rank, front car first)
+        and still queued; it is reused between ticks.
+        """
+        # Car-following + lights, walking each queue from the front car back
+        moving = self._moving
+        flags = self.refresh_signals()
+        rank = self._routes.rank
+        for road, cars in self._queues.items():
             inter = road.to_intersection
-            stop_line = road.length_m - 2.0
-            for i, v in enumerate(cars):
+            length = road.length_m
+            stop_line = length - 2.0
+            window = inter.detector_m
+            can_go = flags[rank[road]]
+            ahead = None  # leader's position before this tick
+            crossed = 0   # net cars entering the detector zone
+            for v in reversed(cars):
                 desired = v.target_speed * dt
 
                 # leader gap
-                if i < len(cars) - 1:
-                    leader = cars[i + 1]
-                    max_pos = max(0.0, leader.pos_m - MIN_GAP_M)
+                if ahead is not None:
+                    max_pos = max(0.0, ahead - MIN_GAP_M)
                 else:
-                    max_pos = road.length_m
+                    max_pos = length
 
                 # red/yellow constraint
-                can_go = inter.signal.is_green_for(road.approach_dir)
                 if not can_go:
                     max_pos = min(max_pos, stop_line)
 
+                ahead = v.pos_m
                 v.pos_m = min(max_pos, v.pos_m + desired)
 
                 # at end
-                if v.pos_m >= road.length_m - 1e-6:
+                if v.pos_m >= length - 1e-6:
                     if can_go:
-                        nxt = self._choose_next_road(road)
-                        if nxt is not None:
-                            v.road = nxt
-                            v.pos_m = 0.0
-                            v.finished = False
-                        else:
-                            v.finished = True
+                        moving.append(v)
                     else:
                         v.pos_m = stop_line  # wait
 
-    def _choose_next_road(self, rd: Road) -> Road | None:
-        """Pick outgoing road at intersection; sometimes exit at border."""
-        from_tile = getattr(rd, "to_tile", None)
-        prev_tile = getattr(rd, "from_tile", None)
+                if (length - v.pos_m <= window) != (length - ahead <= window):
+                    crossed += 1 if length - v.pos_m <= window else -1
+            if crossed:
+                inter.occupancy[road.approach_dir] += crossed
 
-        # optional: border exit
-        grid_hints = getattr(self, "_grid_size", None)
-        if grid_hints and from_tile is not None:
-            H, W = grid_hints
-            r, c = from_tile
-            at_border = (r == 0 or r == H - 1 or c == 0 or c == W - 1)
-            if at_border:
-                import random
-                if random.random() < 0.35:
-                    return None
-
-        # candidates (avoid immediate U-turn when other exits exist)
-        cands: List[Road] = []
-        for r2 in self.roads:
-            if getattr(r2, "from_tile", None) == from_tile:
-                if getattr(r2, "to_tile", None) != prev_tile:
-                    cands.append(r2)
+        if moving:
+            moving.sort(key=lambda v: rank[v.road])
+        return moving
 
-        if not cands:
-            for r2 in self.roads:
-                if getattr(r2, "from_tile", None) == from_tile:
-                    return r2
+    def refresh_signals(self) -> List[bool]:
+        """Per-road "may enter the junction" flags, indexed by route rank.
+
+        Recomputed from the signals' integer codes on every call; the tick
+        calls it once, after the policies have set this tick's lights.
+        """
+        index = self.route_index()
+        table = self._road_signals
+        if table is None or table[0] is not index:
+            nodes = {id(rd.to_intersection): rd.to_intersection for rd in index.roads}
+            slot = {key: k for k, key in enumerate(nodes)}
+            table = self._road_signals = (
+                index,
+                [inter.signal for inter in nodes.values()],
+                [slot[id(rd.to_intersection)] for rd in index.roads],
+                [DIR_CODES.get(rd.approach_dir, -2) for rd in index.roads],
+            )
+        _, signals, road_signal, road_dir = table
+        green = [s.dir_code if s.color_code == _GREEN else -1 for s in signals]
+        self._can_go = [green[k] == d for k, d in zip(road_signal, road_dir)]
+        return self._can_go
+
+    def _detach(self, v: Vehicle):
+        """Take ``v`` off its road's queue."""
+        road = v.road
+        cars = self._queues[road]
+        if cars[-1] is v:
+            cars.pop()
+        else:
+            cars.remove(v)
+        if not cars:
+            del self._queues[road]
+        inter = road.to_intersection
+        if road.length_m - v.pos_m <= inter.detector_m:
+            inter.occupancy[road.approach_dir] -= 1
+
+    def add_vehicle(self, v: Vehicle):
+        """Add a spawned vehicle to the world and its road's queue."""
+        self.vehicles.append(v)
+        self._absorb_new()
+
+    def add_vehicles(self, vehicles: Sequence[Vehicle]):
+        """Add many spawned vehicles at once (one batch for the array engine)."""
+        self.vehicles.extend(vehicles)
+        self._absorb_new()
+
+    def back_positions(self, roads: Sequence[Road]) -> List[float]:
+        """Position of the rearmost car on each of ``roads`` (``inf`` when empty)."""
+        self._absorb_new()
+        if self.engine is not None:
+            return self.engine.back_positions(roads)
+        queues = self._queues
+        return [queues[rd][0].pos_m if rd in queues else math.inf for rd in roads]
+
+    def active_count(self) -> int:
+        """Number of vehicles currently on the network."""
+        self._absorb_new()
+        return self._active
+
+    def queue(self, road: Road) -> Sequence[Vehicle]:
+        """Cars on ``road`` ordered from the back of the queue to the front.
+
+        With the array engine attached this syncs and sorts every car, so
+        it is only meant for occasional inspection there.
+        """
+        if self.engine is not None:
+            return self.engine.queues().get(road, ())
+        return self._queues.get(road, ())
+
+    def road_queues(self) -> Dict[Road, List[Vehicle]]:
+        """Every road's cars from the back of the queue to the front."""
+        if self.engine is not None:
+            return self.engine.queues()
+        return {road: list(cars) for road, cars in self._queues.items()}
+
+    def load_queues(self, queues: Dict[Road, Sequence[Vehicle]]):
+        """Replace all cars with ``queues`` (as returned by :meth:`road_queues`)."""
+        self.vehicles = [v for cars in queues.values() for v in cars]
+        self._n_seen = self._active = len(self.vehicles)
+        self._stale = 0
+        self._queues = {}
+        if self.engine is not None:
+            # front car first, so cars tied on position keep their order
+            self.engine.reset()
+            self.engine.add([v for cars in queues.values() for v in reversed(cars)])
+        else:
+            for road, cars in queues.items():
+                if cars:
+                    self._queues[road] = deque(cars)
+        self._recount_detectors()
+
+    def _absorb_new(self):
+        # picks up vehicles appended to ``self.vehicles`` directly
+        n = len(self.vehicles)
+        if self._n_seen == n:
+            return
+        new = self.vehicles[self._n_seen:]
+        self._n_seen = n
+        live = [v for v in new if not v.finished]
+        for v in live:
+            if v.route_key is None:
+                v.route_key = random.getrandbits(64)
+        self._active += len(live)
+        self._stale += len(new) - len(live)
+        if self.engine is not None:
+            self.engine.add(live)
+        else:
+            for v in live:
+                self._enqueue(v)
+
+    def _retire(self, exited: List[Vehicle]):
+        # Finished cars stay in ``self.vehicles`` until they make up a quarter
+        # of it, then the list is compacted in place: O(1) amortised per exit.
+        if not exited:
+            return
+        self._active -= len(exited)
+        self._stale += len(exited)
+        if self._stale * 4 > len(self.vehicles):
+            self.vehicles[:] = [v for v in self.vehicles if not v.finished]
+            self._n_seen = len(self.vehicles)
+            self._stale = 0
+
+    def _enqueue(self, v: Vehicle):
+        road = v.road
+        inter = road.to_intersection
+        if road.length_m - v.pos_m <= inter.detector_m:
+            inter.occupancy[road.approach_dir] += 1
+        cars = self._queues.get(road)
+        if cars is None:
+            cars = self._queues[road] = deque()
+        if not cars or v.pos_m <= cars[0].pos_m:
+            cars.appendleft(v)
+        else:
+            cars.insert(bisect_left(cars, v.pos_m, key=_pos), v)
+
+    def route_index(self) -> RouteIndex:
+        """Junction adjacency index, rebuilt when the road list changes."""
+        index = self._routes
+        if index is None or len(index) != len(self.roads):
+            index = self._routes = RouteIndex(self.roads, getattr(self, "_grid_size", None))
+            self._register_roads()
+        return index
+
+    def _register_roads(self):
+        # every road is an approach of the junction it leads to
+        for inter in {id(rd.to_intersection): rd.to_intersection for rd in self.roads}.values():
+            inter.incoming = {}
+        for rd in self.roads:
+            rd.to_intersection.register_road(rd, self.queue)
+        self._recount_detectors()
+
+    def _recount_detectors(self):
+        """Rebuild detector counts from scratch (after edits to roads or windows)."""
+        for inter in {id(rd.to_intersection): rd.to_intersection for rd in self.roads}.values():
+            inter.occupancy = {"NS": 0, "EW": 0}
+        if self.engine is not None:
+            self.engine.update_detectors(full=True)
+            return
+        for road, cars in self._queues.items():
+            inter = road.to_intersection
+            inter.occupancy[road.approach_dir] += sum(
+                1 for v in cars if road.length_m - v.pos_m <= inter.detector_m)
+
+    def rebuild_routes(self):
+        """Force a rebuild of the adjacency index after editing roads in place."""
+        self._routes = None
+        return self.route_index()
+
+    def add_road(self, rd: Road):
+        self.roads.append(rd)
+        self._routes = None
+
+    def remove_road(self, rd: Road):
+        self.sync()
+        if any(v.road is rd and not v.finished for v in self.vehicles):
+            raise ValueError(f"Road {rd.name} still has vehicles on it")
+        self.roads.remove(rd)
+        self._routes = None
+
+    def signal_bank(self) -> "SignalBank":
+        """Array view of all signals, rebuilt when the intersection list changes.
+
+        Its cached codes are re-read whenever a signal was set through
+        ``TrafficLight.set_state`` since the bank last looked.
+        """
+        bank = self._signals
+        if bank is None or len(bank) != len(self.intersections):
+            from .signals import SignalBank  # needs numpy
+            bank = self._signals = SignalBank(self.intersections)
+        elif bank.seen != TrafficLight.changes:
+            bank.refresh()
+        return bank
+
+    def _choose_next_road(self, rd: Road, v: Vehicle) -> Road | None:
+        """Pick ``v``'s outgoing road at the junction; sometimes exit at border."""
+        at_border, cands, fallback = self.route_index().routes[rd]
+        u_exit, u_pick = route_draws(v.route_key, v.hops)
+        v.hops += 1
+
+        # optional: border exit
+        if at_border and u_exit < EXIT_PROB:
             return None
 
-        # prefer going straight if available
-        straight = [r2 for r2 in cands if r2.approach_dir == rd.approach_dir]
-        import random
-        return random.choice(straight or cands)
\ No newline at end of file
+        # candidates avoid an immediate U-turn and prefer going straight
+        if not cands:
+            return fallback
+        return cands[int(u_pick * len(cands))]
@@ -0,0 +1,613 @@
+"""Local HTTP/WebSocket server hosting many simulation sessions.
+
+One asyncio process holds a pool of :class:`Simulation` sessions and
+advances them on request::
+
+    python -m traffic_sim.server --port 8765 [--workers 4]
+
+Requests and replies are JSON:
+
+* ``POST /sessions`` with ``{"scenario": {...}, "seed": 0}`` creates a
+  session (the scenario keys are those of
+  :func:`~traffic_sim.batch.scenario_from_dict`) and replies with its status
+* ``GET /sessions`` lists the sessions, ``GET /sessions/<id>`` shows one and
+  ``DELETE /sessions/<id>`` drops it
+* ``POST /sessions/<id>/step`` with ``{"ticks": n}`` simulates ``n`` ticks
+  after those of any step requests still pending
+* ``POST /sessions/<id>/run`` with ``{"until_s": t}`` simulates every tick up
+  to time ``t`` (default: the scenario horizon)
+* ``GET /sessions/<id>/snapshot`` returns the cars and signals
+  (:class:`~traffic_sim.core.snapshot.WorldSnapshot`, roads by name)
+* ``GET /sessions/<id>/metrics`` returns ``Metrics.summary()``
+* ``GET /sessions/<id>/stream`` upgrades to a WebSocket that receives a
+  status message (time, steps, summary) as the session advances, at most
+  one per ``stream_interval_s`` plus one when a step or run completes
+
+Runs are done in slices of at most ``slice_ticks`` ticks. Each worker has
+one run queue that gives the sessions with pending runs a slice each in
+turn, and the event loop handles requests between any two slices. A request
+therefore waits for about one slice, however many sessions are running and
+however long their runs are; a status or snapshot request on a running
+session is answered between two of its slices.
+
+With ``workers=0`` the sessions live in the server process and slices run
+in the event loop itself. With ``workers=n`` sessions are spread over ``n``
+worker processes (the least loaded one gets each new session) and the event
+loop only waits for replies, so sessions on different workers advance in
+parallel.
+
+Each session keeps its own copy of the global ``random`` state and swaps it
+in while it runs, so a session reproduces a run of
+:func:`~traffic_sim.batch.build_simulation` with the same seed whatever the
+interleaving.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing as mp
+import random
+import struct
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .batch import build_simulation, scenario_from_dict
+from .core.snapshot import WorldSnapshot
+
+MAX_BODY = 1 << 20  # bytes
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_TEXT, _WS_CLOSE, _WS_PING, _WS_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+# --- sessions -----------------------------------------------------------------
+class SessionHost:
+    """The sessions themselves; the server calls into one per worker.
+
+    Every method takes the session id and returns plain JSON-ready data.
+    Unknown ids raise ``KeyError``, bad scenarios ``ValueError`` or
+    ``TypeError``.
+    """
+
+    def __init__(self) -> None:
+        self.sessions: Dict[str, list] = {}  # id -> [simulation, random state, horizon_s]
+
+    def create(self, sid: str, scenario: dict, seed: int) -> dict:
+        sim = build_simulation(scenario_from_dict(scenario), seed)  # seeds the global random
+        if not sim.world.intersections:
+            raise ValueError("The scenario grid has no intersections")
+        self.sessions[sid] = [sim, random.getstate(), sim.max_time]
+        return self.status(sid)
+
+    def close(self, sid: str) -> None:
+        del self.sessions[sid]
+
+    def status(self, sid: str) -> dict:
+        sim, _, horizon_s = self.sessions[sid]
+        return {
+            "id": sid,
+            "time_s": sim.clock.now(),
+            "steps": sim.steps,
+            "dt": sim.dt,
+            "horizon_s": horizon_s,
+            "vehicles": sim.world.active_count(),
+            "summary": sim.metrics.summary(),
+        }
+
+    def advance(self, sid: str, until_s: float, max_ticks: int) -> dict:
+        """Simulate at most ``max_ticks`` ticks, none after ``until_s``.
+
+        The reply's ``done`` is true once every tick up to ``until_s`` ran.
+        """
+        entry = self.sessions[sid]
+        sim = entry[0]
+        random.setstate(entry[1])
+        try:
+            sim.max_time = min(until_s, sim.clock.now() + (max_ticks - 0.5) * sim.dt)
+            if sim.clock.now() <= sim.max_time:
+                sim.run()
+        finally:
+            entry[1] = random.getstate()
+        status = self.status(sid)
+        status["done"] = sim.clock.now() > until_s
+        return status
+
+    def snapshot(self, sid: str) -> dict:
+        sim = self.sessions[sid][0]
+        world = sim.world
+        snap = WorldSnapshot.capture(world, sim.clock.now(), sim.metrics.summary())
+        roads = world.route_index().roads
+        return {
+            "id": sid,
+            "time_s": snap.time_s,
+            "vehicles": [[vid, roads[ri].name, pos, key] for vid, ri, pos, key in snap.vehicles],
+            "signals": [[inter.name, d, c] for inter, (d, c) in zip(world.intersections, snap.signals)],
+            "summary": snap.summary,
+        }
+
+
+def _host_worker(conn) -> None:
+    """Worker process: run ``SessionHost`` calls from ``conn`` until told to stop."""
+    host = SessionHost()
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        method, args = msg
+        try:
+            conn.send((True, getattr(host, method)(*args)))
+        except Exception as exc:  # handed back to the server
+            conn.send((False, exc))
+    conn.close()
+
+
+class _ProcessHost:
+    """A :class:`SessionHost` in a worker process, called from one helper thread."""
+
+    def __init__(self, ctx) -> None:
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_host_worker, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+        self.executor = ThreadPoolExecutor(max_workers=1)  # calls run one at a time
+
+    def call(self, method: str, *args):
+        self.conn.send((method, args))
+        ok, value = self.conn.recv()
+        if not ok:
+            raise value
+        return value
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.proc.join(timeout=5)
+        self.conn.close()
+
+
+class _Session:
+    __slots__ = ("id", "lane", "last", "waiting", "step_target", "subscribers", "last_push")
+
+    def __init__(self, sid: str, lane: "_Lane", status: dict) -> None:
+        self.id = sid
+        self.lane = lane
+        self.last = status
+        self.waiting: List[Tuple[float, asyncio.Future]] = []  # (until_s, run request)
+        self.step_target = 0  # step count the step requests so far add up to
+        self.subscribers: List[asyncio.Queue] = []
+        self.last_push = float("-inf")
+
+
+class _Lane:
+    """Run queue of one host: sessions with pending runs, served a slice at a time."""
+
+    def __init__(self, host) -> None:
+        self.host = host
+        self.queue: Deque[_Session] = deque()
+        self.wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.load = 0  # sessions placed here
+
+
+# --- HTTP and WebSocket plumbing ----------------------------------------------
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise _HTTPError(400, "Malformed request line") from None
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise _HTTPError(400, "Bad Content-Length") from None
+    if length > MAX_BODY:
+        raise _HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method.upper(), target, headers, body
+
+
+def _response(status: int, payload, keep_alive: bool = True) -> bytes:
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+def ws_accept_key(key: str) -> str:
+    """``Sec-WebSocket-Accept`` for a client's ``Sec-WebSocket-Key``."""
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+
+
+def ws_frame(opcode: int, payload: bytes, mask: bytes = b"") -> bytes:
+    """One final WebSocket frame; clients must pass a 4-byte ``mask``."""
+    n = len(payload)
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, bit | n)
+    elif n < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, bit | 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, bit | 127, n)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return head + mask + payload
+
+
+async def ws_read(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """``(opcode, payload)`` of the next frame (fragments are not joined)."""
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        (n,) = struct.unpack("!H", await reader.readexactly(2))
+    elif n == 127:
+        (n,) = struct.unpack("!Q", await reader.readexactly(8))
+    if n > MAX_BODY:
+        raise _HTTPError(413, "Frame too large")
+    mask = await reader.readexactly(4) if b1 & 0x80 else b""
+    payload = await reader.readexactly(n)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return b0 & 0x0F, payload
+
+
+# --- the server ---------------------------------------------------------------
+class SimulationServer:
+    """Asyncio server holding a pool of simulation sessions (see the module docs).
+
+    ``port=0`` picks a free port; :attr:`port` holds the one in use after
+    :meth:`start`. At most ``max_sessions`` sessions exist at once; creating
+    another is answered with 503.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        workers: int = 0,
+        slice_ticks: int = 25,
+        max_sessions: int = 1000,
+        stream_interval_s: float = 0.2,
+    ) -> None:
+        if slice_ticks < 1:
+            raise ValueError("slice_ticks must be at least 1")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.slice_ticks = slice_ticks
+        self.max_sessions = max_sessions
+        self.stream_interval_s = stream_interval_s
+        self.sessions: Dict[str, _Session] = {}
+        self._ids = itertools.count(1)
+        self._lanes: List[_Lane] = []
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> None:
+        if self.workers > 0:
+            ctx = mp.get_context()
+            hosts = [_ProcessHost(ctx) for _ in range(self.workers)]
+        else:
+            hosts = [SessionHost()]
+        self._lanes = [_Lane(host) for host in hosts]
+        for lane in self._lanes:
+            lane.task = asyncio.ensure_future(self._run_lane(lane))
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for s in self.sessions.values():
+            self._fail(s, KeyError(s.id))
+            self._notify(s, None)
+        self.sessions.clear()
+        loop = asyncio.get_running_loop()
+        for lane in self._lanes:
+            lane.task.cancel()
+            await asyncio.gather(lane.task, return_exceptions=True)
+            if isinstance(lane.host, _ProcessHost):
+                await loop.run_in_executor(None, lane.host.close)
+        self._lanes = []
+
+    async def __aenter__(self) -> "SimulationServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    # --- session calls --------------------------------------------------------
+    async def _call(self, host, method: str, *args):
+        if isinstance(host, SessionHost):
+            return getattr(host, method)(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(host.executor, host.call, method, *args)
+
+    async def create(self, scenario: dict, seed: int = 0) -> dict:
+        if len(self.sessions) >= self.max_sessions:
+            raise _HTTPError(503, f"Session limit ({self.max_sessions}) reached")
+        sid = f"s{next(self._ids)}"
+        lane = min(self._lanes, key=lambda ln: ln.load)
+        status = await self._call(lane.host, "create", sid, scenario, seed)
+        lane.load += 1
+        self.sessions[sid] = _Session(sid, lane, status)
+        return status
+
+    async def delete(self, sid: str) -> None:
+        s = self.sessions.pop(sid)
+        s.lane.load -= 1
+        self._fail(s, KeyError(sid))
+        self._notify(s, None)
+        await self._call(s.lane.host, "close", sid)
+
+    async def run_until(self, sid: str, until_s: float) -> dict:
+        """Advance ``sid`` through every tick up to ``until_s``; resolves when done."""
+        s = self.sessions[sid]
+        done = asyncio.get_running_loop().create_future()
+        if not s.waiting:
+            s.lane.queue.append(s)
+            s.lane.wake.set()
+        s.waiting.append((until_s, done))
+        return await done
+
+    async def step(self, sid: str, ticks: int) -> dict:
+        """Advance ``sid`` by ``ticks`` more ticks than earlier step requests target."""
+        status = await self.status(sid)
+        s = self.sessions[sid]
+        # concurrent steps stack: each one counts from the pending target
+        s.step_target = max(s.step_target, status["steps"]) + ticks
+        ticks = s.step_target - status["steps"]
+        return await self.run_until(sid, status["time_s"] + (ticks - 0.5) * status["dt"])
+
+    async def status(self, sid: str) -> dict:
+        s = self.sessions[sid]
+        s.last = await self._call(s.lane.host, "status", sid)
+        return s.last
+
+    async def snapshot(self, sid: str) -> dict:
+        return await self._call(self.sessions[sid].lane.host, "snapshot", sid)
+
+    async def _run_lane(self, lane: _Lane) -> None:
+        """Give each queued session one slice in turn, yielding after every slice."""
+        while True:
+            if not lane.queue:
+                lane.wake.clear()
+                await lane.wake.wait()
+                continue
+            s = lane.queue.popleft()
+            if not s.waiting:
+                continue
+            # the nearest target first, so no run overshoots its own
+            until_s = min(until for until, _ in s.waiting)
+            try:
+                status = await self._call(lane.host, "advance", s.id, until_s, self.slice_ticks)
+            except Exception as exc:
+                self._fail(s, exc)
+                continue
+            if self.sessions.get(s.id) is not s:
+                continue  # deleted meanwhile
+            s.last = status
+            finished = [(until, fut) for until, fut in s.waiting if status["time_s"] > until]
+            s.waiting = [w for w in s.waiting if w not in finished]
+            for _, fut in finished:
+                if not fut.done():
+                    fut.set_result(status)
+            self._publish(s, status, final=bool(finished))
+            if s.waiting:
+                lane.queue.append(s)
+            await asyncio.sleep(0)  # let requests in between slices
+
+    def _fail(self, s: _Session, exc: Exception) -> None:
+        waiting, s.waiting = s.waiting, []
+        for _, fut in waiting:
+            if not fut.done():
+                fut.set_exception(exc)
+
+    # --- streaming ------------------------------------------------------------
+    def _publish(self, s: _Session, status: dict, final: bool) -> None:
+        if not s.subscribers:
+            return
+        now = time.perf_counter()
+        if not final and now - s.last_push < self.stream_interval_s:
+            return
+        s.last_push = now
+        message = {key: status[key] for key in ("id", "time_s", "steps", "vehicles", "summary")}
+        self._notify(s, message)
+
+    def _notify(self, s: _Session, message: Optional[dict]) -> None:
+        for queue in s.subscribers:
+            if queue.full():  # a slow reader gets the latest updates
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def _stream(self, s: _Session, headers: Dict[str, str], reader, writer) -> None:
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise _HTTPError(400, "Missing Sec-WebSocket-Key")
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {ws_accept_key(key)}\r\n\r\n").encode("latin-1"))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+        s.subscribers.append(queue)
+        queue.put_nowait({key: s.last[key] for key in ("id", "time_s", "steps", "vehicles", "summary")})
+
+        async def send() -> None:
+            while True:
+                message = await queue.get()
+                if message is None:  # session closed
+                    writer.write(ws_frame(_WS_CLOSE, struct.pack("!H", 1000)))
+                    await writer.drain()
+                    return
+                writer.write(ws_frame(_WS_TEXT, json.dumps(message).encode()))
+                await writer.drain()
+
+        async def receive() -> None:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == _WS_CLOSE:
+                    writer.write(ws_frame(_WS_CLOSE, payload[:2]))
+                    await writer.drain()
+                    return
+                if opcode == _WS_PING:
+                    writer.write(ws_frame(_WS_PONG, payload))
+
+        tasks = [asyncio.ensure_future(send()), asyncio.ensure_future(receive())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if queue in s.subscribers:
+                s.subscribers.remove(queue)
+
+    # --- HTTP -----------------------------------------------------------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    path = [p for p in target.split("?", 1)[0].split("/") if p]
+                    if headers.get("upgrade", "").lower() == "websocket":
+                        if method != "GET" or len(path) != 3 or path[0] != "sessions" or path[2] != "stream":
+                            raise _HTTPError(404, "WebSocket streams live at /sessions/<id>/stream")
+                        if path[1] not in self.sessions:
+                            raise _HTTPError(404, f"No session {path[1]!r}")
+                        await self._stream(self.sessions[path[1]], headers, reader, writer)
+                        break
+                    status, payload = await self._dispatch(method, path, body)
+                except _HTTPError as exc:
+                    writer.write(_response(exc.status, {"error": str(exc)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self, method: str, path: List[str], body: bytes) -> Tuple[int, object]:
+        try:
+            data = json.loads(body) if body.strip() else {}
+        except ValueError:
+            raise _HTTPError(400, "Body is not valid JSON") from None
+        if not isinstance(data, dict):
+            raise _HTTPError(400, "Body must be a JSON object")
+        if not path or path[0] != "sessions" or len(path) > 3:
+            raise _HTTPError(404, "Unknown path")
+        route = (method, path[2] if len(path) == 3 else None)
+        try:
+            if len(path) == 1:
+                if method == "GET":
+                    return 200, {"sessions": [s.last for s in self.sessions.values()]}
+                if method == "POST":
+                    return 201, await self.create(data.get("scenario", {}), int(data.get("seed", 0)))
+                raise _HTTPError(405, f"{method} not allowed on /sessions")
+            sid = path[1]
+            if sid not in self.sessions:
+                raise _HTTPError(404, f"No session {sid!r}")
+            if route == ("GET", None):
+                return 200, await self.status(sid)
+            if route == ("DELETE", None):
+                await self.delete(sid)
+                return 200, {"id": sid, "deleted": True}
+            if route == ("POST", "step"):
+                ticks = int(data.get("ticks", 1))
+                if ticks < 1:
+                    raise ValueError("ticks must be at least 1")
+                return 200, await self.step(sid, ticks)
+            if route == ("POST", "run"):
+                until_s = data.get("until_s")
+                if until_s is None:
+                    until_s = self.sessions[sid].last["horizon_s"]
+                until_s = float(until_s)
+                if not math.isfinite(until_s):
+                    raise ValueError("until_s must be a finite number")
+                return 200, await self.run_until(sid, until_s)
+            if route == ("GET", "snapshot"):
+                return 200, await self.snapshot(sid)
+            if route == ("GET", "metrics"):
+                status = await self.status(sid)
+                return 200, {"id": sid, "time_s": status["time_s"], **status["summary"]}
+            raise _HTTPError(404, "Unknown path")
+        except KeyError as exc:
+            if len(path) > 1 and path[1] not in self.sessions:  # the session went away meanwhile
+                raise _HTTPError(404, f"No session {path[1]!r}") from None
+            raise _HTTPError(500, f"Internal error: {exc!r}") from exc
+        except (ValueError, TypeError) as exc:
+            raise _HTTPError(400, str(exc)) from None
+        except _HTTPError:
+            raise
+        except Exception as exc:  # e.g. a failed slice handed on by _fail
+            raise _HTTPError(500, f"Internal error: {exc!r}") from exc
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, **kwargs) -> None:
+    """Run a :class:`SimulationServer` until cancelled."""
+    async with SimulationServer(host, port, **kwargs) as server:
+        print(f"Serving simulation sessions on http://{server.host}:{server.port}", flush=True)
+        await server.serve_forever()
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m traffic_sim.server", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0: step in the event loop)")
+    parser.add_argument("--slice-ticks", type=int, default=25, help="most ticks simulated between yields")
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--stream-interval", type=float, default=0.2, help="seconds between streamed updates")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, slice_ticks=args.slice_ticks,
+                          max_sessions=args.max_sessions, stream_interval_s=args.stream_interval))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
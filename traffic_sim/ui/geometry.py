@@ -0,0 +1,38 @@
+"""Screen geometry of roads drawn as polylines (no pygame needed).
+
+Roads from a compressed grid (``build_world_from_grid(compress=True)``)
+run through several tiles and may turn corners, so their
+``screen_points`` hold every corner, not just the two ends.
+"""
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from typing import List, Sequence, Tuple
+
+# (t0, t1, x0, y0, dx, dy): one straight piece covering fractions t0..t1 of the road
+Piece = Tuple[float, float, float, float, float, float]
+
+
+def polyline_pieces(points: Sequence[Tuple[float, float]]) -> List[Piece]:
+    """Split ``points`` into straight pieces, each with its share of the total length."""
+    steps = [(x0, y0, x1 - x0, y1 - y0) for (x0, y0), (x1, y1) in zip(points, points[1:])]
+    total = sum(math.hypot(dx, dy) for _, _, dx, dy in steps) or 1.0
+    pieces, t = [], 0.0
+    for x0, y0, dx, dy in steps:
+        t1 = t + math.hypot(dx, dy) / total
+        pieces.append((t, t1, x0, y0, dx, dy))
+        t = t1
+    return pieces
+
+
+def point_along(pieces: Sequence[Piece], ends: Sequence[float], t: float) -> Tuple[float, float, int]:
+    """``(x, y, k)``: the point a fraction ``t`` along the road and its piece ``k``.
+
+    ``ends`` is ``[p[1] for p in pieces]``, kept by the caller so it is
+    built once per road.
+    """
+    k = min(bisect_left(ends, t), len(pieces) - 1)
+    t0, t1, x0, y0, dx, dy = pieces[k]
+    u = (t - t0) / (t1 - t0) if t1 > t0 else 0.0
+    return x0 + dx * u, y0 + dy * u, k
@@ -3,19 +3,26 @@ from typing import Dict
 
 import pygame
 
-from .sprite_loader import DEFAULT_CAR_NAMES, load_cars_manifest
+from .geometry import point_along, polyline_pieces
+from .sprite_loader import DEFAULT_CAR_NAMES, load_scaled_cars
 
 TILE_PX = 64
 LANE_W = 14  # px half-lane-ish width
+LOD_THRESHOLD = 1500  # above this many cars, draw squares instead of sprites
+LOD_PX = 6
+
+def _sprite_angle(dx, dy):
+    # portrait sprite is 'up'; whole degrees in [0, 360) keep the rotation cache bounded
+    return round(-math.degrees(math.atan2(dy, dx)) + 90) % 360
+
 
 class NetworkRenderer:
-    def __init__(self, world, title="Traffic Sim"):
+    def __init__(self, world, title="Traffic Sim", lod_threshold=LOD_THRESHOLD):
         pygame.init()
         self.world = world
         xs, ys = [], []
         for rd in world.roads:
-            (x0,y0),(x1,y1) = rd.screen_points
-            xs += [x0,x1]; ys += [y0,y1]
+            xs += [x for x, _ in rd.screen_points]; ys += [y for _, y in rd.screen_points]
         w = max(xs) - min(xs) + TILE_PX
         h = max(ys) - min(ys) + TILE_PX
         self.offset = (min(xs) - TILE_PX//2, min(ys) - TILE_PX//2)
@@ -23,76 +30,198 @@ class NetworkRenderer:
         pygame.display.set_caption(title)
         self.clock = pygame.time.Clock()
         self.running = True
+        self.on_key = None  # optional callback for other key presses, e.g. replay seeking
 
-        raw = load_cars_manifest("assets/sprites/cars.png", names=DEFAULT_CAR_NAMES)
-        self.cars_scaled: Dict[str, pygame.Surface] = {}
-        for name, surf in raw.items():
-            self.cars_scaled[name] = pygame.transform.smoothscale(surf, (18, 36))  # portrait
+        self.cars_scaled: Dict[str, pygame.Surface] = load_scaled_cars(
+            "assets/sprites/cars.png", (18, 36), names=DEFAULT_CAR_NAMES)  # portrait
         self.font = pygame.font.SysFont("monospace", 14)
 
+        # sprite rotation cache and level-of-detail settings
+        self._rotated: Dict[tuple, pygame.Surface] = {}
+        self._half: Dict[tuple, tuple] = {}
+        self._lod_colors: Dict[str, tuple] = {}
+        self.lod_threshold = lod_threshold
+
+        # cached static layer and dirty-rect bookkeeping
+        self.base = None
+        self._drawn = []    # rects covered by cars/HUD this frame, erased next frame
+        self._updates = []  # other screen areas changed this frame
+        self._full = True
+        self._hud_text = None
+        self._hud_surf = None
+
     def handle(self):
         for e in pygame.event.get():
             if e.type == pygame.QUIT: self.running = False
             if e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE: self.running = False
+            elif e.type == pygame.KEYDOWN and self.on_key is not None: self.on_key(e.key)
 
     def _apply_offset(self, x, y):
         ox, oy = self.offset
         return int(x-ox), int(y-oy)
 
-    def draw_roads(self):
-        s = self.screen
-        s.fill((78, 92, 64))  # grass
+    def _build_static(self):
+        # roads never change during a run: draw them once into a cached layer
+        base = pygame.Surface(self.screen.get_size()).convert()
+        base.fill((78, 92, 64))  # grass
         for rd in self.world.roads:
-            (x0,y0),(x1,y1) = rd.screen_points
-            x0,y0 = self._apply_offset(x0,y0)
-            x1,y1 = self._apply_offset(x1,y1)
-            pygame.draw.line(s, (64,64,64), (x0,y0), (x1,y1), LANE_W*2)  # asphalt
-            pygame.draw.line(s, (200,200,200), (x0,y0), (x1,y1), 2)       # center line
-
-    def draw_lights(self):
-        for inter in self.world.intersections:
-            # place a dot at any incoming road end (tile center)
-            attach = None
-            for rd in self.world.roads:
-                if getattr(rd, "to_intersection", None) is inter:
-                    attach = rd
-                    break
-            if not attach: continue
-            (x,y) = attach.screen_points[-1]
-            x,y = self._apply_offset(x,y)
-            c = inter.signal.color
+            pts = [self._apply_offset(x, y) for x, y in rd.screen_points]
+            for (x0,y0),(x1,y1) in zip(pts, pts[1:]):
+                pygame.draw.line(base, (64,64,64), (x0,y0), (x1,y1), LANE_W*2)  # asphalt
+            for x, y in pts[1:-1]:
+                pygame.draw.circle(base, (64,64,64), (x, y), LANE_W)  # round the corners
+            pygame.draw.lines(base, (200,200,200), False, pts, 2)  # center line
+        self.base = base
+        self._roads_n = len(self.world.roads)
+
+        # per-road screen geometry and sprite heading, computed once; roads
+        # with corners get angle None and their pieces in _bends
+        self._road_geom = {}
+        self._bends = {}
+        for rd in self.world.roads:
+            pts = [self._apply_offset(x, y) for x, y in rd.screen_points]
+            (x0,y0),(x1,y1) = pts[0], pts[-1]
+            angle = _sprite_angle(x1 - x0, y1 - y0)
+            if len(pts) > 2:
+                pieces = polyline_pieces(pts)
+                self._bends[rd] = (pieces, [p[1] for p in pieces], [_sprite_angle(p[4], p[5]) for p in pieces])
+                angle = None
+            self._road_geom[rd] = (x0, y0, x1-x0, y1-y0, max(1e-6, rd.length_m), angle)
+
+        # light dot at the end of the first incoming road of each node
+        attach = {}
+        for rd in self.world.roads:
+            attach.setdefault(id(rd.to_intersection), rd.screen_points[-1])
+        self._light_at = [attach.get(id(inter)) for inter in self.world.intersections]
+        self._light_colors = [None] * len(self._light_at)
+
+    def draw_roads(self):
+        """Full redraw of the static layer (the next flip updates the whole window)."""
+        if self.base is None or self._roads_n != len(self.world.roads):
+            self._build_static()
+        self.screen.blit(self.base, (0, 0))
+        self._drawn = []
+        self._updates = []
+        self._full = True
+
+    def _begin_frame(self):
+        if self.base is None or self._roads_n != len(self.world.roads):
+            self.draw_roads()
+            return
+        # erase last frame's cars and HUD by restoring the static layer under them
+        for r in self._drawn:
+            self.screen.blit(self.base, r, r)
+        self._updates = self._drawn
+        self._drawn = []
+
+    def draw_lights(self, signals=None):
+        # signals: optional (direction, color) per intersection, e.g. from a snapshot
+        # Lights are painted into the cached layer and only redrawn when they change.
+        for k, inter in enumerate(self.world.intersections):
+            at = self._light_at[k]
+            if at is None: continue
+            c = signals[k][1] if signals is not None else inter.signal.color
+            if c == self._light_colors[k] and not self._full: continue
+            self._light_colors[k] = c
+            x,y = self._apply_offset(*at)
             col = (60,200,90) if c=="GREEN" else (230,210,70) if c=="YELLOW" else (220,70,70)
-            pygame.draw.circle(self.screen, col, (x, y), 6)
-
-    def draw_cars(self):
-        for v in self.world.vehicles:
-            if v.finished: continue
-            (x0,y0),(x1,y1) = v.road.screen_points
-            t = max(0.0, min(1.0, v.pos_m / max(1e-6, v.road.length_m)))
-            x = x0 + (x1-x0)*t
-            y = y0 + (y1-y0)*t
-            heading = math.atan2((y1 - y0), (x1 - x0))
-            ang = -math.degrees(heading) + 90  # portrait sprite is 'up'
-            img = self.cars_scaled.get(v.sprite_key or v.kind) or next(iter(self.cars_scaled.values()))
-            rot = pygame.transform.rotate(img, ang)
-            rect = rot.get_rect(center=self._apply_offset(x,y))
-            self.screen.blit(rot, rect)
-
-    def draw_hud(self, summary=None):
+            pygame.draw.circle(self.base, col, (x, y), 6)
+            self._updates.append(pygame.draw.circle(self.screen, col, (x, y), 6))
+
+    def _sprite(self, key, angle):
+        # sprites are rotated once per (sprite_key, heading) and reused
+        surf = self._rotated.get((key, angle))
+        if surf is None:
+            img = self.cars_scaled.get(key) or next(iter(self.cars_scaled.values()))
+            surf = pygame.transform.rotate(img, angle)
+            self._rotated[(key, angle)] = surf
+            self._half[(key, angle)] = (surf.get_width() // 2, surf.get_height() // 2)
+        return surf
+
+    def _lod_color(self, key):
+        col = self._lod_colors.get(key)
+        if col is None:
+            img = self.cars_scaled.get(key) or next(iter(self.cars_scaled.values()))
+            col = self._lod_colors[key] = pygame.transform.average_color(img)[:3]
+        return col
+
+    def draw_cars(self, cars=None):
+        # cars: optional iterable of (road, pos_m, sprite_key); defaults to the live world
+        if cars is None:
+            cars = [(v.road, v.pos_m, v.sprite_key or v.kind) for v in self.world.vehicles if not v.finished]
+        elif not isinstance(cars, list):
+            cars = list(cars)
+        if self.base is None:
+            self._build_static()
+        geom = self._road_geom
+        if len(cars) > self.lod_threshold:
+            # level of detail: small colored squares instead of sprites
+            fill = self.screen.fill
+            half = LOD_PX // 2
+            drawn = self._drawn
+            for road, pos_m, key in cars:
+                x0, y0, dx, dy, length, angle = geom[road]
+                t = max(0.0, min(1.0, pos_m / length))
+                if angle is None:
+                    x, y, _ = self._along(road, t)
+                else:
+                    x, y = x0 + dx*t, y0 + dy*t
+                drawn.append(fill(self._lod_color(key), (int(x) - half, int(y) - half, LOD_PX, LOD_PX)))
+            return
+        batch = []
+        sprite, halves = self._sprite, self._half
+        for road, pos_m, key in cars:
+            x0, y0, dx, dy, length, angle = geom[road]
+            t = max(0.0, min(1.0, pos_m / length))
+            if angle is None:
+                x, y, angle = self._along(road, t)
+            else:
+                x, y = x0 + dx*t, y0 + dy*t
+            surf = sprite(key, angle)
+            hw, hh = halves[(key, angle)]
+            batch.append((surf, (int(x) - hw, int(y) - hh)))
+        self._drawn.extend(self.screen.blits(batch))
+
+    def _along(self, road, t):
+        # position and sprite angle a fraction t along a road with corners
+        pieces, ends, angles = self._bends[road]
+        x, y, k = point_along(pieces, ends, t)
+        return x, y, angles[k]
+
+    def draw_hud(self, summary=None, active=None):
         if not summary: return
-        txt = f"cars: {len([v for v in self.world.vehicles if not v.finished])} | entered: {summary['entered']} | exited: {summary['exited']} | avg_tt: {summary['avg_travel_time_s']:.2f}s"
-        surf = self.font.render(txt, True, (0,0,0))
-        self.screen.blit(surf, (10,10))
+        if active is None:
+            active = self.world.active_count()
+        txt = f"cars: {active} | entered: {summary['entered']} | exited: {summary['exited']} | avg_tt: {summary['avg_travel_time_s']:.2f}s"
+        if txt != self._hud_text:
+            self._hud_text = txt
+            self._hud_surf = self.font.render(txt, True, (0,0,0))
+        self._drawn.append(self.screen.blit(self._hud_surf, (10,10)))
 
     def flip(self, fps=60):
-        pygame.display.flip()
+        if self._full:
+            pygame.display.flip()
+            self._full = False
+        else:
+            pygame.display.update(self._updates + self._drawn)  # dirty rects only
         self.clock.tick(fps)
 
     def frame(self, summary=None):
         self.handle()
         if not self.running: raise SystemExit
-        self.draw_roads()
+        self._begin_frame()
         self.draw_lights()
         self.draw_cars()
         self.draw_hud(summary)
         self.flip(60)
+
+    def frame_snapshot(self, snap, prev=None, alpha=1.0):
+        """Draw a :class:`WorldSnapshot`, blending car positions from ``prev``."""
+        self.handle()
+        if not self.running: return
+        roads = self.world.roads
+        self._begin_frame()
+        self.draw_lights(snap.signals)
+        self.draw_cars((roads[ri], pos, key) for _, ri, pos, key in snap.interpolate(prev, alpha))
+        self.draw_hud(snap.summary, active=len(snap.vehicles))
+        self.flip(60)
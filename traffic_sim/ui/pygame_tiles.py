@@ -6,12 +6,16 @@ from typing import Dict, List, Tuple
 
 import pygame
 
-from .sprite_loader import DEFAULT_CAR_NAMES, load_cars_manifest
+from .geometry import point_along, polyline_pieces
+from .sprite_loader import DEFAULT_CAR_NAMES, load_scaled_cars
 from .tilecodes import Tile, TILES
 
 TILE_PX = 32
 FRAME_RATE = 30
 BG_COLOR = (74, 86, 57)
+CAR_COLOR = (220, 220, 220)
+LOD_THRESHOLD = 1500  # above this many cars, draw squares instead of sprites
+LOD_PX = 4
 
 
 class TileAtlas:
@@ -47,6 +51,7 @@ class PygameTilesRenderer:
         tilemap: Dict[str, Tile] | None = None,
         sheet_path: str | Path = "assets/sprites/roads_2w.png",
         title: str = "Traffic Sim",
+        lod_threshold: int = LOD_THRESHOLD,
     ) -> None:
         pygame.init()
         self.world = world
@@ -58,24 +63,30 @@ class PygameTilesRenderer:
         pygame.display.set_caption(title)
         self.clock = pygame.time.Clock()
         self.running = True
+        self.on_key = None  # optional callback for other key presses, e.g. replay seeking
 
         self.atlas = TileAtlas(sheet_path, tile_px=TILE_PX)
 
-        self.car_sprites = load_cars_manifest(
-            "assets/sprites/cars.png",
-            names=DEFAULT_CAR_NAMES,
-        )
         self.scaled_cars: Dict[str, pygame.Surface] = {}
         self._prepare_scaled_sprites()
 
+        # static tile layer, drawn once; cars are redrawn via dirty rects
+        self.background: pygame.Surface | None = None
+        self._drawn: List[pygame.Rect] = []
+        self._erased: List[pygame.Rect] = []
+        self._full = True
+
+        self.lod_threshold = lod_threshold
+        self._lod_colors: Dict[str, Tuple[int, int, int]] = {}
+        self._polylines: Dict[object, tuple] = {}
+
     def _prepare_scaled_sprites(self) -> None:
-        target_w_ns, target_h_ns = 12, 22
-        target_w_ew, target_h_ew = 22, 12
-        for name, surf in self.car_sprites.items():
-            ns = pygame.transform.smoothscale(surf, (target_w_ns, target_h_ns))
-            ew = pygame.transform.smoothscale(surf, (target_w_ew, target_h_ew))
+        sheet = "assets/sprites/cars.png"
+        ns_sprites = load_scaled_cars(sheet, (12, 22), names=DEFAULT_CAR_NAMES)
+        ew_sprites = load_scaled_cars(sheet, (22, 12), names=DEFAULT_CAR_NAMES)
+        for name, ns in ns_sprites.items():
             self.scaled_cars[f"{name}:NS"] = ns
-            self.scaled_cars[f"{name}:EW"] = pygame.transform.rotate(ew, 90)
+            self.scaled_cars[f"{name}:EW"] = pygame.transform.rotate(ew_sprites[name], 90)
 
     def _handle_events(self) -> None:
         for event in pygame.event.get():
@@ -83,48 +94,125 @@ class PygameTilesRenderer:
                 self.running = False
             elif event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_q):
                 self.running = False
+            elif event.type == pygame.KEYDOWN and self.on_key is not None:
+                self.on_key(event.key)
 
-    def _draw_grid(self) -> None:
+    def _build_background(self) -> pygame.Surface:
+        """Pre-render the static tile layer once."""
+        background = pygame.Surface(self.screen.get_size()).convert()
+        background.fill(BG_COLOR)
         for r, row in enumerate(self.grid):
             for c, code in enumerate(row):
                 tile = self.tilemap.get(code)
                 if tile is None:
                     continue
                 tile_surface = self.atlas.get(tile)
-                self.screen.blit(tile_surface, (c * TILE_PX, r * TILE_PX))
+                background.blit(tile_surface, (c * TILE_PX, r * TILE_PX))
+        return background
 
-    def _draw_cars(self) -> None:
-        for vehicle in self.world.vehicles:
-            if vehicle.finished:
-                continue
-            path = getattr(vehicle.road, "screen_points", None)
+    def _draw_grid(self) -> None:
+        if self.background is None:
+            self.background = self._build_background()
+        self.screen.blit(self.background, (0, 0))
+        self._drawn = []
+        self._full = True
+
+    def _begin_frame(self) -> None:
+        if self.background is None or self._full:
+            self._draw_grid()
+            return
+        # erase last frame's cars by restoring the background under them
+        for rect in self._drawn:
+            self.screen.blit(self.background, rect, rect)
+        self._erased = self._drawn
+        self._drawn = []
+
+    def _present(self) -> None:
+        if self._full:
+            pygame.display.flip()
+            self._full = False
+        else:
+            pygame.display.update(self._erased + self._drawn)
+        self.clock.tick(FRAME_RATE)
+
+    def _draw_cars(self, cars=None) -> None:
+        # cars: optional iterable of (road, pos_m, sprite_key); defaults to the live world
+        if cars is None:
+            cars = [(v.road, v.pos_m, v.sprite_key or v.kind)
+                    for v in self.world.vehicles if not v.finished]
+        elif not isinstance(cars, list):
+            cars = list(cars)
+        lod = len(cars) > self.lod_threshold
+        batch = []
+        for road, pos_m, sprite_name in cars:
+            path = getattr(road, "screen_points", None)
             if not path:
                 continue
-            (x0, y0), (x1, y1) = path[0], path[-1]
-            progress = max(0.0, min(1.0, vehicle.pos_m / max(1e-6, vehicle.road.length_m)))
-            x = x0 + (x1 - x0) * progress
-            y = y0 + (y1 - y0) * progress
-
-            sprite_name = vehicle.sprite_key or vehicle.kind or "sedan_red"
-            orient = "NS" if vehicle.road.approach_dir in {"NS", "SN"} else "EW"
+            progress = max(0.0, min(1.0, pos_m / max(1e-6, road.length_m)))
+            if len(path) > 2:
+                pieces, ends = self._pieces(road, path)
+                x, y, k = point_along(pieces, ends, progress)
+                dx, dy = pieces[k][4], pieces[k][5]
+            else:
+                (x0, y0), (x1, y1) = path[0], path[-1]
+                dx, dy = x1 - x0, y1 - y0
+                x = x0 + dx * progress
+                y = y0 + dy * progress
+
+            sprite_name = sprite_name or "sedan_red"
+            if lod:
+                # level of detail: a small colored square per car
+                color = self._lod_color(sprite_name)
+                half = LOD_PX // 2
+                self._drawn.append(self.screen.fill(color, (int(x) - half, int(y) - half, LOD_PX, LOD_PX)))
+                continue
+            if len(path) > 2:
+                orient = "NS" if abs(dy) > abs(dx) else "EW"
+            else:
+                orient = "NS" if road.approach_dir in {"NS", "SN"} else "EW"
             key = f"{sprite_name}:{orient}"
             sprite = self.scaled_cars.get(key)
             if sprite is None and self.scaled_cars:
                 sprite = next(iter(self.scaled_cars.values()))
             if sprite is None:
                 continue
-            rect = sprite.get_rect(center=(int(x), int(y)))
-            self.screen.blit(sprite, rect)
+            batch.append((sprite, sprite.get_rect(center=(int(x), int(y)))))
+        if batch:
+            self._drawn.extend(self.screen.blits(batch))
+
+    def _pieces(self, road, path):
+        # cached straight pieces of a road that turns corners
+        cached = self._polylines.get(road)
+        if cached is None:
+            pieces = polyline_pieces(path)
+            cached = self._polylines[road] = (pieces, [p[1] for p in pieces])
+        return cached
+
+    def _lod_color(self, sprite_name: str) -> Tuple[int, int, int]:
+        color = self._lod_colors.get(sprite_name)
+        if color is None:
+            sprite = self.scaled_cars.get(f"{sprite_name}:NS")
+            color = pygame.transform.average_color(sprite)[:3] if sprite is not None else CAR_COLOR
+            self._lod_colors[sprite_name] = color
+        return color
 
     def render_frame(self) -> None:
         if not self.running:
             return
         self._handle_events()
-        self.screen.fill(BG_COLOR)
-        self._draw_grid()
+        self._begin_frame()
         self._draw_cars()
-        pygame.display.flip()
-        self.clock.tick(FRAME_RATE)
+        self._present()
+
+    def render_snapshot(self, snap, prev=None, alpha: float = 1.0) -> None:
+        """Draw a :class:`WorldSnapshot`, blending car positions from ``prev``."""
+        if not self.running:
+            return
+        self._handle_events()
+        roads = self.world.roads
+        self._begin_frame()
+        self._draw_cars((roads[ri], pos, key) for _, ri, pos, key in snap.interpolate(prev, alpha))
+        self._present()
 
     def close(self) -> None:
         pygame.quit()
@@ -1,18 +1,31 @@
-import pygame
+from __future__ import annotations
+
+import hashlib
+import json
+import os
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Tuple
+
+if TYPE_CHECKING:  # pygame is only imported once a sprite is actually loaded
+    import pygame
+
+Rect = Tuple[int, int, int, int]  # x, y, w, h
 
 @dataclass(frozen=True)
 class SpriteInfo:
     name: str
-    rect: pygame.Rect   # where to cut from the sheet
+    rect: Rect          # where to cut from the sheet
     scale: float = 1.0  # additional scaling factor
 
 class SpriteSheet:
     def __init__(self, path: str):
+        import pygame
         self.sheet = pygame.image.load(path).convert_alpha()
 
-    def extract(self, rect: pygame.Rect) -> pygame.Surface:
+    def extract(self, rect: Rect) -> "pygame.Surface":
+        import pygame
+        rect = pygame.Rect(rect)
         surf = pygame.Surface(rect.size, pygame.SRCALPHA)
         surf.blit(self.sheet, (0, 0), rect)
         return surf
@@ -21,29 +34,24 @@ class SpriteSheet:
 # don't rely on an even grid that crops vehicles awkwardly. Coordinates
 # are inclusive of all opaque pixels, leaving the surrounding padding in place.
 _CAR_SPRITE_BOUNDS: List[SpriteInfo] = [
-    SpriteInfo("police", pygame.Rect(50, 50, 800, 1945)),
-    SpriteInfo("taxi", pygame.Rect(1200, 50, 800, 1918)),
-    SpriteInfo("sports_blue", pygame.Rect(2300, 50, 900, 1915)),
-    SpriteInfo("van", pygame.Rect(3600, 50, 1000, 2188)),
-    SpriteInfo("sports_yellow", pygame.Rect(50, 2600, 1000, 1995)),
-    SpriteInfo("ambulance", pygame.Rect(1100, 2600, 1100, 2340)),
-    SpriteInfo("sedan_red", pygame.Rect(2300, 2600, 1002, 2187)),
-    SpriteInfo("motor_blue", pygame.Rect(3500, 2600, 600, 1557)),
-    SpriteInfo("motor_red", pygame.Rect(4200, 2600, 700, 1408)),
+    SpriteInfo("police", (50, 50, 800, 1945)),
+    SpriteInfo("taxi", (1200, 50, 800, 1918)),
+    SpriteInfo("sports_blue", (2300, 50, 900, 1915)),
+    SpriteInfo("van", (3600, 50, 1000, 2188)),
+    SpriteInfo("sports_yellow", (50, 2600, 1000, 1995)),
+    SpriteInfo("ambulance", (1100, 2600, 1100, 2340)),
+    SpriteInfo("sedan_red", (2300, 2600, 1002, 2187)),
+    SpriteInfo("motor_blue", (3500, 2600, 600, 1557)),
+    SpriteInfo("motor_red", (4200, 2600, 700, 1408)),
 ]
 
 DEFAULT_CAR_NAMES: Sequence[str] = [info.name for info in _CAR_SPRITE_BOUNDS]
 
 
-def load_cars_manifest(
-    sheet_path: str,
-    names: Sequence[str] | None = None,
-    overrides: Iterable[SpriteInfo] | None = None,
-) -> Dict[str, pygame.Surface]:
-    """Load named car sprites using precise bounding boxes."""
-
-    ss = SpriteSheet(sheet_path)
-
+def _choose_infos(
+    names: Sequence[str] | None,
+    overrides: Iterable[SpriteInfo] | None,
+) -> List[SpriteInfo]:
     if overrides is not None:
         chosen_infos: List[SpriteInfo] = list(overrides)
     else:
@@ -56,13 +64,99 @@ def load_cars_manifest(
         except KeyError as exc:  # pragma: no cover - developer error guard
             missing = exc.args[0]
             raise KeyError(f"Unknown car sprite '{missing}'") from None
+    return chosen_infos
+
+
+def load_cars_manifest(
+    sheet_path: str,
+    names: Sequence[str] | None = None,
+    overrides: Iterable[SpriteInfo] | None = None,
+) -> Dict[str, "pygame.Surface"]:
+    """Load named car sprites using precise bounding boxes."""
+    import pygame
 
+    ss = SpriteSheet(sheet_path)
     sprites: Dict[str, pygame.Surface] = {}
-    for info in chosen_infos:
+    for info in _choose_infos(names, overrides):
         spr = ss.extract(info.rect)
         if info.scale != 1.0:
-            w = max(1, int(info.rect.width * info.scale))
-            h = max(1, int(info.rect.height * info.scale))
+            w = max(1, int(info.rect[2] * info.scale))
+            h = max(1, int(info.rect[3] * info.scale))
             spr = pygame.transform.smoothscale(spr, (w, h))
         sprites[info.name] = spr
     return sprites
+
+
+def default_cache_dir() -> Path:
+    """``$TRAFFIC_SIM_CACHE``, else ``traffic_sim`` under the XDG cache dir."""
+    env = os.environ.get("TRAFFIC_SIM_CACHE")
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "traffic_sim"
+
+
+def _cache_key(sheet_path: str, infos: Sequence[SpriteInfo], size: Tuple[int, int]) -> str:
+    # content hash of the sheet, so an edited sheet invalidates the cache
+    h = hashlib.sha1()
+    with open(sheet_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(repr([(i.name, tuple(i.rect), i.scale) for i in infos]).encode())
+    h.update(repr(tuple(size)).encode())
+    return h.hexdigest()[:20]
+
+
+def load_scaled_cars(
+    sheet_path: str,
+    size: Tuple[int, int],
+    names: Sequence[str] | None = None,
+    overrides: Iterable[SpriteInfo] | None = None,
+    cache_dir: str | Path | bool | None = None,
+) -> Dict[str, "pygame.Surface"]:
+    """Car sprites smoothscaled to ``size``, cached on disk between runs.
+
+    The first call cuts and scales the sprites from the full sheet and saves
+    them as one small PNG strip keyed by the sheet's content hash and the
+    target size; later calls just load the strip. A changed sheet yields a
+    new key, so the cache rebuilds itself. Pass ``cache_dir=False`` to skip
+    the cache entirely.
+    """
+    import pygame
+
+    infos = _choose_infos(names, overrides)
+    w, h = size
+    use_cache = cache_dir is not False
+    if use_cache:
+        root = Path(cache_dir) if cache_dir else default_cache_dir()
+        stem = f"{Path(sheet_path).stem}-{_cache_key(sheet_path, infos, size)}-{w}x{h}"
+        strip_path, index_path = root / f"{stem}.png", root / f"{stem}.json"
+        try:
+            order = json.loads(index_path.read_text())
+            strip = pygame.image.load(str(strip_path))
+        except (OSError, ValueError, pygame.error):
+            pass
+        else:
+            if pygame.display.get_surface() is not None:
+                strip = strip.convert_alpha()
+            return {
+                name: strip.subsurface((k * w, 0, w, h)).copy()
+                for k, name in enumerate(order)
+            }
+
+    raw = load_cars_manifest(sheet_path, overrides=infos)
+    sprites = {name: pygame.transform.smoothscale(surf, (w, h)) for name, surf in raw.items()}
+
+    if use_cache:
+        strip = pygame.Surface((max(1, w * len(sprites)), h), pygame.SRCALPHA)
+        for k, surf in enumerate(sprites.values()):
+            strip.blit(surf, (k * w, 0))
+        try:
+            root.mkdir(parents=True, exist_ok=True)
+            tmp = root / f"{stem}.tmp.png"
+            pygame.image.save(strip, str(tmp))
+            os.replace(tmp, strip_path)
+            index_path.write_text(json.dumps(list(sprites)))
+        except (OSError, pygame.error):  # read-only home etc.: just run uncached
+            pass
+    return sprites
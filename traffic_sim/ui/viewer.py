@@ -0,0 +1,113 @@
+"""Watch a simulation without slowing it down, or replay a recorded one.
+
+The simulation runs at full speed in a worker thread and publishes
+:class:`WorldSnapshot` objects into a :class:`SnapshotBuffer`; the calling
+(main) thread draws the newest one at the renderer's own frame rate.
+:func:`run_replay` draws snapshots read from a trajectory trace instead.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional
+
+from ..core.recorder import TraceReader
+from ..core.snapshot import SnapshotBuffer, WorldSnapshot
+
+SEEK_STEP_S = 10.0
+
+
+def run_decoupled(sim, renderer, fps: float = 60.0, interpolate: bool = True) -> Optional[Dict[str, float]]:
+    """Run ``sim`` in a background thread while ``renderer`` shows snapshots.
+
+    ``renderer`` needs ``frame_snapshot(snap, prev, alpha)`` (NetworkRenderer)
+    or ``render_snapshot(snap, prev, alpha)`` (PygameTilesRenderer) and a
+    ``running`` flag. Closing the window stops the simulation. With
+    ``interpolate`` the view trails the simulation by one snapshot and
+    blends car positions between the last two.
+    """
+    if sim.snapshots is None:
+        sim.snapshots = SnapshotBuffer(max_fps=fps)
+    buffer = sim.snapshots
+    draw = getattr(renderer, "frame_snapshot", None) or renderer.render_snapshot
+    result: Dict[str, Dict[str, float]] = {}
+
+    def work():
+        result["summary"] = sim.run()
+
+    worker = threading.Thread(target=work, name="simulation", daemon=True)
+    worker.start()
+    while worker.is_alive() and renderer.running:
+        prev, cur = buffer.acquire()
+        if cur is None:
+            time.sleep(0.001)
+            continue
+        alpha = 1.0
+        if interpolate and prev is not None and cur.wall_time > prev.wall_time:
+            alpha = (time.perf_counter() - cur.wall_time) / (cur.wall_time - prev.wall_time)
+            alpha = max(0.0, min(1.0, alpha))
+        draw(cur, prev if interpolate else None, alpha)
+
+    if not renderer.running:
+        sim.request_stop()
+    worker.join()
+    return result.get("summary")
+
+
+def run_replay(
+    reader: TraceReader,
+    renderer,
+    speed: float = 1.0,
+    start_s: float = 0.0,
+    interpolate: bool = True,
+) -> None:
+    """Play a recorded trace through ``renderer`` until its window closes.
+
+    Simulated time advances at ``speed`` times wall time. Left/right arrow
+    keys seek :data:`SEEK_STEP_S` back or forward, Home jumps to the start
+    and space pauses; only the chunks around the current tick are read.
+    """
+    import pygame
+
+    if not len(reader):
+        return
+    draw = getattr(renderer, "frame_snapshot", None) or renderer.render_snapshot
+    first, last = reader.time_at(0), reader.time_at(len(reader) - 1)
+    state = {"t": max(first, min(last, start_s)), "paused": False}
+
+    def on_key(key) -> None:
+        if key == pygame.K_SPACE:
+            state["paused"] = not state["paused"]
+        elif key == pygame.K_RIGHT:
+            state["t"] = min(last, state["t"] + SEEK_STEP_S)
+        elif key == pygame.K_LEFT:
+            state["t"] = max(first, state["t"] - SEEK_STEP_S)
+        elif key == pygame.K_HOME:
+            state["t"] = first
+
+    renderer.on_key = on_key
+    snaps: Dict[int, WorldSnapshot] = {}
+
+    def snapshot(tick: int) -> WorldSnapshot:
+        snap = snaps.get(tick)
+        if snap is None:
+            if len(snaps) > 4:
+                snaps.clear()
+            snap = snaps[tick] = reader.snapshot(tick)
+        return snap
+
+    wall = time.perf_counter()
+    while renderer.running:
+        now = time.perf_counter()
+        if not state["paused"]:
+            state["t"] = min(last, state["t"] + (now - wall) * speed)
+        wall = now
+        tick = reader.tick_at(state["t"])
+        cur = snapshot(tick)
+        if interpolate and tick + 1 < len(reader):
+            nxt = snapshot(tick + 1)
+            span = nxt.time_s - cur.time_s
+            alpha = (state["t"] - cur.time_s) / span if span > 0 else 1.0
+            draw(nxt, cur, max(0.0, min(1.0, alpha)))
+        else:
+            draw(cur, None, 1.0)